@@ -0,0 +1,158 @@
+"""
+Benchmark transcription throughput on a real recording.
+
+Two benchmarks are available, both reporting wall time, real-time factor (RTF,
+processing seconds per second of audio) and speedup relative to the first row:
+
+``workers``
+    Transcribes the same segments with every requested number of worker
+    processes. Worker start-up, including loading one model per worker, is part
+    of the wall time.
+``cpu-options``
+    Compares the transformers pipeline with the ``transformers-cpu`` backend and
+    each of its optimisations (static KV cache, bf16 autocast, int8 dynamic
+    quantization). Model loading is excluded from the wall time.
+
+Usage:
+    python scripts/benchmark_transcription.py workers AUDIO SEGMENTS \\
+        --speaker P1 --workers 1 2 4 8 16
+    python scripts/benchmark_transcription.py cpu-options AUDIO SEGMENTS \\
+        --speaker P1 --model openai/whisper-large-v3
+
+SEGMENTS is a tab-separated table with ``start_sec`` and ``end_sec`` columns,
+e.g. the ``merged_turns.txt`` written by ``process_conversation``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from functools import partial
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+from speech_vad_diarization_transcription.transcription import (
+    TransformersASRModel,
+    load_whisper_model,
+    transcribe_segments,
+)
+
+# (label, load_whisper_model overrides) compared by the cpu-options benchmark
+CPU_OPTION_VARIANTS: List[Tuple[str, Dict[str, Any]]] = [
+    ("pipeline fp32", {"backend": "transformers"}),
+    (
+        "sdpa + inference_mode",
+        {"backend": "transformers-cpu", "static_cache": False, "bf16_autocast": False},
+    ),
+    (
+        "+ static cache",
+        {"backend": "transformers-cpu", "static_cache": True, "bf16_autocast": False},
+    ),
+    (
+        "+ bf16 autocast",
+        {"backend": "transformers-cpu", "static_cache": True, "bf16_autocast": True},
+    ),
+    (
+        "+ int8 dynamic quant",
+        {
+            "backend": "transformers-cpu",
+            "static_cache": True,
+            "bf16_autocast": False,
+            "quantize_int8": True,
+        },
+    ),
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("benchmark", choices=["workers", "cpu-options"])
+    parser.add_argument("audio", help="Source audio file")
+    parser.add_argument("segments", help="TSV with start_sec and end_sec columns")
+    parser.add_argument("--speaker", default=None, help="Only use this speaker's rows")
+    parser.add_argument("--model", default="large-v3", help="Transcription model")
+    parser.add_argument("--device", default="cpu")
+    parser.add_argument("--language", default="da")
+    parser.add_argument("--compute-type", default=None)
+    parser.add_argument("--model-batch-size", type=int, default=16)
+    parser.add_argument(
+        "--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts"
+    )
+    parser.add_argument(
+        "--cpu-threads",
+        type=int,
+        default=None,
+        help="Threads per worker (default: cores / workers)",
+    )
+    return parser.parse_args()
+
+
+def time_transcription(
+    model: TransformersASRModel,
+    segments: pd.DataFrame,
+    args: argparse.Namespace,
+    num_workers: int = 1,
+) -> float:
+    """Transcribe ``segments`` without caches and return the wall time."""
+    with tempfile.TemporaryDirectory() as output_dir:
+        start = time.perf_counter()
+        transcribe_segments(
+            model,
+            segments,
+            args.audio,
+            output_dir,
+            speaker=args.speaker or "bench",
+            cache=False,
+            num_workers=num_workers,
+            cpu_threads=args.cpu_threads,
+        )
+        return time.perf_counter() - start
+
+
+def main() -> None:
+    args = parse_args()
+
+    segments = pd.read_csv(args.segments, sep="\t")
+    if args.speaker is not None:
+        segments = segments[segments["speaker"] == args.speaker]
+    segments = segments.reset_index(drop=True)
+    audio_sec = float((segments["end_sec"] - segments["start_sec"]).sum())
+
+    load_kwargs: Dict[str, Any] = {
+        "transcription_model_name": args.model,
+        "device": args.device,
+        "language": args.language,
+        "model_batch_size": args.model_batch_size,
+        "compute_type": args.compute_type,
+    }
+
+    print(f"{len(segments)} segments, {audio_sec:.1f} s of audio")
+    print(f"{'configuration':>24} {'wall [s]':>10} {'RTF':>8} {'speedup':>8}")
+
+    runs: List[Tuple[str, Callable[[], TransformersASRModel], int]]
+    if args.benchmark == "workers":
+        shared_model = load_whisper_model(**load_kwargs)
+        runs = [(f"{n} workers", lambda: shared_model, n) for n in args.workers]
+    else:
+        runs = [
+            (label, partial(load_whisper_model, **load_kwargs, **overrides), 1)
+            for label, overrides in CPU_OPTION_VARIANTS
+        ]
+
+    baseline = None
+    for label, load_model, num_workers in runs:
+        model = load_model()
+        elapsed = time_transcription(model, segments, args, num_workers=num_workers)
+        del model
+
+        baseline = baseline or elapsed
+        print(
+            f"{label:>24} {elapsed:>10.2f} {elapsed / audio_sec:>8.3f} "
+            f"{baseline / elapsed:>8.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
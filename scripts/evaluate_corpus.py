@@ -0,0 +1,101 @@
+"""
+Evaluate estimated turn tables against reference annotations for a corpus.
+
+MANIFEST is a tab-separated table with ``reference`` and ``estimate`` columns
+(paths relative to the manifest) and an optional ``conversation`` column, e.g.::
+
+    conversation	reference	estimate
+    F1F2_food	annotations/F1F2_food.txt	outputs/F1F2_food/final_labels.txt
+
+The per-type summary (counts, precision, recall, F1 and timing deltas with
+bootstrap confidence intervals over conversations) is written as one
+tab-separated table. Frame-level timeline metrics (missed speech, false alarm,
+speaker confusion, overlap accuracy) per conversation can be written with
+``--frame-metrics``.
+
+Usage:
+    python scripts/evaluate_corpus.py manifest.tsv --output summary.tsv
+    python scripts/evaluate_corpus.py manifest.tsv --output summary.tsv \\
+        --min-overlap-ratio 0.3 --workers 8 --bootstrap 2000 --errors errors.tsv
+    python scripts/evaluate_corpus.py manifest.tsv --output summary.tsv \\
+        --frame-metrics frames.tsv --frame-sec 0.02
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from speech_vad_diarization_transcription.evaluation import (
+    evaluate_corpus,
+    read_manifest,
+)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("manifest", help="Manifest of reference/estimate pairs")
+    parser.add_argument("--output", required=True, help="Summary table (TSV)")
+    parser.add_argument(
+        "--errors", default=None, help="Also write the per-turn errors (TSV)"
+    )
+    parser.add_argument("--min-overlap-ratio", type=float, default=0.1)
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Worker processes (default: all)"
+    )
+    parser.add_argument("--bootstrap", type=int, default=1000)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--postprocess",
+        action="store_true",
+        help="Run postprocess_turn_df on both tables before matching",
+    )
+    parser.add_argument(
+        "--frame-metrics",
+        default=None,
+        help="Also write frame-level metrics per conversation (TSV)",
+    )
+    parser.add_argument(
+        "--frame-sec", type=float, default=0.01, help="Frame length in seconds"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    pairs = read_manifest(args.manifest)
+
+    start = time.perf_counter()
+    result = evaluate_corpus(
+        pairs,
+        min_overlap_ratio=args.min_overlap_ratio,
+        num_workers=args.workers,
+        n_bootstrap=args.bootstrap,
+        confidence=args.confidence,
+        seed=args.seed,
+        postprocess=args.postprocess,
+        frame_sec=args.frame_sec,
+    )
+    elapsed = time.perf_counter() - start
+
+    result.summary.to_csv(args.output, sep="\t", index=False)
+    if args.errors is not None:
+        result.errors.to_csv(args.errors, sep="\t", index=False)
+    if args.frame_metrics is not None:
+        result.frames.to_csv(args.frame_metrics, sep="\t", index=False)
+
+    columns = ["type", "tp", "fp", "fn", "precision", "recall", "f1"]
+    print(result.summary[columns].to_string(index=False, float_format="%.3f"))
+    pooled = result.frames.iloc[-1]
+    print(
+        f"Frames: DER {pooled['der']:.3f} (missed {pooled['missed_speaker']:.3f}, "
+        f"false alarm {pooled['false_alarm_speaker']:.3f}, "
+        f"confusion {pooled['confusion']:.3f}), "
+        f"overlap accuracy {pooled['overlap_accuracy']:.3f}"
+    )
+    print(f"Evaluated {len(pairs)} conversations in {elapsed:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Manage the segment caches of a pipeline output tree.
+
+``gc`` evicts least recently used cache entries until the tree fits the given
+budget and reports the reclaimed space. Segment audio and log-mel stores go
+first; transcripts are only evicted with ``--evict-transcripts``.
+
+Usage:
+    python scripts/manage_cache.py gc outputs/ --max-size 20G
+    python scripts/manage_cache.py gc outputs/ --max-entries 200000 --dry-run
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+
+from speech_vad_diarization_transcription.cache_manager import CacheManager
+
+_SIZE_UNITS = {"": 1, "K": 1024, "M": 1024**2, "G": 1024**3, "T": 1024**4}
+
+
+def parse_size(text: str) -> int:
+    """Parse sizes such as ``500M``, ``20G`` or ``1048576`` into bytes."""
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?)i?B?\s*", text, flags=re.IGNORECASE)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+    return int(float(match.group(1)) * _SIZE_UNITS[match.group(2).upper()])
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("command", choices=["gc"])
+    parser.add_argument("root", help="Pipeline output directory")
+    parser.add_argument("--max-size", type=parse_size, default=None)
+    parser.add_argument("--max-entries", type=int, default=None)
+    parser.add_argument(
+        "--evict-transcripts",
+        action="store_true",
+        help="Also evict transcript caches when audio eviction is not enough",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report without deleting"
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    manager = CacheManager(
+        args.root,
+        max_bytes=args.max_size,
+        max_entries=args.max_entries,
+        evict_transcripts=args.evict_transcripts,
+    )
+    report = manager.gc(dry_run=args.dry_run)
+    print(("[dry run] " if args.dry_run else "") + report.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -5,11 +5,21 @@ __all__ = [
     "process_conversation",
     "load_whisper_model",
     "transcribe_segments",
-    "compute_all_errors"
+    "detect_speaker_language",
+    "compute_all_errors",
+    "compute_threshold_curves",
+    "evaluate_corpus",
+    "compute_frame_metrics",
 ]
 
 __version__ = "0.1.0"
 
 from .conversation import process_conversation
-from .transcription import load_whisper_model, transcribe_segments
-from .compute_turn_errors import compute_all_errors
+from .transcription import (
+    detect_speaker_language,
+    load_whisper_model,
+    transcribe_segments,
+)
+from .compute_turn_errors import compute_all_errors, compute_threshold_curves
+from .evaluation import evaluate_corpus
+from .frame_metrics import compute_frame_metrics
@@ -0,0 +1,152 @@
+"""
+Crash- and concurrency-safe file writes.
+
+Several processes (e.g. array-job tasks) may share one output tree. Artifacts
+are therefore written to a temporary file in the target directory and renamed
+into place, so readers only ever see complete files, and expensive caches are
+claimed with advisory locks so each item is computed once.
+"""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Any, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+# mkstemp creates private files; published artifacts get the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+@contextmanager
+def atomic_write(
+    path: str,
+    mode: str = "w",
+    encoding: Optional[str] = "utf-8",
+    newline: Optional[str] = None,
+) -> Iterator[IO[Any]]:
+    """Open a temporary file that replaces ``path`` when the block succeeds.
+
+    The temporary file lives in the same directory, so the final
+    :func:`os.replace` is atomic. If the block raises, ``path`` is left
+    untouched and the temporary file is removed.
+
+    Args:
+        path: Destination file.
+        mode: ``'w'`` for text or ``'wb'`` for binary output.
+        encoding: Text encoding (ignored in binary mode).
+        newline: Newline translation, as for :func:`open` (use ``""`` for
+            writers that emit their own line terminators, such as ``to_csv``).
+
+    Yields:
+        The open temporary file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        with os.fdopen(
+            fd,
+            mode,
+            encoding=None if "b" in mode else encoding,
+            newline=None if "b" in mode else newline,
+        ) as tmp_file:
+            yield tmp_file
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+@contextmanager
+def file_lock(path: str, blocking: bool = True) -> Iterator[bool]:
+    """Hold an advisory exclusive lock associated with ``path``.
+
+    The lock is taken on ``<path>.lock`` with ``flock``, so it is released
+    automatically if the holding process dies. The lock file is removed again
+    when the lock is released, so caches do not accumulate one per artifact;
+    only a crashed holder leaves it behind, and the next holder removes it. On
+    platforms without ``fcntl`` locking is a no-op.
+
+    Args:
+        path: File the lock protects (it need not exist).
+        blocking: Wait for the lock; otherwise give up immediately if another
+            process holds it.
+
+    Yields:
+        Whether the lock was acquired (always True when ``blocking``).
+    """
+    if fcntl is None:
+        yield True
+        return
+
+    lock_path = f"{path}.lock"
+    flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+    while True:
+        lock_file = open(lock_path, "a")
+        try:
+            fcntl.flock(lock_file, flags)
+        except BlockingIOError:
+            lock_file.close()
+            yield False
+            return
+        except BaseException:
+            lock_file.close()
+            raise
+        if _is_linked(lock_file, lock_path):
+            break
+        # The previous holder removed the file while we waited; lock the new one
+        lock_file.close()
+
+    try:
+        yield True
+    finally:
+        # Unlink before unlocking, so waiters on this file notice it is stale
+        try:
+            os.remove(lock_path)
+        except FileNotFoundError:
+            pass
+        lock_file.close()
+
+
+def _is_linked(lock_file: IO[Any], lock_path: str) -> bool:
+    """Whether the open ``lock_file`` is still the file at ``lock_path``."""
+    try:
+        linked = os.stat(lock_path)
+    except FileNotFoundError:
+        return False
+    opened = os.fstat(lock_file.fileno())
+    return (linked.st_dev, linked.st_ino) == (opened.st_dev, opened.st_ino)
+
+
+@contextmanager
+def claim(path: str) -> Iterator[bool]:
+    """Hold the lock of ``path`` while computing it, waiting for other holders.
+
+    Use this for artifacts that are normally recomputed on request rather than
+    reused: if another process is computing ``path``, the caller can use its
+    result instead of computing it again.
+
+    Args:
+        path: File (or group of files) the lock protects.
+
+    Yields:
+        Whether another process held the lock, and has just released it.
+    """
+    with file_lock(path, blocking=False) as acquired:
+        if acquired:
+            yield False
+            return
+    with file_lock(path):
+        yield True
@@ -0,0 +1,350 @@
+"""
+Host-specific autotuning of ASR execution parameters.
+
+The fastest model batch size, compute type and thread count depend on the CPU
+(core count, cache sizes, vector extensions), the device and the model, and a
+batch size that is too large makes the host swap. :func:`autotune` runs a short
+synthetic microbenchmark over a small grid of configurations, keeps the one with
+the highest throughput whose peak memory fits a budget, and caches the choice
+per host and model so later runs skip the benchmark.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import threading
+import time
+import warnings
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+import torch
+
+from .atomic_io import atomic_write, file_lock
+
+SAMPLE_RATE = 16000
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"),
+    ".cache",
+    "speech_vad_diarization_transcription",
+    "asr_autotune.json",
+)
+
+# Batch sizes tried per (compute type, thread count), in increasing order
+DEFAULT_BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64)
+
+# A larger batch must beat the best smaller one by this factor to keep growing
+_MIN_GAIN = 1.05
+
+
+@dataclass(frozen=True)
+class ExecutionConfig:
+    """Execution parameters chosen by :func:`autotune`."""
+
+    compute_type: str
+    cpu_threads: int
+    model_batch_size: int
+
+
+@dataclass
+class Trial:
+    """One benchmarked configuration."""
+
+    config: ExecutionConfig
+    audio_sec_per_sec: float
+    peak_bytes: Optional[int]
+    fits: bool
+
+
+@dataclass
+class AutotuneResult:
+    """Fastest configuration that fits the memory budget, with all trials."""
+
+    config: ExecutionConfig
+    audio_sec_per_sec: float
+    peak_bytes: Optional[int]
+    trials: List[Trial] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> AutotuneResult:
+        return cls(
+            config=ExecutionConfig(**data["config"]),
+            audio_sec_per_sec=data["audio_sec_per_sec"],
+            peak_bytes=data["peak_bytes"],
+            trials=[
+                Trial(**{**trial, "config": ExecutionConfig(**trial["config"])})
+                for trial in data.get("trials", [])
+            ],
+        )
+
+
+def cpu_model_name() -> str:
+    """Human-readable CPU model of this host."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine() or "unknown"
+
+
+def host_key(model_name: str, backend: str, device: str, *search: str) -> str:
+    """Cache key of a tuning result: CPU model, core count, model and backend.
+
+    ``search`` optionally describes the searched grid, so that results of
+    differently restricted searches are cached separately.
+    """
+    return "|".join(
+        [cpu_model_name(), str(os.cpu_count() or 1), model_name, backend, device]
+        + list(search)
+    )
+
+
+def default_thread_counts() -> List[int]:
+    """All logical cores, and half of them (often the physical cores)."""
+    n_cores = os.cpu_count() or 1
+    return sorted({n_cores, max(1, n_cores // 2)}, reverse=True)
+
+
+def synthetic_clips(n_clips: int, clip_sec: float, seed: int = 0) -> List[np.ndarray]:
+    """Speech-like test inputs: noise with a 4 Hz syllable-rate envelope."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(clip_sec * SAMPLE_RATE)) / SAMPLE_RATE
+    clips = []
+    for _ in range(n_clips):
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * 4.0 * t + rng.uniform(0, 2 * np.pi))
+        noise = rng.standard_normal(len(t))
+        # Integrated (brown) noise, with most energy at low frequencies
+        noise = np.cumsum(noise) - np.cumsum(noise).mean()
+        noise /= np.abs(noise).max() + 1e-9
+        clips.append((0.1 * envelope * noise).astype(np.float32))
+    return clips
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm", "r", encoding="utf-8") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def default_memory_budget(device: str, headroom: float = 0.8) -> Optional[int]:
+    """Memory in use now plus ``headroom`` of the memory still available."""
+    if device == "cuda" and torch.cuda.is_available():
+        free, _total = torch.cuda.mem_get_info()
+        return int(torch.cuda.memory_allocated() + headroom * free)
+    rss = _rss_bytes()
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:") and rss is not None:
+                    return int(rss + headroom * int(line.split()[1]) * 1024)
+    except OSError:
+        pass
+    return None
+
+
+def _is_out_of_memory(exc: BaseException) -> bool:
+    """Whether ``exc`` signals host or device memory exhaustion.
+
+    Besides ``MemoryError`` and PyTorch's CUDA error, this covers backends such as
+    CTranslate2 (faster-whisper) that raise a plain ``RuntimeError``.
+    """
+    if isinstance(exc, (MemoryError, torch.cuda.OutOfMemoryError)):
+        return True
+    return "out of memory" in str(exc).lower()
+
+
+class _PeakMemory:
+    """Peak process memory (or CUDA allocation) while the block runs."""
+
+    def __init__(self, device: str, interval_sec: float = 0.02) -> None:
+        self.on_cuda = device == "cuda" and torch.cuda.is_available()
+        self.interval_sec = interval_sec
+        self.peak: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            rss = _rss_bytes()
+            if rss is not None:
+                self.peak = max(self.peak or 0, rss)
+
+    def __enter__(self) -> _PeakMemory:
+        if self.on_cuda:
+            torch.cuda.reset_peak_memory_stats()
+        else:
+            self.peak = _rss_bytes()
+            self._thread = threading.Thread(target=self._sample, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        if self.on_cuda:
+            self.peak = int(torch.cuda.max_memory_allocated())
+            return
+        self._stop.set()
+        assert self._thread is not None
+        self._thread.join()
+        rss = _rss_bytes()
+        if rss is not None:
+            self.peak = max(self.peak or 0, rss)
+
+
+def _read_cache(cache_path: str) -> Dict[str, Any]:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as cache_file:
+            return json.load(cache_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def cached_result(
+    key: str, cache_path: str = DEFAULT_CACHE_PATH
+) -> Optional[AutotuneResult]:
+    """Previously stored tuning result for ``key``, if any."""
+    entry = _read_cache(cache_path).get(key)
+    return AutotuneResult.from_dict(entry) if entry is not None else None
+
+
+def _store_result(key: str, result: AutotuneResult, cache_path: str) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    with file_lock(cache_path):
+        cache = _read_cache(cache_path)
+        cache[key] = result.to_dict()
+        with atomic_write(cache_path) as cache_file:
+            json.dump(cache, cache_file, indent=2)
+
+
+def autotune(
+    key: str,
+    load: Callable[[str, int], Any],
+    run: Callable[[Any, List[np.ndarray]], Any],
+    compute_types: Sequence[str],
+    thread_counts: Sequence[int],
+    batch_sizes: Sequence[int] = DEFAULT_BATCH_SIZES,
+    device: str = "cpu",
+    memory_budget: Optional[int] = None,
+    cache_path: Optional[str] = DEFAULT_CACHE_PATH,
+    clip_sec: float = 10.0,
+    max_trial_sec: float = 60.0,
+) -> AutotuneResult:
+    """Benchmark execution configurations and return the fastest one that fits.
+
+    For every compute type and thread count the model is loaded once, warmed up,
+    and given batches of synthetic clips of increasing size. A configuration
+    stops growing its batch once a batch no longer improves throughput by 5 %,
+    exceeds the memory budget, runs out of memory, or takes longer than
+    ``max_trial_sec``. Candidates that fail to load (e.g. a compute type the
+    device does not support) are skipped with a warning. Among configurations
+    within 5 % of the highest throughput, the smallest batch size wins.
+
+    Args:
+        key: Cache key, normally from :func:`host_key`.
+        load: Loads the model for ``(compute_type, cpu_threads)``.
+        run: Transcribes a list of 16 kHz float32 waveforms with a loaded model.
+        compute_types: Compute types to try.
+        thread_counts: CPU thread counts to try.
+        batch_sizes: Increasing model batch sizes to try.
+        device: ``'cpu'`` or ``'cuda'``; selects how peak memory is measured.
+        memory_budget: Peak process memory (CUDA allocation on GPUs) in bytes a
+            configuration may use; ``None`` for no limit.
+        cache_path: JSON file of stored results; a stored result for ``key`` is
+            returned without benchmarking. ``None`` disables the cache.
+        clip_sec: Duration of each synthetic clip.
+        max_trial_sec: Wall time after which batch sizes stop growing.
+
+    Returns:
+        The chosen configuration with its throughput (seconds of audio per
+        second) and all trials.
+
+    Raises:
+        RuntimeError: If no configuration could be benchmarked.
+    """
+    if cache_path is not None:
+        stored = cached_result(key, cache_path)
+        if stored is not None:
+            return stored
+
+    clips = synthetic_clips(max(batch_sizes), clip_sec)
+    trials: List[Trial] = []
+    for compute_type in compute_types:
+        for cpu_threads in thread_counts:
+            try:
+                model = load(compute_type, cpu_threads)
+                run(model, clips[:1])
+            except Exception as exc:  # noqa: BLE001 - skip unusable candidates
+                warnings.warn(
+                    f"autotune: skipping compute_type={compute_type!r}, "
+                    f"cpu_threads={cpu_threads}: {type(exc).__name__}: {exc}",
+                    stacklevel=2,
+                )
+                continue
+
+            best_throughput = 0.0
+            for batch_size in batch_sizes:
+                config = ExecutionConfig(compute_type, cpu_threads, batch_size)
+                try:
+                    with _PeakMemory(device) as memory:
+                        start = time.perf_counter()
+                        run(model, clips[:batch_size])
+                        elapsed = time.perf_counter() - start
+                except Exception as exc:  # noqa: BLE001 - skip unusable candidates
+                    # Out of memory ends the batch-size search for this candidate;
+                    # any other failure skips its remaining configurations
+                    if not _is_out_of_memory(exc):
+                        warnings.warn(
+                            f"autotune: skipping {config}: {type(exc).__name__}: {exc}",
+                            stacklevel=2,
+                        )
+                    break
+                throughput = batch_size * clip_sec / max(elapsed, 1e-9)
+                fits = memory_budget is None or (
+                    memory.peak is not None and memory.peak <= memory_budget
+                )
+                trials.append(Trial(config, throughput, memory.peak, fits))
+                if (
+                    not fits
+                    or throughput < best_throughput * _MIN_GAIN
+                    or elapsed > max_trial_sec
+                ):
+                    break
+                best_throughput = throughput
+
+            del model
+            if device == "cuda" and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    candidates = [trial for trial in trials if trial.fits]
+    if not candidates:
+        raise RuntimeError(
+            f"autotune: no configuration could be benchmarked within the memory "
+            f"budget ({len(trials)} trials)"
+        )
+    # Within measurement noise of the fastest, prefer the smallest batch
+    fastest = max(trial.audio_sec_per_sec for trial in candidates)
+    best = min(
+        (
+            trial
+            for trial in candidates
+            if trial.audio_sec_per_sec * _MIN_GAIN >= fastest
+        ),
+        key=lambda trial: (trial.config.model_batch_size, -trial.audio_sec_per_sec),
+    )
+    result = AutotuneResult(
+        best.config, best.audio_sec_per_sec, best.peak_bytes, trials
+    )
+    if cache_path is not None:
+        _store_result(key, result, cache_path)
+    return result
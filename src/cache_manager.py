@@ -0,0 +1,258 @@
+"""
+Size-bounded LRU management of per-segment caches.
+
+Every transcription run leaves segment WAVs, transcript caches and feature
+stores under each speaker directory. :class:`CacheManager` keeps an output tree
+within a byte budget and a maximum number of cache entries by evicting the
+least recently used entries: segment audio (and log-mel stores) first, since it
+is cheap to re-extract, and transcripts only when explicitly allowed.
+
+Cache hits refresh an entry's timestamps through :func:`touch`, so recency does
+not depend on the file system recording access times.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from .atomic_io import file_lock
+
+# Per-segment artifacts: <prefix>_seg_<idx>_<start>_<end>[_trim].wav and the
+# transcript <prefix>_seg_<idx>_<start>_<end>[_trim][_<language>].(txt|json)
+_SEGMENT_FILE = re.compile(
+    r"_seg_\d+_[\d.]+_[\d.]+(_trim)?(\.wav|(_[A-Za-z-]+)?\.(txt|json))$"
+)
+
+# Channel feature stores: <prefix>_logmel<n_mels>.npy (+ .json sidecar)
+_LOG_MEL_FILE = re.compile(r"_logmel\d+\.(npy|json)$")
+
+# Segment containers: <prefix>_segments.pack (+ .index.tsv), evicted together
+_SEGMENT_STORE_FILE = re.compile(r"_segments(\.pack|\.index\.tsv)$")
+
+# file_lock's lock file next to a cache file, counted with that file's entry
+_LOCK_SUFFIX = ".lock"
+
+# Eviction tiers, evicted in this order
+AUDIO = "audio"
+TRANSCRIPT = "transcript"
+
+
+def touch(path: str) -> None:
+    """Mark a cache file as used now (ignored if it vanished meanwhile)."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+@dataclass
+class CacheEntry:
+    """One evictable unit: a segment WAV, a segment container, a log-mel store,
+    or a transcript with its confidence sidecar, plus their lock files."""
+
+    key: str
+    kind: str
+    paths: List[str] = field(default_factory=list)
+    lock_paths: List[str] = field(default_factory=list)
+    size: int = 0
+    last_used: float = 0.0
+
+
+@dataclass
+class GCReport:
+    """Outcome of :meth:`CacheManager.gc`."""
+
+    removed_entries: int = 0
+    removed_files: int = 0
+    reclaimed_bytes: int = 0
+    remaining_entries: int = 0
+    remaining_bytes: int = 0
+    skipped_locked: int = 0
+    removed_stale_locks: int = 0
+
+    def summary(self) -> str:
+        return (
+            f"Removed {self.removed_entries} entries ({self.removed_files} files), "
+            f"reclaimed {_format_bytes(self.reclaimed_bytes)}; "
+            f"{self.remaining_entries} entries / "
+            f"{_format_bytes(self.remaining_bytes)} remain"
+            + (
+                f"; {self.skipped_locked} in use were kept"
+                if self.skipped_locked
+                else ""
+            )
+            + (
+                f"; removed {self.removed_stale_locks} stale lock files"
+                if self.removed_stale_locks
+                else ""
+            )
+        )
+
+
+def _format_bytes(n_bytes: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(n_bytes) < 1024:
+            return f"{n_bytes:.1f} {unit}"
+        n_bytes /= 1024
+    return f"{n_bytes:.1f} TiB"
+
+
+@dataclass
+class CacheManager:
+    """LRU eviction of the segment caches below ``root``.
+
+    Args:
+        root: Output directory to manage (searched recursively).
+        max_bytes: Byte budget for all cache entries; ``None`` for no limit.
+        max_entries: Maximum number of cache entries; ``None`` for no limit.
+        evict_transcripts: Also evict transcript caches (after all audio) when
+            the budget cannot be met otherwise. Off by default, since
+            transcripts are the expensive part to recompute.
+    """
+
+    root: str
+    max_bytes: Optional[int] = None
+    max_entries: Optional[int] = None
+    evict_transcripts: bool = False
+
+    def scan(self) -> List[CacheEntry]:
+        """Collect the cache entries below ``root``.
+
+        Lock files of cache files belong to their entry; an entry may consist of
+        lock files only (left behind by a crashed process).
+        """
+        entries: Dict[Tuple[str, str], CacheEntry] = {}
+        for directory, _dirs, files in os.walk(self.root):
+            for name in files:
+                is_lock = name.endswith(_LOCK_SUFFIX)
+                cache_name = name[: -len(_LOCK_SUFFIX)] if is_lock else name
+                store_match = _SEGMENT_STORE_FILE.search(cache_name)
+                if store_match or _LOG_MEL_FILE.search(cache_name):
+                    kind = AUDIO
+                elif _SEGMENT_FILE.search(cache_name):
+                    kind = AUDIO if cache_name.endswith(".wav") else TRANSCRIPT
+                else:
+                    continue
+
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                cache_path = os.path.join(directory, cache_name)
+                stem = (
+                    cache_path[: len(cache_path) - len(store_match.group(1))]
+                    if store_match
+                    else os.path.splitext(cache_path)[0]
+                )
+                entry = entries.setdefault((stem, kind), CacheEntry(stem, kind))
+                (entry.lock_paths if is_lock else entry.paths).append(path)
+                entry.size += stat.st_size
+                entry.last_used = max(entry.last_used, stat.st_atime, stat.st_mtime)
+        return list(entries.values())
+
+    def remove_stale_locks(self) -> int:
+        """Remove the lock files of cache entries that no process holds.
+
+        Each is removed by taking and releasing its lock (see
+        :func:`~.atomic_io.file_lock`), never from under a holder.
+
+        Returns:
+            Number of lock files removed.
+        """
+        removed = 0
+        for entry in self.scan():
+            for lock_path in entry.lock_paths:
+                with file_lock(lock_path[: -len(_LOCK_SUFFIX)], blocking=False) as ok:
+                    removed += ok
+        return removed
+
+    def usage(self) -> Tuple[int, int]:
+        """Current number of entries and their total size in bytes."""
+        entries = self.scan()
+        return len(entries), sum(entry.size for entry in entries)
+
+    def _over_budget(self, n_entries: int, n_bytes: int) -> bool:
+        return (self.max_bytes is not None and n_bytes > self.max_bytes) or (
+            self.max_entries is not None and n_entries > self.max_entries
+        )
+
+    def gc(self, dry_run: bool = False) -> GCReport:
+        """Evict least recently used entries until the budget is met.
+
+        Lock files left behind by crashed processes are removed first. Cache
+        files currently locked by a running transcription are kept.
+
+        Args:
+            dry_run: Only report what would be removed.
+
+        Returns:
+            A :class:`GCReport` with the reclaimed space.
+        """
+        removed_stale_locks = 0 if dry_run else self.remove_stale_locks()
+        entries = self.scan()
+        report = GCReport(
+            remaining_entries=len(entries),
+            remaining_bytes=sum(entry.size for entry in entries),
+            removed_stale_locks=removed_stale_locks,
+        )
+
+        tiers = [AUDIO, TRANSCRIPT] if self.evict_transcripts else [AUDIO]
+        candidates = [
+            entry
+            for tier in tiers
+            for entry in sorted(
+                (entry for entry in entries if entry.kind == tier),
+                key=lambda entry: entry.last_used,
+            )
+        ]
+
+        for entry in candidates:
+            if not self._over_budget(report.remaining_entries, report.remaining_bytes):
+                break
+            locked_path = _locked_path(entry)
+            if locked_path is not None and not dry_run:
+                # Releasing the lock removes its lock file
+                with file_lock(locked_path, blocking=False) as acquired:
+                    if not acquired:
+                        report.skipped_locked += 1
+                        continue
+                    self._remove(entry, report)
+            elif not dry_run:
+                self._remove(entry, report)
+            else:
+                report.removed_files += len(entry.paths)
+
+            report.removed_entries += 1
+            report.reclaimed_bytes += entry.size
+            report.remaining_entries -= 1
+            report.remaining_bytes -= entry.size
+        return report
+
+    @staticmethod
+    def _remove(entry: CacheEntry, report: GCReport) -> None:
+        for path in entry.paths:
+            if _remove_quietly(path):
+                report.removed_files += 1
+
+
+def _locked_path(entry: CacheEntry) -> Optional[str]:
+    """File whose lock writers hold while updating ``entry``, if any."""
+    if entry.kind == TRANSCRIPT:
+        return f"{entry.key}.txt"
+    if entry.key.endswith("_segments"):
+        return f"{entry.key}.pack"
+    if _LOG_MEL_FILE.search(f"{entry.key}.npy"):
+        return f"{entry.key}.npy"
+    return None
+
+
+def _remove_quietly(path: str) -> bool:
+    try:
+        os.remove(path)
+    except OSError:
+        return False
+    return True
@@ -7,11 +7,33 @@ Based on MATLAB implementation compute_turn_errors.m.
 from __future__ import annotations
 
 import warnings
-from typing import Tuple, cast
+from dataclasses import dataclass
+from typing import Hashable, Sequence, Tuple, cast
 
 import numpy as np
 import pandas as pd
 
+from .interval_index import IntervalIndex, contained_in_other_group
+
+# Same-speaker indices listed in the summary warning of tabulate_floor_transfers
+_MAX_LISTED_INDICES = 10
+
+# Timing statistics per turn type, in the order of compute_all_errors
+_DELTA_STATISTICS = (
+    "duration_delta_mean_abs",
+    "duration_delta_p95_abs",
+    "duration_delta_p05_abs",
+    "start_delta_mean_abs",
+    "end_delta_mean_abs",
+    "start_delta_p95_abs",
+    "start_delta_p05_abs",
+    "end_delta_p95_abs",
+    "end_delta_p05_abs",
+    "start_end_delta_mean_abs",
+    "start_end_p95_abs",
+    "start_end_p05_abs",
+)
+
 
 def compute_overlap_ratio(
     s_ref: Tuple[float, float],
@@ -40,6 +62,281 @@ def compute_overlap_ratio(
     return overlap_ratio
 
 
+@dataclass
+class TurnMatches:
+    """Sparse matching between estimated and reference turns.
+
+    Each entry pairs estimated turn ``est_idx[k]`` with reference turn
+    ``ref_idx[k]`` (row positions); ``overlap_ratio[k]`` is their overlap ratio,
+    or NaN for a pair that was never compared.
+    """
+
+    est_idx: np.ndarray
+    ref_idx: np.ndarray
+    overlap_ratio: np.ndarray
+
+
+def _speaker_keys(speakers: pd.Series) -> np.ndarray:
+    # Sort speakers to treat "1-2" and "2-1" FTOs together
+    codes, uniques = pd.factorize(speakers.astype(str))
+    keys = np.array(["".join(sorted(speaker)) for speaker in uniques], dtype=object)
+    return keys[codes]
+
+
+def _sorted_times(df: pd.DataFrame) -> np.ndarray:
+    """(start, end) per row, swapped where end < start (e.g. negative FTOs).
+
+    Follows ``sorted`` in :func:`compute_overlap_ratio`, which leaves a pair
+    containing NaN unchanged.
+    """
+    start = df["start_sec"].to_numpy(dtype=float)
+    end = df["end_sec"].to_numpy(dtype=float)
+    swap = end < start
+    return np.stack([np.where(swap, end, start), np.where(swap, start, end)], axis=1)
+
+
+def _overlap_ratios(ref_times: np.ndarray, est_times: np.ndarray) -> np.ndarray:
+    """Vectorized :func:`compute_overlap_ratio` over aligned (start, end) rows.
+
+    The builtin ``min``/``max`` of the scalar version are spelled out so that
+    NaN times give the same results.
+    """
+    (s_ref, e_ref), (s_est, e_est) = ref_times.T, est_times.T
+    overlap = np.where(e_est < e_ref, e_est, e_ref) - np.where(
+        s_est > s_ref, s_est, s_ref
+    )
+    intersection = np.where(overlap > 0, overlap, 0.0)
+    union = np.where(e_est > e_ref, e_est, e_ref) - np.where(
+        s_est < s_ref, s_est, s_ref
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return intersection / union
+
+
+def _all_pairs(est_rows: np.ndarray, ref_rows: np.ndarray) -> Tuple[np.ndarray, ...]:
+    return np.repeat(est_rows, len(ref_rows)), np.tile(ref_rows, len(est_rows))
+
+
+def _candidate_pairs(
+    df_ref: pd.DataFrame,
+    df_est: pd.DataFrame,
+    ref_times: np.ndarray,
+    est_times: np.ndarray,
+    min_overlap_ratio: float,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Pairs of (estimated, reference) turns that can reach ``min_overlap_ratio``.
+
+    Only turns of the same type and speaker are compared. With a positive
+    ``min_overlap_ratio`` a pair must also overlap in time, which an interval
+    index per (type, speaker) finds without comparing all pairs.
+    """
+    ref_keys = pd.MultiIndex.from_arrays(
+        [df_ref["type"].to_numpy(), _speaker_keys(df_ref["speaker"])]
+    )
+    est_keys = pd.MultiIndex.from_arrays(
+        [df_est["type"].to_numpy(), _speaker_keys(df_est["speaker"])]
+    )
+    ref_groups = pd.Series(np.arange(len(df_ref))).groupby(ref_keys.to_flat_index())
+    est_groups = dict(
+        list(pd.Series(np.arange(len(df_est))).groupby(est_keys.to_flat_index()))
+    )
+    ref_valid = ~np.isnan(ref_times).any(axis=1)
+    est_valid = ~np.isnan(est_times).any(axis=1)
+
+    est_parts, ref_parts = [], []
+    for key, ref_rows in ref_groups:
+        # Missing types never match (NaN != NaN)
+        if key not in est_groups or pd.isna(key[0]):
+            continue
+        ref_rows = ref_rows.to_numpy()
+        est_rows = est_groups[key].to_numpy()
+
+        if min_overlap_ratio <= 0:
+            # Even disjoint turns match, so every pair is a candidate
+            pairs = [_all_pairs(est_rows, ref_rows)]
+        else:
+            ref_ok = ref_rows[ref_valid[ref_rows]]
+            est_ok = est_rows[est_valid[est_rows]]
+            index = IntervalIndex.from_arrays(
+                ref_times[ref_ok, 0], ref_times[ref_ok, 1]
+            )
+            query, found = index.overlapping(est_times[est_ok, 0], est_times[est_ok, 1])
+            # Turns with missing times are compared with the whole group
+            pairs = [
+                (est_ok[query], ref_ok[found]),
+                _all_pairs(est_rows[~est_valid[est_rows]], ref_rows),
+                _all_pairs(est_ok, ref_rows[~ref_valid[ref_rows]]),
+            ]
+        est_parts += [est for est, _ref in pairs]
+        ref_parts += [ref for _est, ref in pairs]
+
+    if not est_parts:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return (
+        np.concatenate(est_parts).astype(np.int64),
+        np.concatenate(ref_parts).astype(np.int64),
+    )
+
+
+def _keep_best(matches: TurnMatches, by_est: bool) -> np.ndarray:
+    """Mask keeping the highest-ratio match per estimated (or reference) turn.
+
+    Ties go to the lowest reference (or estimated) position, like ``argmax``.
+    """
+    owner = matches.est_idx if by_est else matches.ref_idx
+    other = matches.ref_idx if by_est else matches.est_idx
+    order = np.lexsort((other, -matches.overlap_ratio, owner))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = owner[order][1:] != owner[order][:-1]
+    keep = np.zeros(len(order), dtype=bool)
+    keep[order[first]] = True
+    return keep
+
+
+@dataclass
+class TurnCandidates:
+    """Overlap ratios of all pairs that can match, computed once per table pair.
+
+    Candidates built for ``min_overlap_ratio`` can be matched at any threshold
+    at least as high (any positive threshold if it is positive), so curves
+    over many thresholds only threshold the stored ratios.
+    """
+
+    n_ref: int
+    n_est: int
+    est_idx: np.ndarray
+    ref_idx: np.ndarray
+    overlap_ratio: np.ndarray
+    min_overlap_ratio: float
+
+    @classmethod
+    def from_tables(
+        cls, df_ref: pd.DataFrame, df_est: pd.DataFrame, min_overlap_ratio: float
+    ) -> TurnCandidates:
+        ref_times = _sorted_times(df_ref)
+        est_times = _sorted_times(df_est)
+        est_idx, ref_idx = _candidate_pairs(
+            df_ref, df_est, ref_times, est_times, min_overlap_ratio
+        )
+        ratio = _overlap_ratios(ref_times[ref_idx], est_times[est_idx])
+        return cls(len(df_ref), len(df_est), est_idx, ref_idx, ratio, min_overlap_ratio)
+
+    def match(
+        self, min_overlap_ratio: float, suppress_warnings: bool = False
+    ) -> TurnMatches:
+        """
+        Match estimated to reference turns at ``min_overlap_ratio``.
+
+        Pairs whose overlap ratio reaches ``min_overlap_ratio`` match. An
+        estimated turn with several matches keeps its closest one; then a
+        reference turn that had several matches keeps its closest remaining one.
+
+        Args:
+            min_overlap_ratio: Minimum overlap ratio required for matching turns.
+            suppress_warnings: If True, suppresses warning messages. Defaults to
+                False.
+
+        Returns:
+            The resolved matches.
+        """
+        if min_overlap_ratio <= 0 < self.min_overlap_ratio:
+            raise ValueError(
+                f"candidates for min_overlap_ratio={self.min_overlap_ratio} lack "
+                f"the disjoint pairs needed at {min_overlap_ratio}"
+            )
+        est_idx, ref_idx, ratio = self.est_idx, self.ref_idx, self.overlap_ratio
+
+        is_match = ratio >= min_overlap_ratio
+        matches = TurnMatches(est_idx[is_match], ref_idx[is_match], ratio[is_match])
+
+        matches_to_ref = np.bincount(matches.est_idx, minlength=self.n_est)
+        matches_to_est = np.bincount(matches.ref_idx, minlength=self.n_ref)
+
+        # Resolve multiple matches to ground truth events
+        if np.any(matches_to_ref > 1):
+            if not suppress_warnings:
+                warnings.warn("Multiple matches found for a single ground truth event.")
+                for i_est in np.flatnonzero(matches_to_ref > 1):
+                    print(
+                        f"Ground truth event {i_est} has "
+                        f"{int(matches_to_ref[i_est])} matches."
+                    )
+                    print(
+                        "Keeping only the closest match in terms of overlapping ratio."
+                    )
+                print("----------------------------")
+
+            keep = _keep_best(matches, by_est=True)
+            matches = TurnMatches(
+                matches.est_idx[keep],
+                matches.ref_idx[keep],
+                matches.overlap_ratio[keep],
+            )
+
+        # Resolve multiple matches to estimated events
+        if np.any(matches_to_est > 1):
+            if not suppress_warnings:
+                warnings.warn("Multiple matches found for a single estimated event.")
+                for i_ref in np.flatnonzero(matches_to_est > 1):
+                    print(
+                        f"Estimated event {i_ref} has "
+                        f"{int(matches_to_est[i_ref])} matches."
+                    )
+                    print(
+                        "Keeping only the closest match in terms of overlapping ratio."
+                    )
+                print("----------------------------")
+
+            ambiguous = matches_to_est[matches.ref_idx] > 1
+            keep = ~ambiguous | _keep_best(matches, by_est=False)
+
+            # A reference turn whose matching estimated turns all kept a different
+            # reference turn above falls back to the first estimated turn, as the
+            # argmax over an all -inf column did
+            orphaned = np.setdiff1d(
+                np.flatnonzero(matches_to_est > 1), matches.ref_idx[keep]
+            )
+            from_first = est_idx == 0
+            fallback_ratio = (
+                pd.Series(ratio[from_first], index=ref_idx[from_first])
+                .reindex(orphaned)
+                .to_numpy(dtype=float)
+            )
+            matches = TurnMatches(
+                np.concatenate(
+                    [matches.est_idx[keep], np.zeros(len(orphaned), dtype=np.int64)]
+                ),
+                np.concatenate([matches.ref_idx[keep], orphaned]),
+                np.concatenate([matches.overlap_ratio[keep], fallback_ratio]),
+            )
+
+        return matches
+
+
+def match_turns(
+    df_ref: pd.DataFrame,
+    df_est: pd.DataFrame,
+    min_overlap_ratio: float,
+    suppress_warnings: bool = False,
+) -> TurnMatches:
+    """
+    Match estimated to reference turns by overlap ratio.
+
+    See :meth:`TurnCandidates.match`.
+
+    Args:
+        df_ref: Ground truth turns DataFrame.
+        df_est: Estimated turns DataFrame.
+        min_overlap_ratio: Minimum overlap ratio required for matching turns.
+        suppress_warnings: If True, suppresses warning messages. Defaults to False.
+
+    Returns:
+        The resolved matches.
+    """
+    candidates = TurnCandidates.from_tables(df_ref, df_est, min_overlap_ratio)
+    return candidates.match(min_overlap_ratio, suppress_warnings)
+
+
 def compute_turn_errors(
     df_ref: pd.DataFrame,
     df_est: pd.DataFrame,
@@ -54,6 +351,10 @@ def compute_turn_errors(
     Returns the ground truth table augmented with detection status and
     timing differences, plus any false positive (unmatched estimated) turns.
 
+    Only pairs of the same type and speaker that overlap in time are
+    compared (see :func:`match_turns`), so the cost grows with the number of
+    overlapping pairs rather than with ``n_ref * n_est``.
+
     Args:
         df_ref: Ground truth turns DataFrame with columns:
             - speaker: Speaker identifier
@@ -76,154 +377,35 @@ def compute_turn_errors(
     n_ref = len(df_ref)
     n_est = len(df_est)
 
-    # Initialize overlap ratio matrix
-    overlap_matrix = np.full((n_est, n_ref), np.nan)
-
-    for i_ref in range(n_ref):
-        for i_est in range(n_est):
-            # Sort speakers to treat "1-2" and "2-1" FTOs together
-            speaker_ref = "".join(sorted(str(df_ref.iloc[i_ref]["speaker"])))
-            speaker_est = "".join(sorted(str(df_est.iloc[i_est]["speaker"])))
-
-            # Compute overlap ratio only if type and speaker match
-            if (
-                df_ref.iloc[i_ref]["type"] == df_est.iloc[i_est]["type"]
-                and speaker_ref == speaker_est
-            ):
-                overlap_matrix[i_est, i_ref] = compute_overlap_ratio(
-                    (df_ref.iloc[i_ref]["start_sec"], df_ref.iloc[i_ref]["end_sec"]),
-                    (df_est.iloc[i_est]["start_sec"], df_est.iloc[i_est]["end_sec"]),
-                )
-
-    # Compute duration differences
-    duration_delta = (
-        df_ref["duration_sec"].values[np.newaxis, :]
-        - df_est["duration_sec"].values[:, np.newaxis]
-    )
-
-    start_delta = (
-        df_ref["start_sec"].values[np.newaxis, :]
-        - df_est["start_sec"].values[:, np.newaxis]
-    )
-
-    end_delta = (
-        df_ref["end_sec"].values[np.newaxis, :]
-        - df_est["end_sec"].values[:, np.newaxis]
-    )
-
-    # Build match matrix
-    match_matrix = overlap_matrix >= min_overlap_ratio
-
-    # Count matches per reference and estimated turn
-    matches_to_ref = np.nansum(match_matrix, axis=1)
-    matches_to_est = np.nansum(match_matrix, axis=0)
-
-    # Resolve multiple matches to ground truth events
-    if not np.all(matches_to_ref <= 1):
-        if not suppress_warnings:
-            warnings.warn("Multiple matches found for a single ground truth event.")
-
-        for i_est in range(n_est):
-            if matches_to_ref[i_est] > 1:
-                if not suppress_warnings:
-                    print(
-                        f"Ground truth event {i_est} has "
-                        f"{int(matches_to_ref[i_est])} matches."
-                    )
-                    print("Keeping only the closest match in terms of overlapping ratio.")
-
-                # Find best match (highest overlap ratio among matches)
-                masked_overlap = np.where(
-                    match_matrix[i_est, :], overlap_matrix[i_est, :], -np.inf
-                )
-                closest_match = np.argmax(masked_overlap)
-                match_matrix[i_est, :] = False
-                match_matrix[i_est, closest_match] = True
-
-        if not suppress_warnings:
-            print("----------------------------")
-
-    # Resolve multiple matches to estimated events
-    if not np.all(matches_to_est <= 1):
-        if not suppress_warnings:
-            warnings.warn("Multiple matches found for a single estimated event.")
-
-        for i_ref in range(n_ref):
-            if matches_to_est[i_ref] > 1:
-                if not suppress_warnings:
-                    print(
-                        f"Estimated event {i_ref} has "
-                        f"{int(matches_to_est[i_ref])} matches."
-                    )
-                    print("Keeping only the closest match in terms of overlapping ratio.")
-
-                # Find best match (highest overlap ratio among matches)
-                masked_overlap = np.where(
-                    match_matrix[:, i_ref], overlap_matrix[:, i_ref], -np.inf
-                )
-                closest_match = np.argmax(masked_overlap)
-                match_matrix[:, i_ref] = False
-                match_matrix[closest_match, i_ref] = True
-
-        if not suppress_warnings:
-            print("----------------------------")
-
-    # Build error matrix with duration differences for matched turns
-    duration_delta_matrix = np.full_like(duration_delta, np.nan)
-    duration_delta_matrix[match_matrix] = duration_delta[match_matrix]
-
-    start_delta_matrix = np.full_like(start_delta, np.nan)
-    start_delta_matrix[match_matrix] = start_delta[match_matrix]
-
-    end_delta_matrix = np.full_like(end_delta, np.nan)
-    end_delta_matrix[match_matrix] = end_delta[match_matrix]
-
-    # Handle true positives and false negatives
-    detected_list = []
-    duration_delta_list = []
-    start_delta_list = []
-    end_delta_list = []
-
-    for i_ref in range(n_ref):
-        is_detected = np.any(match_matrix[:, i_ref])
-        detected_list.append(is_detected)
-
-        if is_detected:
-            duration_delta_list.append(
-                float(np.nansum(duration_delta_matrix[:, i_ref]))
-            )
-            start_delta_list.append(float(np.nansum(start_delta_matrix[:, i_ref])))
-            end_delta_list.append(float(np.nansum(end_delta_matrix[:, i_ref])))
-        else:
-            duration_delta_list.append(np.nan)
-            start_delta_list.append(np.nan)
-            end_delta_list.append(np.nan)
-
-    df_out["detected"] = detected_list
-    df_out["duration_delta"] = duration_delta_list
-    df_out["start_delta"] = start_delta_list
-    df_out["end_delta"] = end_delta_list
+    matches = match_turns(df_ref, df_est, min_overlap_ratio, suppress_warnings)
+    detected = np.bincount(matches.ref_idx, minlength=n_ref) > 0
+
+    df_out["detected"] = detected.tolist()
+    for column, delta_column in (
+        ("duration_sec", "duration_delta"),
+        ("start_sec", "start_delta"),
+        ("end_sec", "end_delta"),
+    ):
+        # Differences (ref - est) of the matched pairs, summed like np.nansum
+        delta = (
+            df_ref[column].to_numpy(dtype=float)[matches.ref_idx]
+            - df_est[column].to_numpy(dtype=float)[matches.est_idx]
+        )
+        delta_sum = np.bincount(
+            matches.ref_idx, weights=np.nan_to_num(delta, nan=0.0), minlength=n_ref
+        )
+        df_out[delta_column] = np.where(detected, delta_sum, np.nan)
 
     # Handle false positives (unmatched estimated turns)
-    false_positives = []
-    for i_est in range(n_est):
-        if not np.any(match_matrix[i_est, :]):
-            false_positives.append(
-                {
-                    "speaker": df_est.iloc[i_est]["speaker"],
-                    "start_sec": df_est.iloc[i_est]["start_sec"],
-                    "end_sec": df_est.iloc[i_est]["end_sec"],
-                    "duration_sec": df_est.iloc[i_est]["duration_sec"],
-                    "type": df_est.iloc[i_est]["type"],
-                    "detected": np.nan,
-                    "duration_delta": np.nan,
-                    "start_delta": np.nan,
-                    "end_delta": np.nan,
-                }
-            )
-
-    if false_positives:
-        df_fp = pd.DataFrame(false_positives)
+    is_false_positive = np.bincount(matches.est_idx, minlength=n_est) == 0
+    if np.any(is_false_positive):
+        df_fp = (
+            df_est[["speaker", "start_sec", "end_sec", "duration_sec", "type"]]
+            .iloc[np.flatnonzero(is_false_positive)]
+            .reset_index(drop=True)
+        )
+        for column in ("detected", "duration_delta", "start_delta", "end_delta"):
+            df_fp[column] = np.nan
         df_out = pd.concat([df_out, df_fp], ignore_index=True)
 
     return df_out
@@ -238,7 +420,8 @@ def tabulate_floor_transfers(
 
     Floor transfers are the gaps between consecutive turns from different
     speakers. This function filters for turns only and creates a table of
-    floor transfer events.
+    floor transfer events. Consecutive turns by the same speaker are reported
+    in a single warning.
 
     Args:
         df_turns: Turns DataFrame with columns:
@@ -261,37 +444,44 @@ def tabulate_floor_transfers(
     turns = df_turns[df_turns["type"] == "turn"].copy()
     turns = turns.sort_values(by="start_sec").reset_index(drop=True)
 
-    n_turns = len(turns)
-    floor_transfers = []  # Collect rows in a list instead of repeatedly concatenating
+    # Compare each turn with the next one
+    speakers = turns["speaker"].to_numpy()
+    same_speaker = speakers[:-1] == speakers[1:]
+
+    # Floor transfers only occur between different speakers
+    if np.any(same_speaker) and not suppress_warnings:
+        indices = np.flatnonzero(same_speaker)
+        shown = ", ".join(str(i) for i in indices[:_MAX_LISTED_INDICES])
+        more = ", ..." if len(indices) > _MAX_LISTED_INDICES else ""
+        warnings.warn(
+            f"Consecutive turns by the same speaker found at {len(indices)} "
+            f"indices ({shown}{more}). "
+            "Expected alternating speakers for floor transfers."
+        )
 
-    for i_turn in range(n_turns - 1):
-        speaker_current = turns.iloc[i_turn]["speaker"]
-        speaker_next = turns.iloc[i_turn + 1]["speaker"]
+    is_transfer = np.flatnonzero(~same_speaker)
+    if len(is_transfer) == 0:
+        return pd.DataFrame(
+            columns=["speaker", "start_sec", "end_sec", "duration_sec", "type"]
+        )
 
-        # Floor transfers only occur between different speakers
-        if speaker_current == speaker_next:
-            if not suppress_warnings:
-                warnings.warn(
-                    f"Consecutive turns by the same speaker found at index {i_turn}. "
-                    "Expected alternating speakers for floor transfers."
-                )
-        else:
-            # Create floor transfer entry
-            speakers = f"{speaker_current}-{speaker_next}"
-            t_start = turns.iloc[i_turn]["end_sec"]
-            t_end = turns.iloc[i_turn + 1]["start_sec"]
-            duration = t_end - t_start
-
-            floor_transfers.append({
-                "speaker": speakers,
-                "start_sec": t_start,
-                "end_sec": t_end,
-                "duration_sec": duration,
-                "type": "FTO",
-            })
-
-    # Create DataFrame from collected rows (more efficient and avoids FutureWarning)
-    df_fto = pd.DataFrame(floor_transfers) if floor_transfers else pd.DataFrame(columns=["speaker", "start_sec", "end_sec", "duration_sec", "type"])
+    speaker_pairs = [
+        f"{speaker_current}-{speaker_next}"
+        for speaker_current, speaker_next in zip(
+            speakers[is_transfer], speakers[is_transfer + 1]
+        )
+    ]
+    t_start = turns["end_sec"].to_numpy()[is_transfer]
+    t_end = turns["start_sec"].to_numpy()[is_transfer + 1]
+    df_fto = pd.DataFrame(
+        {
+            "speaker": speaker_pairs,
+            "start_sec": t_start,
+            "end_sec": t_end,
+            "duration_sec": t_end - t_start,
+            "type": "FTO",
+        }
+    )
 
     return df_fto
 
@@ -325,6 +515,47 @@ def print_error_summary(err: dict) -> None:
         )
 
 
+def _with_floor_transfers(
+    df_turns: pd.DataFrame, suppress_warnings: bool = False
+) -> pd.DataFrame:
+    df_fto = tabulate_floor_transfers(df_turns, suppress_warnings)
+    return pd.concat([df_turns, df_fto], ignore_index=True)
+
+
+def _detection_metrics(tp: int, fp: int, fn: int) -> dict:
+    return {
+        "precision": tp / (tp + fp) if (tp + fp) > 0 else 0.0,
+        "recall": tp / (tp + fn) if (tp + fn) > 0 else 0.0,
+    }
+
+
+def _delta_statistics(
+    duration_delta: np.ndarray, start_delta: np.ndarray, end_delta: np.ndarray
+) -> dict:
+    """Mean and 5 %/95 % quantiles of the absolute deltas of detected turns."""
+    if len(duration_delta) == 0:
+        return {key: 0.0 for key in _DELTA_STATISTICS}
+
+    stats = {}
+    for name, deltas in (
+        ("duration_delta", duration_delta),
+        ("start_delta", start_delta),
+        ("end_delta", end_delta),
+    ):
+        abs_deltas = np.abs(deltas.astype(float))
+        stats[f"{name}_mean_abs"] = abs_deltas.mean()
+        stats[f"{name}_p95_abs"], stats[f"{name}_p05_abs"] = np.quantile(
+            abs_deltas, [0.95, 0.05]
+        )
+
+    start_end = np.abs(np.concatenate([start_delta, end_delta]).astype(float))
+    stats["start_end_delta_mean_abs"] = np.mean(start_end)
+    stats["start_end_p95_abs"], stats["start_end_p05_abs"] = np.quantile(
+        start_end, [0.95, 0.05]
+    )
+    return {key: stats[key] for key in _DELTA_STATISTICS}
+
+
 def compute_all_errors(
     df_ref: pd.DataFrame,
     df_est: pd.DataFrame,
@@ -354,11 +585,8 @@ def compute_all_errors(
 
     # turn_errors_df = compute_turn_errors(df_ref, df_est, min_overlap_ratio)
 
-    df_fto_ref = tabulate_floor_transfers(df_ref, suppress_warnings)
-    df_fto_est = tabulate_floor_transfers(df_est, suppress_warnings)
-
-    df_ref_cat = pd.concat([df_ref, df_fto_ref], ignore_index=True)
-    df_est_cat = pd.concat([df_est, df_fto_est], ignore_index=True)
+    df_ref_cat = _with_floor_transfers(df_ref, suppress_warnings)
+    df_est_cat = _with_floor_transfers(df_est, suppress_warnings)
                            
     err_df = compute_turn_errors(df_ref_cat, df_est_cat, min_overlap_ratio, suppress_warnings)
 
@@ -376,53 +604,107 @@ def compute_all_errors(
         # False positives: detected=NaN
         fp = type_df["detected"].isna().sum()
 
-        precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-        recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
-
-        detected_df = type_df[type_df["detected"] == True] 
+        detected_df = type_df[type_df["detected"] == True]
+        err[type] = {
+            **_detection_metrics(tp, fp, fn),
+            **_delta_statistics(
+                detected_df["duration_delta"].to_numpy(),
+                detected_df["start_delta"].to_numpy(),
+                detected_df["end_delta"].to_numpy(),
+            ),
+        }
 
-        duration_delta_mean_abs = detected_df["duration_delta"].abs().mean() if len(detected_df) > 0 else 0.0 
-        duration_delta_p95_abs = detected_df["duration_delta"].abs().quantile(0.95) if len(detected_df) > 0 else 0.0
-        duration_delta_p05_abs = detected_df["duration_delta"].abs().quantile(0.05) if len(detected_df) > 0 else 0.0
+    return err, err_df
 
-        start_delta_mean_abs = detected_df["start_delta"].abs().mean() if len(detected_df) > 0 else 0.0
-        start_delta_p95_abs = detected_df["start_delta"].abs().quantile(0.95) if len(detected_df) > 0 else 0.0
-        start_delta_p05_abs = detected_df["start_delta"].abs().quantile(0.05) if len(detected_df) > 0 else 0.0
 
-        end_delta_mean_abs = detected_df["end_delta"].abs().mean() if len(detected_df) > 0 else 0.0
-        end_delta_p95_abs = detected_df["end_delta"].abs().quantile(0.95) if len(detected_df) > 0 else 0.0
-        end_delta_p05_abs = detected_df["end_delta"].abs().quantile(0.05) if len(detected_df) > 0 else 0.0
+def compute_threshold_curves(
+    df_ref: pd.DataFrame,
+    df_est: pd.DataFrame,
+    min_overlap_ratios: Sequence[float],
+    suppress_warnings: bool = True,
+) -> pd.DataFrame:
+    """
+    Compute the metrics of :func:`compute_all_errors` for many thresholds.
 
-        start_end_delta_mean_abs = np.mean(np.concatenate(
-            [detected_df["start_delta"].abs().values, detected_df["end_delta"].abs().values]
-        )) if len(detected_df) > 0 else 0.0
+    Floor transfers and candidate overlap ratios are computed once, for the
+    lowest threshold; every threshold then only selects and resolves matches
+    among the stored candidates. The metrics equal those of separate
+    :func:`compute_all_errors` calls.
 
-        start_end_p95_abs = np.quantile(np.concatenate(
-            [detected_df["start_delta"].abs().values, detected_df["end_delta"].abs().values]), 0.95
-        ) if len(detected_df) > 0 else 0.0
+    Args:
+        df_ref: Ground truth turns DataFrame.
+        df_est: Estimated turns DataFrame.
+        min_overlap_ratios: Thresholds to evaluate.
+        suppress_warnings: If True (default), suppresses warning messages.
 
-        start_end_p05_abs = np.quantile(np.concatenate(
-            [detected_df["start_delta"].abs().values, detected_df["end_delta"].abs().values]), 0.05
-        ) if len(detected_df) > 0 else 0.0
+    Returns:
+        One row per threshold and turn type with ``min_overlap_ratio``,
+        ``type``, ``tp``, ``fp``, ``fn``, precision, recall and the timing
+        statistics of :func:`compute_all_errors`.
+    """
+    df_ref_cat = _with_floor_transfers(df_ref, suppress_warnings)
+    df_est_cat = _with_floor_transfers(df_est, suppress_warnings)
+    candidates = TurnCandidates.from_tables(
+        df_ref_cat, df_est_cat, float(np.min(min_overlap_ratios))
+    )
 
-        err[type] = {
-            "precision": precision,
-            "recall": recall,
-            "duration_delta_mean_abs": duration_delta_mean_abs,
-            "duration_delta_p95_abs": duration_delta_p95_abs,
-            "duration_delta_p05_abs": duration_delta_p05_abs,
-            "start_delta_mean_abs": start_delta_mean_abs,
-            "end_delta_mean_abs": end_delta_mean_abs,
-            "start_delta_p95_abs": start_delta_p95_abs,
-            "start_delta_p05_abs": start_delta_p05_abs,
-            "end_delta_p95_abs": end_delta_p95_abs,
-            "end_delta_p05_abs": end_delta_p05_abs,
-            "start_end_delta_mean_abs": start_end_delta_mean_abs,
-            "start_end_p95_abs": start_end_p95_abs,
-            "start_end_p05_abs": start_end_p05_abs,
+    types = pd.concat([df_ref_cat["type"], df_est_cat["type"]], ignore_index=True)
+    codes, type_names = pd.factorize(types)
+    ref_codes, est_codes = codes[: len(df_ref_cat)], codes[len(df_ref_cat) :]
+    columns = ("duration", "start", "end")
+    ref_values = {c: df_ref_cat[f"{c}_sec"].to_numpy(dtype=float) for c in columns}
+    est_values = {c: df_est_cat[f"{c}_sec"].to_numpy(dtype=float) for c in columns}
+
+    rows = []
+    for min_overlap_ratio in min_overlap_ratios:
+        matches = candidates.match(min_overlap_ratio, suppress_warnings)
+        detected = np.bincount(matches.ref_idx, minlength=len(df_ref_cat)) > 0
+        is_fp = np.bincount(matches.est_idx, minlength=len(df_est_cat)) == 0
+        # Differences (ref - est) per reference turn, summed like np.nansum
+        deltas = {
+            c: np.bincount(
+                matches.ref_idx,
+                weights=np.nan_to_num(
+                    ref_values[c][matches.ref_idx] - est_values[c][matches.est_idx]
+                ),
+                minlength=len(df_ref_cat),
+            )
+            for c in columns
         }
 
-    return err, err_df
+        n_types = len(type_names)
+        tp = np.bincount(ref_codes[detected & (ref_codes >= 0)], minlength=n_types)
+        fn = np.bincount(ref_codes[~detected & (ref_codes >= 0)], minlength=n_types)
+        fp = np.bincount(est_codes[is_fp & (est_codes >= 0)], minlength=n_types)
+        for code, turn_type in enumerate(type_names):
+            if tp[code] + fn[code] + fp[code] == 0:
+                continue
+            is_type = detected & (ref_codes == code)
+            rows.append(
+                {
+                    "min_overlap_ratio": min_overlap_ratio,
+                    "type": turn_type,
+                    "tp": int(tp[code]),
+                    "fp": int(fp[code]),
+                    "fn": int(fn[code]),
+                    **_detection_metrics(tp[code], fp[code], fn[code]),
+                    **_delta_statistics(*(deltas[c][is_type] for c in columns)),
+                }
+            )
+
+    return pd.DataFrame(
+        rows,
+        columns=[
+            "min_overlap_ratio",
+            "type",
+            "tp",
+            "fp",
+            "fn",
+            "precision",
+            "recall",
+            *_DELTA_STATISTICS,
+        ],
+    )
 
 
 def replace_labels(df: pd.DataFrame) -> pd.DataFrame:
@@ -442,178 +724,176 @@ def replace_labels(df: pd.DataFrame) -> pd.DataFrame:
         }
     )
 
-def find_embedded_turns(df: pd.DataFrame,t_start,t_end,mask = None) -> bool:
-    # Find turns that are fully embedded within the given time interval and match the mask
-    if mask is None:
-        mask = pd.Series([True] * len(df))
+    return df
 
-    idx_embedded = (df["start_sec"] >= t_start) & (df["end_sec"] <= t_end) & mask
-  
-    return idx_embedded
-    
+
+def _relabel_embedded(df: pd.DataFrame) -> int:
+    """Relabel turns and backchannels by containment, in place.
+
+    Backchannels not contained in a turn or backchannel of another speaker
+    become turns; turns contained in one become backchannels.
+
+    Returns:
+        The number of relabelled entries.
+    """
+    is_labelled = (
+        df["type"].isin({"turn", "backchannel"}).to_numpy()
+        & df["speaker"].notna().to_numpy()
+    )
+    embedded = contained_in_other_group(
+        df, df["speaker"].to_numpy(), is_labelled, is_labelled
+    )
+    to_turn = is_labelled & (df["type"] == "backchannel").to_numpy() & ~embedded
+    to_backchannel = is_labelled & (df["type"] == "turn").to_numpy() & embedded
+    df.loc[to_turn, "type"] = "turn"
+    df.loc[to_backchannel, "type"] = "backchannel"
+    return int(to_turn.sum() + to_backchannel.sum())
+
+
+def _annotate_self_overlap(df: pd.DataFrame) -> None:
+    """Append ``"<label>_"`` to ``OL`` for every overlapping entry of the same speaker.
+
+    Labels are listed in ascending order after any existing ``OL`` value.
+    """
+    ol = df["OL"].fillna("") if "OL" in df.columns else pd.Series("", index=df.index)
+    times = np.sort(df[["start_sec", "end_sec"]].to_numpy(dtype=float), axis=1)
+    valid = ~np.isnan(times).any(axis=1)
+    labels = df.index.to_numpy()
+
+    rows, partners = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for speaker_rows in df.groupby("speaker", sort=False).indices.values():
+        speaker_rows = speaker_rows[valid[speaker_rows]]
+        index = IntervalIndex.from_arrays(
+            times[speaker_rows, 0], times[speaker_rows, 1]
+        )
+        query, found = index.overlapping(times[speaker_rows, 0], times[speaker_rows, 1])
+        query, found = speaker_rows[query], speaker_rows[found]
+        rows.append(query[query != found])
+        partners.append(found[query != found])
+
+    pairs = pd.DataFrame(
+        {"row": np.concatenate(rows), "label": labels[np.concatenate(partners)]}
+    ).sort_values(["row", "label"], kind="stable")
+    tokens = (pairs["label"].astype(str) + "_").groupby(pairs["row"]).agg("".join)
+    ol.iloc[tokens.index.to_numpy()] += tokens.to_numpy()
+    df["OL"] = ol
+
+
+def _merge_speaker_turns(df: pd.DataFrame, speaker: Hashable) -> int:
+    """Merge consecutive turns of ``speaker`` not separated by another speaker.
+
+    A pair of consecutive turns stays apart if a turn of another speaker
+    covers the end of the first, covers the start of the second, or lies in
+    the gap between them. Otherwise the first turn is extended to the end of
+    the second, which is marked for deletion; a turn that is itself merged
+    into its predecessor is kept when it absorbs its own successor. Chains of
+    turns thus halve in every sweep of :func:`postprocess_turn_df`.
+
+    Returns:
+        The number of merged pairs.
+    """
+    is_turn = (df["type"] == "turn").to_numpy()
+    is_speaker = (df["speaker"] == speaker).to_numpy()
+    if np.count_nonzero(is_turn & is_speaker) < 2:
+        return 0
+    rows = df[is_turn & is_speaker].sort_values(by="start_sec").index
+    starts = df.loc[rows, "start_sec"].to_numpy(dtype=float)
+    ends = df.loc[rows, "end_sec"].to_numpy(dtype=float)
+
+    interlocutor = IntervalIndex.from_frame(df, is_turn & ~is_speaker)
+    current_end, next_start = ends[:-1], starts[1:]
+    merge = ~(
+        interlocutor.contains(current_end, current_end)
+        | interlocutor.contains(next_start, next_start)
+        | interlocutor.encloses(current_end, next_start)
+    )
+    if not merge.any():
+        return 0
+
+    current, following = rows[:-1][merge], rows[1:][merge]
+    if "transcript" in df.columns:
+        texts = df.loc[rows, "transcript"].to_numpy()
+        df.loc[current, "transcript"] = [
+            f"{text} {next_text}".strip()
+            for text, next_text in zip(texts[:-1][merge], texts[1:][merge])
+        ]
+    df.loc[current, "end_sec"] = df.loc[following, "end_sec"].to_numpy()
+    df.loc[current, "duration_sec"] = (
+        df.loc[current, "end_sec"].to_numpy() - df.loc[current, "start_sec"].to_numpy()
+    )
+    df.loc[following.difference(current), "type"] = "delete"
+    return int(merge.sum())
+
+
+def _has_consecutive_turns(df: pd.DataFrame) -> bool:
+    """Whether two turns in a row (by start time) belong to the same speaker."""
+    speakers = df[df["type"] == "turn"].sort_values(by="start_sec")["speaker"]
+    return bool(np.any(speakers.to_numpy()[:-1] == speakers.to_numpy()[1:]))
 
 
 def postprocess_turn_df(
     df: pd.DataFrame,
-    max_iter = 20,
-    rec_iter = 0,
+    max_iter: int = 20,
+    annotate_self_overlap: bool = True,
 ) -> pd.DataFrame:
-    
-    if rec_iter == 0:
-        print("-"*60)
-    print(f">>> Starting postprocessing - recursion iteration {rec_iter}")
+    """
+    Clean up a turns table before error analysis.
+
+    Label variants are normalised (see :func:`replace_labels`). Then, until
+    nothing changes (or ``max_iter`` sweeps):
+
+    - backchannels not contained in an interlocutor turn or backchannel become
+      turns, and turns contained in one become backchannels;
+    - consecutive turns of a speaker that no interlocutor turn separates are
+      merged.
 
+    Sweeps stop once no two consecutive turns share a speaker or a sweep
+    changes nothing. Every sweep is a pass over start-sorted arrays per
+    speaker, and chains of mergeable turns halve per sweep, so only a few
+    sweeps are needed. Any number of speakers is supported.
+
+    Args:
+        df: Turns DataFrame with speaker, start_sec, end_sec, duration_sec and
+            type columns, and optionally transcript and OL.
+        max_iter: Maximum number of sweeps.
+        annotate_self_overlap: Append the labels of overlapping entries of the
+            same speaker (``"3_7_"``) to the ``OL`` column, created if missing.
+
+    Returns:
+        The processed table, sorted by start time with a fresh index.
+    """
+    print("-" * 60)
     df = replace_labels(df)
-    
-    speakers = ["P1", "P2"]
-    for ip in (0, 1):
-        p_bc = speakers[ip]
-        p_int = speakers[1 - ip]  # Get the other speaker
-
-        mask_speaker = df["speaker"] == p_bc
-        mask_backchannel = (df["type"] == "backchannel") & (df["speaker"] == p_bc)
-        mask_turn = (df["type"] == "turn") & (df["speaker"] == p_bc)
-        mask_interlocutor_turn = (df["type"].isin({"turn", "backchannel"})) & (df["speaker"] == p_int)
-
-        # Treat backchannels as turns if they're not embedded in an interlocutor turn
-        for idx_bc in df[mask_backchannel].index:
-            t_start_bc = df.loc[idx_bc, "start_sec"]
-            t_end_bc = df.loc[idx_bc, "end_sec"]
-
-            # Check if backchannel is fully contained within any interlocutor turn
-            if not np.any(
-                (mask_interlocutor_turn)
-                & (df["start_sec"] <= t_start_bc)
-                & (df["end_sec"] >= t_end_bc)
-            ):
-                df.loc[idx_bc, "type"] = "turn"
-        
-        # Treat turns as backchannels if they're fully embedded in an interlocutor turn
-        for idx_turn in df[mask_turn].index:
-            t_start_turn = df.loc[idx_turn, "start_sec"]
-            t_end_turn = df.loc[idx_turn, "end_sec"]
-
-            # Check if turn is fully contained within any interlocutor turn
-            if np.any(
-                (mask_interlocutor_turn)
-                & (df["start_sec"] <= t_start_turn)
-                & (df["end_sec"] >= t_end_turn)
-            ):
-                df.loc[idx_turn, "type"] = "backchannel"
-
-        # Mark entry if any overlap with another entry by the same speaker
-        if rec_iter == 0:
-          for i in df[mask_speaker].index:
-              t_start_i = df.loc[i, "start_sec"]
-              t_end_i = df.loc[i, "end_sec"]
-              for j in df[mask_speaker].index:
-                  if j >= i:
-                      continue  # Avoid redundant checks and self-comparison
-                  t_start_j = df.loc[j, "start_sec"]
-                  t_end_j = df.loc[j, "end_sec"]
-
-                  overlap_ratio = compute_overlap_ratio((t_start_i, t_end_i), (t_start_j, t_end_j))
-                  if overlap_ratio > 0:  # If overlap is more than 0, append self-overlap index to OL column
-                      df.loc[i, "OL"] = df.loc[i].get("OL", "") + f"{j}_"
-                      df.loc[j, "OL"] = df.loc[j].get("OL", "") + f"{i}_"
-                  else:
-                      df.loc[i, "OL"] = df.loc[i].get("OL", "")  # Keep existing OL value if no overlap
-                      df.loc[j, "OL"] = df.loc[j].get("OL", "")  # Keep existing OL value if no overlap
-
-
-    # Combine consecutive turns of the same speaker if no interlocutor turn between them
-    for speaker in speakers:
-        # print(f"Processing speaker {speaker} for turn combination...")
-        mask_speaker_turn = (df["type"] == "turn") & (df["speaker"] == speaker)
-        # print(f"Found {mask_speaker_turn.sum()} turns for speaker {speaker} before combination.")
-        df_speaker_turns = df[mask_speaker_turn].sort_values(by="start_sec")
-        
-
-        for i in range(len(df_speaker_turns) - 1):
-            # print(f"Checking turns {i} and {i+1} for speaker {speaker}...")
-            
-            # print("-----------------")
-            current_turn = df_speaker_turns.iloc[i]
-            next_turn = df_speaker_turns.iloc[i + 1]
-
-            # Check if any interlocutor turn exists between current and next turn
-            mask_interlocutor_turn = (df["type"] == "turn") & (df["speaker"] != speaker)
-
-            merge_turns = True
-            for idx_inter in df[mask_interlocutor_turn].index:
-                
-                t_start_inter = df.loc[idx_inter, "start_sec"]
-                t_end_inter = df.loc[idx_inter, "end_sec"]
-
-                if t_start_inter <= current_turn["end_sec"] and t_end_inter >= current_turn["end_sec"]:
-                    # print(f"Interlocutor turn starting at {t_start_inter} crosses current turn end time. Not merging.")
-                    merge_turns = False
-                    break
-                
-                elif t_start_inter <= next_turn["start_sec"] and t_end_inter >= next_turn["start_sec"]:
-                    # print(f"Interlocutor turn starting at {t_start_inter} crosses next turn start time. Not merging.")
-                    merge_turns = False
-                    break
-                
-                elif t_start_inter >= current_turn["end_sec"] and t_end_inter <= next_turn["start_sec"]:
-                    # print(f"Interlocutor turn starting at {t_start_inter} is fully contained between current and next turn. Not merging.")
-                    merge_turns = False
-                    break
-                # else:
-                    # print(f"Interlocutor turn starting at {t_start_inter} does not cross current or next turn. Checking next interlocutor turn.")
-                   
-            # print(f"After checking interlocutor turns, merge_turns={merge_turns} for turns {i} and {i+1} of speaker {speaker}.")
-            # print("---")
-
-            if merge_turns:
-                # print(f"No interlocutor turn crosses current or next turn. Merging turns {i} and {i+1} for speaker {speaker}.")
-                # No interlocutor turn crosses start or end, so merge turns
-                df.loc[df_speaker_turns.index[i], "end_sec"] = df_speaker_turns.iloc[i + 1]["end_sec"]
-                df.loc[df_speaker_turns.index[i], "duration_sec"] = (
-                    df.loc[df_speaker_turns.index[i], "end_sec"]
-                    - df.loc[df_speaker_turns.index[i], "start_sec"]
-                )
-                # Merge transcript text if exists
-                if "transcript" in df.columns:
-                    df.loc[df_speaker_turns.index[i], "transcript"] = (
-                        str(df.loc[df_speaker_turns.index[i], "transcript"]) + " " + str(df_speaker_turns.iloc[i + 1].get("transcript", ""))
-                    ).strip()
-
-                df.loc[df_speaker_turns.index[i], "type"] = "turn"
-                # Mark the next turn for deletion
-                df.loc[df_speaker_turns.index[i + 1], "type"] = "delete"
-                turns_merged = turns_merged +1 if 'turns_merged' in locals() else 1
-            
-    df = df[df["type"] != "delete"].sort_values(by="start_sec").reset_index(drop=True)
-    df_turns = df[df["type"] == "turn"].sort_values(by="start_sec")
-    
-    recur = False
-    for i in range(len(df_turns) - 1):  # Check for consecutive turns by the same speaker
-        idx_current = df_turns.index[i]
-        idx_next = df_turns.index[i + 1]
-        current_turn = df.iloc[idx_current]
-        next_turn = df.iloc[idx_next]
-        if current_turn["speaker"] == next_turn["speaker"]:
-            print(f"Consecutive turns by speaker {current_turn['speaker']} found at index {idx_current} and {idx_next}. Running post-processing again to ensure all consecutive turns are merged.")
-            recur = True
-            # print(f"Recursion iteration {rec_iter+1}")
-            # return postprocess_turn_df(df, rec_iter=rec_iter+1)
+    if annotate_self_overlap:
+        _annotate_self_overlap(df)
+
+    speakers = sorted(df["speaker"].dropna().unique(), key=str)
+    for i_sweep in range(max_iter + 1):
+        n_relabelled = _relabel_embedded(df)
+        n_merged = sum(_merge_speaker_turns(df, speaker) for speaker in speakers)
+        df = (
+            df[df["type"] != "delete"]
+            .sort_values(by="start_sec")
+            .reset_index(drop=True)
+        )
+        print(
+            f">>> Post-processing sweep {i_sweep}: {n_relabelled} entries relabelled, "
+            f"{n_merged} turns merged."
+        )
+        if not _has_consecutive_turns(df):
+            print("No consecutive turns found. Post-processing complete.")
+            break
+        if n_relabelled == 0 and n_merged == 0:
+            # Further sweeps would not change anything either
+            print("Remaining consecutive turns cannot be merged.")
             break
-    print(f"Post-processing iteration completed with {turns_merged if 'turns_merged' in locals() else 0} turns merged after {rec_iter} iterations.\n")
-    if rec_iter < max_iter:
-      if recur:
-        return postprocess_turn_df(df, max_iter=max_iter, rec_iter=rec_iter+1)
-      else:
-          print("No consecutive turns found. Post-processing complete.")
-          print("-"*60)
-    else:        
-        print(f"Maximum recursion iterations ({max_iter}) reached. Post-processing terminated.")
-        print("-"*60)
+    else:
+        print(f"Maximum iterations ({max_iter}) reached. Post-processing terminated.")
+    print("-" * 60)
 
     return df
 
 
-
 if __name__ == "__main__":
     # Example usage
     # df_ref = pd.read_csv(
@@ -14,11 +14,29 @@ from typing import Dict, List, Mapping, Tuple, Union
 
 import pandas as pd
 
-from .labeling import classify_transcriptions, merge_turns_with_context
+from .atomic_io import atomic_write
+from .cache_manager import CacheManager
+from .labeling import (
+    BackchannelLexicon,
+    classify_transcriptions,
+    merge_turns_with_context,
+)
 from .merge_turns import create_turns_df_windowed
 from .postprocess_vad import filter_low_energy_segments
-from .transcription import load_whisper_model, transcribe_segments
+from .transcription import (
+    cached_speaker_language,
+    detect_speaker_language,
+    load_whisper_model,
+    transcribe_segments,
+)
 from .vad import SpeechActivityDetector
+from .word_timeline import (
+    assemble_turn_transcriptions,
+    pack_speech_regions,
+    read_word_table,
+    transcribe_words,
+    word_table_path,
+)
 
 EnergyMargin = Union[float, List[float], Tuple[float, ...]]
 
@@ -66,7 +84,8 @@ def _export_to_elan_format(df: pd.DataFrame, output_path: str) -> None:
         )
 
     output_df = pd.DataFrame(output_data)
-    output_df.to_csv(output_path, sep="\t", index=False)
+    with atomic_write(output_path, newline="") as table_file:
+        output_df.to_csv(table_file, sep="\t", index=False)
 
     # Report tiers
     tier_names = sorted(output_df["tier"].unique())
@@ -91,18 +110,30 @@ def process_conversation(
     merge_max_dur: float = 60.0,
     bridge_short_opponent: bool = True,
     transcription_model_name: str = "large-v3",
+    cascade_model_name: str | None = None,
+    assistant_model_name: str | None = None,
     whisper_device: str = "auto",
-    whisper_language: str = "da",
+    whisper_language: str | None = "da",
     whisper_model_batch_size: int = 100,
+    whisper_num_workers: int = 1,
+    whisper_cpu_threads: int | None = None,
+    whisper_autotune: bool = False,
     entropy_threshold: float = 1.5,
+    backchannel_lexicon: str | None = None,
     max_backchannel_dur: float = 1.0,
     max_gap_sec: float = 3.0,
     batch_size: float | None = 30.0,
+    transcription_mode: str = "segments",
+    trim_turn_silence: bool = False,
+    max_turn_silence_sec: float = 0.5,
+    segment_storage: str = "wav",
     interactive_energy_filter: bool = False,
     skip_vad_if_exists: bool = False,
     skip_transcription_if_exists: bool = False,
     min_duration_samples: float = 1600,  # float('inf'): skips transcription
     export_elan: bool = True,
+    cache_max_bytes: int | None = None,
+    cache_max_entries: int | None = None,
 ) -> Dict[str, object]:
     """
     Run the complete VAD→transcription→labeling pipeline for a conversation.
@@ -126,13 +157,50 @@ def process_conversation(
         keep_bridged_segments: If True, preserve segments bridged over as separate
             entries. If False, only keep the merged turns.
         transcription_model_name: Name of the Transcription model to use.
+        cascade_model_name: Optional smaller model (e.g. 'small') that
+            transcribes all segments first; only low-confidence segments are
+            re-transcribed with transcription_model_name.
+        assistant_model_name: Optional draft model (e.g.
+            'distil-whisper/distil-large-v3') for speculative decoding with a
+            transformers model; transcripts are unchanged, decoding is faster.
         whisper_device: Device to run Whisper on ('auto', 'cpu', 'cuda').
-        whisper_language: Language code for transcription.
+        whisper_language: Language code for transcription. 'per-speaker'
+            detects each speaker's language once from their longest turns
+            (longest speech regions in 'words' mode) and caches it in the
+            speaker folder; None lets Whisper detect the language of every
+            segment.
         whisper_model_batch_size: Batch size for Whisper transcription.
+        whisper_num_workers: Number of transcription worker processes, each
+            with its own model. Segments are sharded across workers by total
+            duration (useful for CPU-only hosts with many cores); the main
+            process then loads a model only to detect uncached per-speaker
+            languages. 'segments' mode only.
+        whisper_cpu_threads: Inference threads per worker process. Defaults
+            to the number of cores divided by whisper_num_workers. 'segments'
+            mode only.
+        whisper_autotune: If True, pick the model batch size, compute type
+            and thread count with a short benchmark on first use on a host
+            (cached per host and model); whisper_model_batch_size is ignored.
         entropy_threshold: Threshold for classifying backchannels vs turns.
+        backchannel_lexicon: Language code of a built-in backchannel lexicon
+            ('da' or 'en'). Transcriptions found in it are labeled as
+            backchannels without computing their entropy; None disables it.
         max_backchannel_dur: Maximum duration for backchannel merging.
         max_gap_sec: Maximum gap for merging with context.
         batch_size: Batch size (in seconds) for processing segments.
+        transcription_mode: 'segments' transcribes every merged turn.
+            'words' transcribes each speaker's speech regions once with word
+            timestamps, caches the word table in the speaker folder, and
+            assembles turn transcriptions from it, so reruns with different
+            turn-merging settings need no ASR.
+        trim_turn_silence: If True, remove bridged gaps and opponent speech
+            from each turn's audio before ASR, using the filtered VAD segments
+            (segments mode only).
+        max_turn_silence_sec: Longest internal pause (in seconds) kept when
+            trim_turn_silence is enabled.
+        segment_storage: 'wav' writes one WAV file per segment; 'pcm',
+            'flac' or 'opus' store each speaker's segment audio in a single
+            indexed container instead (segments mode only).
         interactive_energy_filter: If True, interactively adjust energy
             threshold.
         skip_vad_if_exists: Whether to skip VAD/diarization if existing
@@ -140,14 +208,29 @@ def process_conversation(
         skip_transcription_if_exists: If True, skip transcription and
             classification if classified_transcriptions.txt exists.
         min_duration_samples: Minimum duration (in samples) for segments
-            to be transcribed.
+            (speech regions in 'words' mode) to be transcribed.
         export_elan: If True, export final labels to ELAN-compatible
             tab-delimited format (default: True).
+        cache_max_bytes: If set, evict least recently used segment audio
+            after transcription until the segment caches in output_dir fit
+            this many bytes (transcripts are kept).
+        cache_max_entries: If set, same as cache_max_bytes for the number of
+            cache entries.
 
     Returns:
         Dictionary with paths to output files and processed DataFrames.
     """
 
+    if transcription_mode not in {"segments", "words"}:
+        raise ValueError("transcription_mode must be 'segments' or 'words'")
+    if transcription_mode == "words" and (
+        whisper_num_workers > 1 or whisper_cpu_threads is not None
+    ):
+        raise ValueError(
+            "whisper_num_workers and whisper_cpu_threads are only supported with "
+            "transcription_mode='segments'"
+        )
+
     print("Starting conversation processing pipeline...")
     os.makedirs(output_dir, exist_ok=True)
 
@@ -302,7 +385,8 @@ def process_conversation(
         merge_max_dur=merge_max_dur,
         bridge_short_opponent=bridge_short_opponent,
     )
-    turns_df.to_csv(merged_turns_path, sep="\t", index=False)
+    with atomic_write(merged_turns_path, newline="") as table_file:
+        turns_df.to_csv(table_file, sep="\t", index=False)
     print(f"✓ Merged into {len(turns_df)} turns")
 
     print("\n4. Preparing segments for transcription...")
@@ -321,19 +405,133 @@ def process_conversation(
         df_all = pd.read_csv(raw_transcriptions_path, sep="\t")
 
     else:
-        print("\n5. Loading Whisper model and transcribing...")
-        model = load_whisper_model(
-            transcription_model_name=transcription_model_name,
-            device=whisper_device,
-            language=whisper_language,
-            model_batch_size=whisper_model_batch_size,
-        )
-        print("✓ Model loaded")
+        # Word tables are looked up before the model is loaded, so they are keyed
+        # by the settings the model is loaded with
+        word_decoding: Dict[str, object] = {
+            "device": whisper_device,
+            "autotune": whisper_autotune,
+        }
+        if cascade_model_name is not None:
+            word_decoding["cascade"] = cascade_model_name
+        speech_regions: Dict[str, pd.DataFrame] = {}
+
+        def words_path(speaker: str, language: str | None) -> str:
+            return word_table_path(
+                speaker_dirs[speaker],
+                speaker,
+                speech_regions[speaker],
+                transcription_model_name,
+                language=language,
+                decoding=word_decoding,
+                min_duration_samples=int(min_duration_samples),
+            )
+
+        have_word_tables = transcription_mode == "words"
+        if transcription_mode == "words":
+            for speaker in speakers:
+                speech = combined[combined["speaker"] == speaker].rename(
+                    columns={"start": "start_sec", "end": "end_sec"}
+                )
+                speech_regions[speaker] = pack_speech_regions(speech)
+                if whisper_language != "per-speaker":
+                    table_language = whisper_language
+                else:
+                    # Without a cached detection the model has to detect it
+                    table_language = cached_speaker_language(
+                        speech_regions[speaker],
+                        speaker_dirs[speaker],
+                        speaker,
+                        transcription_model_name,
+                    )
+                    if table_language is None:
+                        have_word_tables = False
+                        continue
+                if not os.path.exists(words_path(speaker, table_language)):
+                    have_word_tables = False
+
+        model = None
+        if not have_word_tables:
+            print("\n5. Loading Whisper model and transcribing...")
+            model = load_whisper_model(
+                transcription_model_name=transcription_model_name,
+                device=whisper_device,
+                language=(
+                    None if whisper_language == "per-speaker" else whisper_language
+                ),
+                model_batch_size=whisper_model_batch_size,
+                cascade_model_name=cascade_model_name,
+                assistant_model_name=assistant_model_name,
+                autotune=whisper_autotune,
+                # Worker processes load their own copies when sharding
+                lazy=whisper_num_workers > 1,
+            )
+            print("✓ Model loaded" if model.loaded else "✓ Model configured")
+            if model.autotune_result is not None:
+                tuned = model.autotune_result.config
+                print(
+                    f"✓ Autotuned: compute_type={tuned.compute_type}, "
+                    f"cpu_threads={tuned.cpu_threads}, "
+                    f"model_batch_size={tuned.model_batch_size}"
+                )
+        else:
+            print("\n5. Word tables already exist, assembling turns without ASR.")
 
         all_results: List[Dict[str, object]] = []
         for speaker, audio_path in speakers_audio.items():
-            print(f"Transcribing {speaker} segments...")
             speaker_segments = segments_by_speaker[speaker]
+            # Word tables outlive merge settings, so in words mode the language
+            # is detected from the VAD speech regions rather than the turns
+            language_segments = (
+                speech_regions[speaker]
+                if transcription_mode == "words"
+                else speaker_segments
+            )
+            speaker_language = None
+            if whisper_language == "per-speaker" and model is not None:
+                speaker_language = detect_speaker_language(
+                    model, language_segments, audio_path, speaker_dirs[speaker], speaker
+                )
+                print(f"✓ {speaker} language: {speaker_language}")
+            elif whisper_language == "per-speaker":
+                speaker_language = cached_speaker_language(
+                    language_segments,
+                    speaker_dirs[speaker],
+                    speaker,
+                    transcription_model_name,
+                )
+
+            if transcription_mode == "words":
+                table_path = words_path(
+                    speaker,
+                    (
+                        speaker_language
+                        if whisper_language == "per-speaker"
+                        else whisper_language
+                    ),
+                )
+                if os.path.exists(table_path):
+                    words = read_word_table(table_path)
+                else:
+                    assert model is not None
+                    print(f"Transcribing {speaker} speech with word timestamps...")
+                    words = transcribe_words(
+                        model,
+                        speech_regions[speaker],
+                        audio_path,
+                        speaker_dirs[speaker],
+                        speaker,
+                        batch_size=batch_size,
+                        language=speaker_language,
+                        decoding=word_decoding,
+                        min_duration_samples=int(min_duration_samples),
+                    )
+                all_results.extend(
+                    assemble_turn_transcriptions(speaker_segments, words)
+                )
+                continue
+
+            assert model is not None
+            print(f"Transcribing {speaker} segments...")
             results = transcribe_segments(
                 model=model,
                 segments=speaker_segments.reset_index(drop=True),
@@ -344,17 +542,54 @@ def process_conversation(
                 batch_size=batch_size,
                 compress=True,
                 min_duration_samples=int(min_duration_samples),
+                num_workers=whisper_num_workers,
+                cpu_threads=whisper_cpu_threads,
+                speech_intervals=(
+                    combined[combined["speaker"] == speaker].rename(
+                        columns={"start": "start_sec", "end": "end_sec"}
+                    )
+                    if trim_turn_silence
+                    else None
+                ),
+                max_silence_sec=max_turn_silence_sec,
+                language=speaker_language,
+                segment_storage=segment_storage,
             )
             all_results.extend(results)
 
         print(f"✓ Transcription completed: {len(all_results)} total segments")
+        if model is not None and model.cascade_model is not None:
+            report = model.cascade_stats.report()
+            print(
+                f"✓ Cascade: {report['escalated_fraction']:.1%} of segments "
+                f"({report['escalated_audio_fraction']:.1%} of audio) escalated "
+                f"to {transcription_model_name}, "
+                f"estimated speedup {report['speedup']:.2f}x"
+            )
         df_all = pd.DataFrame(all_results)
-        df_all.to_csv(raw_transcriptions_path, sep="\t", index=False)
+        with atomic_write(raw_transcriptions_path, newline="") as table_file:
+            df_all.to_csv(table_file, sep="\t", index=False)
+
+        if cache_max_bytes is not None or cache_max_entries is not None:
+            gc_report = CacheManager(
+                output_dir, max_bytes=cache_max_bytes, max_entries=cache_max_entries
+            ).gc()
+            print(f"✓ Cache: {gc_report.summary()}")
 
     print("\n6. Classifying transcriptions and merging with context...")
 
-    df_class = classify_transcriptions(df_all, threshold=entropy_threshold)
-    df_class.to_csv(classified_path, sep="\t", index=False)
+    lexicon = (
+        BackchannelLexicon.for_language(backchannel_lexicon)
+        if backchannel_lexicon is not None
+        else None
+    )
+    df_class = classify_transcriptions(
+        df_all, threshold=entropy_threshold, lexicon=lexicon
+    )
+    if lexicon is not None:
+        print(f"✓ Lexicon: {lexicon.stats.summary()}")
+    with atomic_write(classified_path, newline="") as table_file:
+        df_class.to_csv(table_file, sep="\t", index=False)
 
     df_merged_context = merge_turns_with_context(
         df_class,
@@ -362,7 +597,8 @@ def process_conversation(
         max_gap_sec=max_gap_sec,
     )
     final_labels_path = os.path.join(output_dir, "final_labels.txt")
-    df_merged_context.to_csv(final_labels_path, sep="\t", index=False)
+    with atomic_write(final_labels_path, newline="") as table_file:
+        df_merged_context.to_csv(table_file, sep="\t", index=False)
 
     print(f"✓ Final processing completed: {len(df_merged_context)} total segments")
 
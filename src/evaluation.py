@@ -0,0 +1,380 @@
+"""
+Corpus-level evaluation of turn tables.
+
+:func:`compute_all_errors` compares one reference annotation with one estimate.
+:func:`evaluate_corpus` runs it over every (reference, estimate) pair of a
+corpus in a process pool, pools the matched turns, and summarises TP, FP, FN,
+precision, recall and timing deltas per turn type. Confidence intervals come
+from a bootstrap over conversations: every replicate is a vector of resampling
+weights, so all replicates are evaluated with one matrix product. Frame-level
+timeline errors (:mod:`.frame_metrics`) are reported per conversation and pooled.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .compute_turn_errors import compute_all_errors, postprocess_turn_df, replace_labels
+from .frame_metrics import DEFAULT_FRAME_SEC, FrameMetrics, compute_frame_metrics
+
+# Columns of manually annotated label files, which have no header
+_ANNOTATION_COLUMNS = [
+    "speaker",
+    "tier",
+    "start_sec",
+    "end_sec",
+    "duration_sec",
+    "type",
+]
+
+_DELTA_COLUMNS = ("duration_delta", "start_delta", "end_delta")
+
+# (name prefix, delta columns) of the reported absolute delta quantiles
+_QUANTILE_COLUMNS = [(column, [column]) for column in _DELTA_COLUMNS] + [
+    ("start_end", ["start_delta", "end_delta"])
+]
+
+# Metrics of :func:`_metrics`, in summary column order
+_METRIC_NAMES = ["precision", "recall", "f1"] + [
+    f"{column}_mean_abs" for column in (*_DELTA_COLUMNS, "start_end_delta")
+]
+
+_SUMMARY_COLUMNS = (
+    ["type", "conversations", "tp", "fp", "fn"]
+    + [
+        f"{name}{suffix}"
+        for name in _METRIC_NAMES
+        for suffix in ("", "_ci_low", "_ci_high")
+    ]
+    + [
+        f"{prefix}_{quantile}_abs"
+        for prefix, _columns in _QUANTILE_COLUMNS
+        for quantile in ("p05", "p95")
+    ]
+)
+
+
+@dataclass
+class CorpusEvaluation:
+    """Result of :func:`evaluate_corpus`.
+
+    Args:
+        summary: One row per turn type with counts, metrics and their
+            bootstrap confidence intervals.
+        errors: The per-turn tables of :func:`compute_all_errors` for all
+            conversations, with a ``conversation`` column.
+        frames: Frame-level rates and times per conversation and pooled over
+            the corpus (``conversation`` "all"); None if disabled.
+    """
+
+    summary: pd.DataFrame
+    errors: pd.DataFrame
+    frames: Optional[pd.DataFrame] = None
+
+
+def read_turn_table(path: str) -> pd.DataFrame:
+    """Read a turns table for evaluation.
+
+    Accepts pipeline outputs such as ``final_labels.txt`` (tab-separated with a
+    header) and manual annotations without a header (speaker, tier, start, end,
+    duration, type). Labels are normalised with :func:`replace_labels` and a
+    missing ``duration_sec`` is computed from the start and end times.
+    """
+    with open(path, "r", encoding="utf-8") as table_file:
+        has_header = "start_sec" in table_file.readline().split("\t")
+    if has_header:
+        df = pd.read_csv(path, sep="\t")
+    else:
+        df = pd.read_csv(path, sep="\t", header=None, names=_ANNOTATION_COLUMNS)
+        df = df.drop(columns=["tier"])
+    if "duration_sec" not in df.columns:
+        df["duration_sec"] = df["end_sec"] - df["start_sec"]
+    return replace_labels(df)
+
+
+def read_manifest(path: str) -> List[Tuple[str, str, str]]:
+    """Read a tab-separated manifest of ``reference`` and ``estimate`` paths.
+
+    An optional ``conversation`` column names each pair (default: the
+    reference path as written in the manifest, without extension). Relative
+    paths are resolved against the manifest's directory.
+
+    Returns:
+        ``(conversation, reference_path, estimate_path)`` per row.
+
+    Raises:
+        ValueError: If columns are missing or two rows share a conversation
+            name, which would pool them in the bootstrap.
+    """
+    manifest = pd.read_csv(path, sep="\t", dtype=str)
+    missing = {"reference", "estimate"} - set(manifest.columns)
+    if missing:
+        raise ValueError(f"manifest {path} lacks columns: {sorted(missing)}")
+
+    root = os.path.dirname(os.path.abspath(path))
+    pairs = []
+    for row in manifest.itertuples(index=False):
+        reference = os.path.join(root, row.reference)
+        estimate = os.path.join(root, row.estimate)
+        conversation = getattr(row, "conversation", None)
+        if not isinstance(conversation, str) or not conversation:
+            # Stems alone collide across directories (e.g. <name>/labels.txt)
+            conversation = os.path.splitext(os.path.normpath(row.reference))[0]
+        pairs.append((conversation, reference, estimate))
+
+    names = pd.Series([conversation for conversation, _ref, _est in pairs])
+    duplicates = names[names.duplicated()].unique()
+    if len(duplicates):
+        raise ValueError(
+            f"manifest {path} has duplicate conversations: {sorted(duplicates)}"
+        )
+    return pairs
+
+
+def _evaluate_pair(
+    conversation: str,
+    reference_path: str,
+    estimate_path: str,
+    min_overlap_ratio: float,
+    postprocess: bool,
+    frame_sec: Optional[float],
+) -> Tuple[pd.DataFrame, Optional[FrameMetrics]]:
+    df_ref = read_turn_table(reference_path)
+    df_est = read_turn_table(estimate_path)
+    if postprocess:
+        # Its per-sweep progress is noise when evaluating a corpus
+        with contextlib.redirect_stdout(io.StringIO()):
+            df_ref = postprocess_turn_df(df_ref, annotate_self_overlap=False)
+            df_est = postprocess_turn_df(df_est, annotate_self_overlap=False)
+
+    _err, err_df = compute_all_errors(
+        df_ref, df_est, min_overlap_ratio, suppress_warnings=True
+    )
+    err_df.insert(0, "conversation", conversation)
+    frame_metrics = (
+        compute_frame_metrics(df_ref, df_est, frame_sec)
+        if frame_sec is not None
+        else None
+    )
+    return err_df, frame_metrics
+
+
+def bootstrap_weights(
+    n_conversations: int, n_bootstrap: int, seed: Optional[int] = 0
+) -> np.ndarray:
+    """Resampling counts of each conversation per bootstrap replicate.
+
+    Returns:
+        Array of shape ``n_bootstrap x n_conversations`` whose rows sum to
+        ``n_conversations``.
+    """
+    rng = np.random.default_rng(seed)
+    return rng.multinomial(
+        n_conversations, np.full(n_conversations, 1.0 / n_conversations), n_bootstrap
+    )
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, empty: float) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / denominator, empty)
+
+
+def _metrics(sums: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Metrics from (weighted) sums of per-conversation counts.
+
+    Precision and recall are 0 without positives, as in
+    :func:`compute_all_errors`; mean deltas are NaN without detections.
+    """
+    tp, fp, fn = sums["tp"], sums["fp"], sums["fn"]
+    precision = _ratio(tp, tp + fp, 0.0)
+    recall = _ratio(tp, tp + fn, 0.0)
+    metrics = {
+        "precision": precision,
+        "recall": recall,
+        "f1": _ratio(2 * precision * recall, precision + recall, 0.0),
+    }
+    for column in _DELTA_COLUMNS:
+        metrics[f"{column}_mean_abs"] = _ratio(
+            sums[f"{column}_abs"], sums["detected"], np.nan
+        )
+    metrics["start_end_delta_mean_abs"] = _ratio(
+        sums["start_delta_abs"] + sums["end_delta_abs"], 2 * sums["detected"], np.nan
+    )
+    return metrics
+
+
+def summarize_errors(
+    errors: pd.DataFrame,
+    n_bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = 0,
+) -> pd.DataFrame:
+    """Pool per-turn errors of many conversations into one row per turn type.
+
+    Args:
+        errors: Output of :func:`compute_all_errors` for several conversations,
+            with a ``conversation`` column.
+        n_bootstrap: Bootstrap replicates; 0 disables confidence intervals.
+        confidence: Coverage of the percentile confidence intervals.
+        seed: Seed of the bootstrap resampling.
+
+    Returns:
+        Table with counts (``tp``, ``fp``, ``fn``), ``precision``, ``recall``,
+        ``f1`` and mean absolute deltas, each with ``_ci_low``/``_ci_high``
+        columns, plus the 5 % and 95 % quantiles of the absolute deltas. The
+        columns are the same when ``errors`` is empty.
+    """
+    detected = errors["detected"]
+    is_tp = (detected == 1).to_numpy()
+    per_turn = pd.DataFrame(
+        {
+            "type": errors["type"].to_numpy(),
+            "conversation": errors["conversation"].to_numpy(),
+            "tp": is_tp,
+            "fp": detected.isna().to_numpy(),
+            "fn": (detected == 0).to_numpy(),
+            "detected": is_tp,
+        }
+    )
+    for column in _DELTA_COLUMNS:
+        per_turn[f"{column}_abs"] = np.where(
+            is_tp, np.abs(errors[column].to_numpy(dtype=float)), 0.0
+        )
+
+    conversations = pd.unique(errors["conversation"])
+    # counts[type]: conversations x statistics
+    counts = per_turn.groupby(["type", "conversation"], sort=False).sum()
+    weights = (
+        bootstrap_weights(len(conversations), n_bootstrap, seed)
+        if n_bootstrap > 0 and len(conversations) > 0
+        else None
+    )
+    alpha = (1.0 - confidence) / 2
+
+    rows = []
+    for turn_type in counts.index.get_level_values("type").unique():
+        table = counts.loc[turn_type].reindex(conversations, fill_value=0)
+        totals = table.sum()
+        row: Dict[str, object] = {
+            "type": turn_type,
+            "conversations": int((table[["tp", "fp", "fn"]].sum(axis=1) > 0).sum()),
+            "tp": int(totals["tp"]),
+            "fp": int(totals["fp"]),
+            "fn": int(totals["fn"]),
+        }
+
+        point = _metrics({name: np.asarray(value) for name, value in totals.items()})
+        replicates = None
+        if weights is not None:
+            weighted = weights @ table.to_numpy(dtype=float)
+            replicates = _metrics(dict(zip(table.columns, weighted.T)))
+        for name, value in point.items():
+            row[name] = float(value)
+            row[f"{name}_ci_low"], row[f"{name}_ci_high"] = (
+                np.nanquantile(replicates[name], [alpha, 1 - alpha])
+                if replicates is not None
+                else (np.nan, np.nan)
+            )
+
+        # Quantiles of the absolute deltas (point estimates only)
+        detected_rows = errors[(errors["type"] == turn_type).to_numpy() & is_tp]
+        for prefix, columns in _QUANTILE_COLUMNS:
+            values = np.abs(detected_rows[columns].to_numpy(dtype=float)).ravel()
+            row[f"{prefix}_p05_abs"], row[f"{prefix}_p95_abs"] = (
+                np.quantile(values, [0.05, 0.95]) if len(values) else (0.0, 0.0)
+            )
+        rows.append(row)
+
+    return pd.DataFrame(rows, columns=_SUMMARY_COLUMNS)
+
+
+def _frame_table(
+    conversations: Sequence[str],
+    frame_metrics: Sequence[FrameMetrics],
+    frame_sec: float,
+) -> pd.DataFrame:
+    """One row of frame-level metrics per conversation plus the pooled "all"."""
+    pooled = FrameMetrics()
+    rows = []
+    for conversation, metrics in zip(conversations, frame_metrics):
+        pooled.merge(metrics)
+        rows.append({"conversation": conversation, **metrics.to_dict(frame_sec)})
+    rows.append({"conversation": "all", **pooled.to_dict(frame_sec)})
+    return pd.DataFrame(rows)
+
+
+def evaluate_corpus(
+    pairs: Sequence[Tuple[str, str, str]],
+    min_overlap_ratio: float = 0.1,
+    num_workers: Optional[int] = None,
+    n_bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed: Optional[int] = 0,
+    postprocess: bool = False,
+    frame_sec: Optional[float] = DEFAULT_FRAME_SEC,
+) -> CorpusEvaluation:
+    """Evaluate estimated against reference turns for a whole corpus.
+
+    Args:
+        pairs: ``(conversation, reference_path, estimate_path)`` per
+            conversation, e.g. from :func:`read_manifest`.
+        min_overlap_ratio: Minimum overlap ratio for matching turns.
+        num_workers: Worker processes (default: all cores); 1 evaluates in
+            this process.
+        n_bootstrap: Bootstrap replicates over conversations; 0 disables
+            confidence intervals.
+        confidence: Coverage of the confidence intervals.
+        seed: Seed of the bootstrap resampling.
+        postprocess: Run :func:`postprocess_turn_df` on both tables first.
+        frame_sec: Frame length of the frame-level metrics; None skips them.
+
+    Returns:
+        The per-type summary, the pooled per-turn errors and the frame-level
+        metrics.
+    """
+    num_workers = min(num_workers or os.cpu_count() or 1, max(len(pairs), 1))
+    jobs = [
+        (conversation, reference, estimate, min_overlap_ratio, postprocess, frame_sec)
+        for conversation, reference, estimate in pairs
+    ]
+    if num_workers == 1:
+        results = [_evaluate_pair(*job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        ) as executor:
+            results = list(
+                executor.map(
+                    _evaluate_pair,
+                    *zip(*jobs),
+                    chunksize=max(1, len(jobs) // (4 * num_workers)),
+                )
+            )
+    tables = [table for table, _frame_metrics in results]
+
+    errors = (
+        pd.concat(tables, ignore_index=True)
+        if tables
+        else pd.DataFrame(columns=["conversation", "type", "detected", *_DELTA_COLUMNS])
+    )
+    summary = summarize_errors(errors, n_bootstrap, confidence, seed)
+    frames = (
+        _frame_table(
+            [conversation for conversation, _reference, _estimate in pairs],
+            [frame_metrics for _table, frame_metrics in results],
+            frame_sec,
+        )
+        if frame_sec is not None
+        else None
+    )
+    return CorpusEvaluation(summary, errors, frames)
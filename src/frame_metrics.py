@@ -0,0 +1,248 @@
+"""
+Frame-level timeline metrics for turn tables.
+
+Turn matching (:mod:`.compute_turn_errors`) scores whole turns. The metrics
+here score time instead: both turn tables are rasterised into one row of
+frames per speaker (1 = speaking), and missed speech, false alarm, speaker
+confusion and overlap detection are counted frame by frame with array
+operations, following the NIST diarization error definitions with speakers
+identified by name. Rasters are ``uint8`` arrays and can be bit-packed for
+storage.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, fields
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_FRAME_SEC = 0.01
+
+
+@dataclass
+class FrameRaster:
+    """Speech activity per speaker and frame.
+
+    Args:
+        speakers: Speaker of each row of ``frames``.
+        frames: ``uint8`` array of shape ``speakers x frames``; 1 where the
+            speaker is active.
+        frame_sec: Frame length in seconds.
+    """
+
+    speakers: List[str]
+    frames: np.ndarray
+    frame_sec: float = DEFAULT_FRAME_SEC
+
+    @classmethod
+    def from_turns(
+        cls,
+        df: pd.DataFrame,
+        frame_sec: float = DEFAULT_FRAME_SEC,
+        speakers: Optional[Sequence[str]] = None,
+        n_frames: Optional[int] = None,
+        types: Optional[Sequence[str]] = None,
+    ) -> FrameRaster:
+        """Rasterise the ``[start_sec, end_sec)`` intervals of a turns table.
+
+        Interval bounds are rounded to the nearest frame boundary and clipped
+        to the raster. Rows with missing or reversed times are ignored.
+
+        Args:
+            df: Table with speaker, start_sec and end_sec columns.
+            frame_sec: Frame length in seconds.
+            speakers: Rows of the raster (default: speakers of ``df`` in
+                sorted order); turns of other speakers are ignored.
+            n_frames: Length of the raster (default: up to the last end).
+            types: Only rasterise rows whose ``type`` is in ``types``.
+        """
+        if types is not None:
+            df = df[df["type"].isin(types)]
+        if speakers is None:
+            speakers = sorted(df["speaker"].dropna().unique(), key=str)
+        speakers = list(speakers)
+
+        start = np.rint(df["start_sec"].to_numpy(dtype=float) / frame_sec)
+        end = np.rint(df["end_sec"].to_numpy(dtype=float) / frame_sec)
+        row = pd.Index(speakers).get_indexer(df["speaker"])
+        valid = (row >= 0) & (start < end)
+        row, start, end = row[valid], start[valid], end[valid]
+        if n_frames is None:
+            n_frames = max(int(end.max()), 0) if len(end) else 0
+        # Clip both bounds to the raster; turns entirely outside it become empty
+        start, end = np.clip(start, 0, n_frames), np.clip(end, 0, n_frames)
+        inside = start < end
+        row = row[inside]
+        start, end = start[inside].astype(np.int64), end[inside].astype(np.int64)
+
+        # +1 where a turn starts and -1 where it ends; active where the sum > 0
+        changes = np.zeros((len(speakers), n_frames + 1), dtype=np.int32)
+        np.add.at(changes, (row, start), 1)
+        np.add.at(changes, (row, end), -1)
+        frames = (np.cumsum(changes, axis=1)[:, :-1] > 0).astype(np.uint8)
+        return cls(speakers, frames, frame_sec)
+
+    @property
+    def n_frames(self) -> int:
+        return int(self.frames.shape[1])
+
+    def packed(self) -> np.ndarray:
+        """Frames bit-packed along time (8 frames per byte)."""
+        return np.packbits(self.frames, axis=1)
+
+    @classmethod
+    def from_packed(
+        cls,
+        packed: np.ndarray,
+        n_frames: int,
+        speakers: Sequence[str],
+        frame_sec: float = DEFAULT_FRAME_SEC,
+    ) -> FrameRaster:
+        frames = np.unpackbits(packed, axis=1, count=n_frames)
+        return cls(list(speakers), frames, frame_sec)
+
+
+@dataclass
+class FrameMetrics:
+    """Frame counts of the timeline errors of an estimate.
+
+    Speaker-level counts sum over speakers per frame (an overlap frame counts
+    twice), as in the diarization error rate; speech-level counts only ask
+    whether anyone speaks.
+    """
+
+    total_frames: int = 0
+    # Speaker-level
+    ref_speaker_frames: int = 0
+    missed_speaker_frames: int = 0
+    false_alarm_speaker_frames: int = 0
+    confusion_frames: int = 0
+    # Speech-level
+    ref_speech_frames: int = 0
+    missed_speech_frames: int = 0
+    false_alarm_speech_frames: int = 0
+    # Overlap (two or more speakers)
+    ref_overlap_frames: int = 0
+    est_overlap_frames: int = 0
+    correct_overlap_frames: int = 0
+    overlap_state_agreement_frames: int = 0
+
+    @classmethod
+    def from_rasters(cls, ref: FrameRaster, est: FrameRaster) -> FrameMetrics:
+        """Count errors of ``est`` against ``ref``.
+
+        Both rasters must share frame length, speakers and length, as built by
+        :func:`compute_frame_metrics`.
+        """
+        n_ref = ref.frames.sum(axis=0, dtype=np.int32)
+        n_est = est.frames.sum(axis=0, dtype=np.int32)
+        n_correct = (ref.frames & est.frames).sum(axis=0, dtype=np.int32)
+        ref_overlap = n_ref >= 2
+        est_overlap = n_est >= 2
+        return cls(
+            total_frames=ref.n_frames,
+            ref_speaker_frames=int(n_ref.sum()),
+            missed_speaker_frames=int(np.maximum(n_ref - n_est, 0).sum()),
+            false_alarm_speaker_frames=int(np.maximum(n_est - n_ref, 0).sum()),
+            confusion_frames=int((np.minimum(n_ref, n_est) - n_correct).sum()),
+            ref_speech_frames=int(np.count_nonzero(n_ref)),
+            missed_speech_frames=int(np.count_nonzero((n_ref > 0) & (n_est == 0))),
+            false_alarm_speech_frames=int(np.count_nonzero((n_ref == 0) & (n_est > 0))),
+            ref_overlap_frames=int(np.count_nonzero(ref_overlap)),
+            est_overlap_frames=int(np.count_nonzero(est_overlap)),
+            correct_overlap_frames=int(np.count_nonzero(ref_overlap & est_overlap)),
+            overlap_state_agreement_frames=int(
+                np.count_nonzero(ref_overlap == est_overlap)
+            ),
+        )
+
+    def merge(self, other: FrameMetrics) -> None:
+        for counter in fields(self):
+            setattr(
+                self,
+                counter.name,
+                getattr(self, counter.name) + getattr(other, counter.name),
+            )
+
+    @staticmethod
+    def _rate(numerator: int, denominator: int) -> float:
+        return numerator / denominator if denominator else 0.0
+
+    def rates(self) -> Dict[str, float]:
+        """Error rates and overlap scores.
+
+        ``missed_speaker``, ``false_alarm_speaker`` and ``confusion`` are
+        relative to the reference speaker time and add up to the diarization
+        error rate ``der``. The speech-level miss and false alarm rates are
+        relative to reference speech and non-speech time.
+        """
+        ref = self.ref_speaker_frames
+        rates = {
+            "missed_speaker": self._rate(self.missed_speaker_frames, ref),
+            "false_alarm_speaker": self._rate(self.false_alarm_speaker_frames, ref),
+            "confusion": self._rate(self.confusion_frames, ref),
+        }
+        rates["der"] = sum(rates.values())
+        rates["missed_speech"] = self._rate(
+            self.missed_speech_frames, self.ref_speech_frames
+        )
+        rates["false_alarm_speech"] = self._rate(
+            self.false_alarm_speech_frames, self.total_frames - self.ref_speech_frames
+        )
+        rates["overlap_precision"] = self._rate(
+            self.correct_overlap_frames, self.est_overlap_frames
+        )
+        rates["overlap_recall"] = self._rate(
+            self.correct_overlap_frames, self.ref_overlap_frames
+        )
+        rates["overlap_accuracy"] = self._rate(
+            self.overlap_state_agreement_frames, self.total_frames
+        )
+        return rates
+
+    def to_dict(self, frame_sec: float = DEFAULT_FRAME_SEC) -> Dict[str, float]:
+        """Rates plus the frame counts converted to seconds (``*_sec``)."""
+        seconds = {
+            f"{name.replace('_frames', '')}_sec": count * frame_sec
+            for name, count in asdict(self).items()
+        }
+        return {**self.rates(), **seconds}
+
+
+def compute_frame_metrics(
+    df_ref: pd.DataFrame,
+    df_est: pd.DataFrame,
+    frame_sec: float = DEFAULT_FRAME_SEC,
+    types: Optional[Sequence[str]] = None,
+) -> FrameMetrics:
+    """
+    Compute frame-level timeline errors of estimated against reference turns.
+
+    Both tables are rasterised on the union of their speakers over the longer
+    of the two timelines; speakers are matched by name.
+
+    Args:
+        df_ref: Ground truth turns DataFrame (speaker, start_sec, end_sec).
+        df_est: Estimated turns DataFrame with the same columns.
+        frame_sec: Frame length in seconds.
+        types: Only score rows whose ``type`` is in ``types`` (default: all
+            rows, e.g. turns and backchannels).
+
+    Returns:
+        Frame counts; see :meth:`FrameMetrics.to_dict` for rates and seconds.
+    """
+    if types is not None:
+        df_ref = df_ref[df_ref["type"].isin(types)]
+        df_est = df_est[df_est["type"].isin(types)]
+    speakers = sorted(
+        set(df_ref["speaker"].dropna()) | set(df_est["speaker"].dropna()), key=str
+    )
+    ends = pd.concat([df_ref["end_sec"], df_est["end_sec"]]).to_numpy(dtype=float)
+    ends = ends[np.isfinite(ends)]
+    n_frames = max(int(np.rint(ends.max() / frame_sec)), 0) if len(ends) else 0
+
+    ref = FrameRaster.from_turns(df_ref, frame_sec, speakers, n_frames)
+    est = FrameRaster.from_turns(df_est, frame_sec, speakers, n_frames)
+    return FrameMetrics.from_rasters(ref, est)
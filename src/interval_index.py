@@ -0,0 +1,199 @@
+"""
+Sorted interval index for turn tables.
+
+Labeling and evaluation repeatedly ask which turns of other speakers contain or
+overlap a given turn. Scanning the table for every row is quadratic. An
+:class:`IntervalIndex` sorts the intervals by start time once and keeps a
+running maximum of their end times, so whole columns of queries are answered
+with binary searches.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class IntervalIndex:
+    """Intervals sorted by start time with a running maximum of end times.
+
+    Args:
+        starts: Interval start times, sorted ascending.
+        ends: Interval end times, in the same order.
+        positions: Position of each interval in the table it was built from.
+    """
+
+    starts: np.ndarray
+    ends: np.ndarray
+    positions: np.ndarray
+    # max_end[k]: latest end among the first k + 1 intervals
+    max_end: np.ndarray = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.max_end = np.maximum.accumulate(self.ends) if len(self.ends) else self.ends
+
+    @classmethod
+    def from_arrays(cls, starts: np.ndarray, ends: np.ndarray) -> IntervalIndex:
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        order = np.argsort(starts, kind="stable")
+        return cls(starts[order], ends[order], order)
+
+    @classmethod
+    def from_frame(
+        cls, df: pd.DataFrame, mask: Optional[np.ndarray] = None
+    ) -> IntervalIndex:
+        """Index the ``start_sec``/``end_sec`` intervals of ``df`` (rows in ``mask``).
+
+        ``positions`` refer to row positions in ``df``.
+        """
+        positions = np.arange(len(df))
+        if mask is not None:
+            positions = positions[np.asarray(mask, dtype=bool)]
+        index = cls.from_arrays(
+            df["start_sec"].to_numpy(dtype=float)[positions],
+            df["end_sec"].to_numpy(dtype=float)[positions],
+        )
+        index.positions = positions[index.positions]
+        return index
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _latest_end_before(self, n_first: np.ndarray) -> np.ndarray:
+        """Latest end among the first ``n_first`` intervals (-inf if none)."""
+        latest = np.full(len(n_first), -np.inf)
+        has_any = n_first > 0
+        latest[has_any] = self.max_end[n_first[has_any] - 1]
+        return latest
+
+    def contains(
+        self, starts: np.ndarray, ends: np.ndarray, strict: bool = False
+    ) -> np.ndarray:
+        """For each query ``[start, end]``, whether some interval contains it.
+
+        Args:
+            starts: Query start times.
+            ends: Query end times.
+            strict: Only count intervals that are strictly larger than the
+                query (an identical interval does not contain it).
+
+        Returns:
+            Boolean array aligned with the queries.
+        """
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        if len(self) == 0:
+            return np.zeros(len(starts), dtype=bool)
+        n_start_at_or_before = np.searchsorted(self.starts, starts, side="right")
+        if not strict:
+            return self._latest_end_before(n_start_at_or_before) >= ends
+        n_start_before = np.searchsorted(self.starts, starts, side="left")
+        return (self._latest_end_before(n_start_before) >= ends) | (
+            self._latest_end_before(n_start_at_or_before) > ends
+        )
+
+    def encloses(self, starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        """For each query ``[start, end]``, whether it contains some interval.
+
+        Args:
+            starts: Query start times.
+            ends: Query end times.
+
+        Returns:
+            Boolean array aligned with the queries.
+        """
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        if len(self) == 0:
+            return np.zeros(len(starts), dtype=bool)
+        # min_end_from[k]: earliest end among the intervals from k on
+        min_end_from = np.append(np.minimum.accumulate(self.ends[::-1])[::-1], np.inf)
+        n_start_before = np.searchsorted(self.starts, starts, side="left")
+        return min_end_from[n_start_before] <= ends
+
+    def overlapping(
+        self, starts: np.ndarray, ends: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """All (query, interval) pairs with interval start < query end and
+        interval end > query start.
+
+        Only intervals starting before a query ends are candidates, and the
+        running maximum of end times skips the leading ones that all end before
+        the query starts.
+
+        Args:
+            starts: Query start times.
+            ends: Query end times.
+
+        Returns:
+            ``(query_idx, positions)``: query indices and the table positions
+            of the overlapping intervals, ordered by query and interval start.
+        """
+        starts = np.asarray(starts, dtype=float)
+        ends = np.asarray(ends, dtype=float)
+        if len(self) == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        first = np.searchsorted(self.max_end, starts, side="right")
+        last = np.searchsorted(self.starts, ends, side="left")
+        counts = np.maximum(last - first, 0)
+        query_idx = np.repeat(np.arange(len(starts)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(
+            np.cumsum(counts) - counts, counts
+        )
+        candidates = np.repeat(first, counts) + offsets
+        keep = self.ends[candidates] > starts[query_idx]
+        return query_idx[keep], self.positions[candidates[keep]]
+
+
+def contained_in_other_group(
+    df: pd.DataFrame,
+    groups: np.ndarray,
+    container_mask: Optional[np.ndarray] = None,
+    query_mask: Optional[np.ndarray] = None,
+    strict: bool = False,
+) -> np.ndarray:
+    """Which rows of ``df`` lie within an interval of a row from another group.
+
+    Typically ``groups`` holds speakers: the result marks turns that are fully
+    contained in a turn of another speaker. One index is built per group.
+
+    Args:
+        df: Table with ``start_sec`` and ``end_sec`` columns.
+        groups: Group label of every row (e.g. ``df["speaker"].to_numpy()``).
+        container_mask: Rows that may contain others (default: all rows).
+        query_mask: Rows to test (default: all rows); others are False.
+        strict: Ignore containers identical to the queried interval.
+
+    Returns:
+        Boolean array aligned with the rows of ``df``.
+    """
+    n_rows = len(df)
+    container_mask = (
+        np.ones(n_rows, dtype=bool)
+        if container_mask is None
+        else np.asarray(container_mask, dtype=bool)
+    )
+    query_mask = (
+        np.ones(n_rows, dtype=bool)
+        if query_mask is None
+        else np.asarray(query_mask, dtype=bool)
+    )
+    starts = df["start_sec"].to_numpy(dtype=float)
+    ends = df["end_sec"].to_numpy(dtype=float)
+
+    codes, labels = pd.factorize(np.asarray(groups, dtype=object))
+    indexes: Dict[Hashable, IntervalIndex] = {
+        code: IntervalIndex.from_frame(df, container_mask & (codes == code))
+        for code in range(len(labels))
+    }
+
+    contained = np.zeros(n_rows, dtype=bool)
+    for code, index in indexes.items():
+        queries = np.flatnonzero(query_mask & (codes != code) & ~contained)
+        contained[queries] = index.contains(starts[queries], ends[queries], strict)
+    return contained
@@ -6,11 +6,136 @@ https://github.com/hanlululu/Conversational_speech_labeling_pipeline
 
 import re
 from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 from scipy.stats import entropy
 
+from .interval_index import contained_in_other_group
+
+# [^\W_] matches Unicode letters/digits (word chars) excluding underscore.
+_WORD_TOKEN = re.compile(r"[^\W_]+(?:[-'][^\W_]+)*'?", flags=re.UNICODE)
+
+# Punctuation that never belongs to a token; mapped to spaces for lexicon lookup
+_LEXICON_SEPARATORS = str.maketrans({char: " " for char in '.,;:!?…"“”„«»()[]'})
+
+# Closed-class backchannel expressions per language. Entries of at most two
+# distinct tokens have an entropy below 1.5 bits, so with the default threshold
+# the lexicon only short-circuits the entropy computation.
+BACKCHANNEL_LEXICONS: Dict[str, Tuple[str, ...]] = {
+    "da": tuple(
+        (
+            "ja, jo, jaja, ja ja, ja ja ja, jo jo, nej, nej nej, mm, mmm, mhm, "
+            "mm-hmm, hm, hmm, okay, ok, okay okay, nå, nåh, nå okay, nå ja, "
+            "ja okay, okay ja, ah, aha, åh, øh, ej, wow, præcis, ja præcis, "
+            "nemlig, ja nemlig, klart, fedt, sjovt, godt, fint, super, rigtigt"
+        ).split(", ")
+    ),
+    "en": tuple(
+        (
+            "yeah, yeah yeah, yes, yep, yup, no, nope, mm, mmm, mhm, mm-hmm, "
+            "uh-huh, uh huh, hm, hmm, okay, ok, okay okay, oh, oh okay, oh yeah, "
+            "ah, aha, wow, right, sure, really, exactly, cool, nice, true, i see"
+        ).split(", ")
+    ),
+}
+
+
+def _lexicon_key(text: str) -> str:
+    """Lower-case text with punctuation removed and whitespace collapsed."""
+    return " ".join(text.strip().lower().translate(_LEXICON_SEPARATORS).split())
+
+
+@dataclass
+class LexiconStats:
+    """How much of the labeling work a backchannel lexicon answered."""
+
+    rows: int = 0
+    hits: int = 0
+    unique_texts: int = 0
+    unique_hits: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.rows if self.rows else 0.0
+
+    def merge(self, other: "LexiconStats") -> None:
+        self.rows += other.rows
+        self.hits += other.hits
+        self.unique_texts += other.unique_texts
+        self.unique_hits += other.unique_hits
+
+    def summary(self) -> str:
+        return (
+            f"{self.hits}/{self.rows} rows ({self.hit_rate:.1%}) and "
+            f"{self.unique_hits}/{self.unique_texts} distinct texts classified "
+            f"by the backchannel lexicon"
+        )
+
+
+@dataclass
+class BackchannelLexicon:
+    """Backchannel expressions normalised once into a hash set.
+
+    Transcriptions that consist of exactly one lexicon expression (ignoring
+    case, punctuation and spacing) are classified as backchannels without
+    tokenization. Their entropy is that of the expression, computed once when
+    the lexicon is built. ``stats`` accumulates the hit rate over all lookups.
+
+    Args:
+        entries: Normalised expression -> entropy in bits.
+        language: Language code the lexicon was built for, if any.
+    """
+
+    entries: Dict[str, float]
+    language: Optional[str] = None
+    stats: LexiconStats = field(default_factory=LexiconStats)
+
+    @classmethod
+    def from_words(
+        cls, words: Iterable[str], language: Optional[str] = None
+    ) -> "BackchannelLexicon":
+        keys = {_lexicon_key(word) for word in words} - {""}
+        return cls({key: compute_entropy(key) for key in keys}, language)
+
+    @classmethod
+    def for_language(cls, language: str) -> "BackchannelLexicon":
+        """Built-in lexicon from BACKCHANNEL_LEXICONS."""
+        if language not in BACKCHANNEL_LEXICONS:
+            raise ValueError(
+                f"No backchannel lexicon for {language!r}; available: "
+                f"{sorted(BACKCHANNEL_LEXICONS)}"
+            )
+        return cls.from_words(BACKCHANNEL_LEXICONS[language], language)
+
+    def lookup(self, texts: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Match texts against the lexicon.
+
+        Args:
+            texts: Transcriptions.
+
+        Returns:
+            ``(hits, entropies)``: which texts are lexicon expressions, and
+            their entropy (NaN for misses).
+        """
+        text_codes, unique_texts = pd.factorize(
+            np.array([str(text) for text in texts], dtype=object)
+        )
+        unique_entropies = np.array(
+            [self.entries.get(_lexicon_key(text), np.nan) for text in unique_texts],
+            dtype=float,
+        )
+        entropies = unique_entropies[text_codes]
+        hits = ~np.isnan(entropies)
+
+        self.stats.rows += len(entropies)
+        self.stats.hits += int(hits.sum())
+        self.stats.unique_texts += len(unique_texts)
+        self.stats.unique_hits += int((~np.isnan(unique_entropies)).sum())
+        return hits, entropies
+
 
 def compute_entropy(text: str, by: str = "word") -> float:
     """
@@ -30,8 +155,7 @@ def compute_entropy(text: str, by: str = "word") -> float:
         return 0.0
 
     if by == "word":
-        # [^\W_] matches Unicode letters/digits (word chars) excluding underscore.
-        tokens = re.findall(r"[^\W_]+(?:[-'][^\W_]+)*'?", text, flags=re.UNICODE)
+        tokens = _WORD_TOKEN.findall(text)
     else:
         tokens = list(text)
 
@@ -43,7 +167,58 @@ def compute_entropy(text: str, by: str = "word") -> float:
     return float(entropy(probs, base=2))
 
 
-def classify_transcriptions(df: pd.DataFrame, threshold: float = 1.5) -> pd.DataFrame:
+def compute_entropies(texts: Iterable[str], by: str = "word") -> np.ndarray:
+    """
+    Compute the entropy of many text strings at once.
+
+    Equivalent to calling compute_entropy on every text, but each distinct text
+    is tokenized only once (short backchannels such as "ja" or "mm" repeat
+    thousands of times in a corpus). Tokens of all distinct texts are coded
+    jointly and the entropies come from one vectorized count per
+    (text, token) pair.
+
+    Args:
+        texts: The input text strings.
+        by: Tokenization method, 'word' or 'char'.
+
+    Returns:
+        Array of entropy values in bits, aligned with ``texts``.
+    """
+    text_codes, unique_texts = pd.factorize(
+        np.array([str(text).strip().lower() for text in texts], dtype=object)
+    )
+    if len(unique_texts) == 0:
+        return np.zeros(0)
+
+    unique_series = pd.Series(unique_texts, dtype=object)
+    tokens = (
+        unique_series.str.findall(_WORD_TOKEN)
+        if by == "word"
+        else unique_series.map(list)
+    ).explode()
+    tokens = tokens[tokens.notna()]
+
+    text_ids = tokens.index.to_numpy(dtype=np.int64)
+    token_codes, vocabulary = pd.factorize(tokens.to_numpy())
+    pair_codes, pair_counts = np.unique(
+        text_ids * len(vocabulary) + token_codes, return_counts=True
+    )
+    pair_texts = pair_codes // len(vocabulary)
+
+    n_tokens = np.bincount(text_ids, minlength=len(unique_texts))
+    probs = pair_counts / n_tokens[pair_texts]
+    unique_entropies = np.bincount(
+        pair_texts, weights=-probs * np.log(probs), minlength=len(unique_texts)
+    ) / np.log(2)
+    unique_entropies[n_tokens <= 1] = 0.0
+    return unique_entropies[text_codes]
+
+
+def classify_transcriptions(
+    df: pd.DataFrame,
+    threshold: float = 1.5,
+    lexicon: Optional[BackchannelLexicon] = None,
+) -> pd.DataFrame:
     """
     Classify transcriptions as 'backchannel', 'turn', or 'overlapped_turn'
         based on entropy.
@@ -52,35 +227,65 @@ def classify_transcriptions(df: pd.DataFrame, threshold: float = 1.5) -> pd.Data
     high entropy indicates more diverse content (turns).
 
     Additionally detects overlapped turns: when one speaker's turn is completely
-    enveloped (temporally contained) within another speaker's turn, the contained
-    turn is classified as 'overlapped_turn'.
+    enveloped (temporally contained) within any turn of another speaker, the
+    contained turn is classified as 'overlapped_turn'. Of two identical turns by
+    different speakers, the later row is the overlapped one.
 
     Args:
         df: DataFrame with 'transcription', 'speaker', 'start_sec', 'end_sec' columns.
         threshold: Entropy threshold for classification (default: 1.5).
+        lexicon: Optional backchannel lexicon. Transcriptions found in it are
+            classified as backchannels directly and entropy is only computed
+            for the remaining rows; lookups are counted in ``lexicon.stats``.
 
     Returns:
         DataFrame with added 'entropy' and 'type' columns.
         'type' will be one of: 'backchannel', 'turn', or 'overlapped_turn'.
     """
     df = df.copy()
-    df["entropy"] = df["transcription"].apply(lambda x: compute_entropy(x, "word"))
-    df["type"] = df["entropy"].apply(
-        lambda x: "backchannel" if x < threshold else "turn"
-    )
+    texts = df["transcription"].to_numpy()
+    if lexicon is not None:
+        is_lexical, entropies = lexicon.lookup(texts)
+    else:
+        is_lexical, entropies = np.zeros(len(df), dtype=bool), np.empty(len(df))
+    entropies[~is_lexical] = compute_entropies(texts[~is_lexical], "word")
+    df["entropy"] = entropies
+    df["type"] = np.where(is_lexical | (entropies < threshold), "backchannel", "turn")
+
+    is_turn = (df["type"] == "turn").to_numpy()
+    overlapped = contained_in_other_group(
+        df,
+        df["speaker"].to_numpy(),
+        container_mask=is_turn,
+        query_mask=is_turn,
+        strict=True,
+    ) | _repeats_other_speaker_turn(df, is_turn)
+    df["type"] = np.where(overlapped, "overlapped_turn", df["type"])
 
-    overlaps = (
-        (df["type"] == "turn")
-        & (df["type"].shift(-1) == "turn")
-        & (df["speaker"] != df["speaker"].shift(-1))
-        & (df["end_sec"] >= df["end_sec"].shift(-1))
-        & (df["start_sec"] <= df["start_sec"].shift(-1))
-    )
+    return df
 
-    # Mark the overlapped turn (next row) as "OT"
-    df.loc[overlaps.shift(1, fill_value=False), "type"] = "overlapped_turn"
 
-    return df
+def _repeats_other_speaker_turn(df: pd.DataFrame, is_turn: np.ndarray) -> np.ndarray:
+    """Turns with the same start and end as an earlier turn of another speaker."""
+    repeats = np.zeros(len(df), dtype=bool)
+    positions = np.flatnonzero(is_turn)
+    duplicated = (
+        df[["start_sec", "end_sec"]].iloc[positions].duplicated(keep=False).to_numpy()
+    )
+    positions = positions[duplicated]
+    if len(positions) == 0:
+        return repeats
+
+    speakers = df["speaker"].to_numpy()
+    keys = zip(
+        df["start_sec"].to_numpy()[positions], df["end_sec"].to_numpy()[positions]
+    )
+    seen: dict = {}
+    for position, key in zip(positions, keys):
+        speakers_before = seen.setdefault(key, set())
+        repeats[position] = bool(speakers_before - {speakers[position]})
+        speakers_before.add(speakers[position])
+    return repeats
 
 
 def merge_turns_with_context(
@@ -113,88 +318,68 @@ def merge_turns_with_context(
         )
 
     df = df.sort_values("start_sec").reset_index(drop=True)
-    merged = []
-    processed = set()
+    starts = df["start_sec"].to_numpy()
+    ends = df["end_sec"].to_numpy()
+    speakers = df["speaker"].to_numpy()
+    types = df["type"].to_numpy()
+    transcriptions = df["transcription"].to_numpy()
 
-    for i in range(len(df)):
-        if i in processed:
-            continue
+    is_turn = types == "turn"
+    is_minor = (types == "backchannel") | (types == "overlapped_turn")
+    # Backchannels/overlapped turns short enough to merge across
+    passable = is_minor & ((ends - starts) <= max_backchannel_dur)
 
-        current = df.iloc[i].copy()
+    merged_ends = ends.copy()
+    merged_texts = transcriptions.copy()
+    absorbed = np.zeros(len(df), dtype=bool)
 
-        if current["type"] == "backchannel" or current["type"] == "overlapped_turn":
-            merged.append(current)
-            processed.add(i)
+    for i in range(len(df)):
+        # Backchannels and overlapped turns are kept as they are
+        if absorbed[i] or is_minor[i]:
             continue
 
         # Current is a turn - find all consecutive same-speaker turns to merge,
         # skipping short backchannels/overlapped turns in between,
         # without re-applying windowed merging rules.
-        speaker = current["speaker"]
+        speaker = speakers[i]
+        current_end = ends[i]
+        parts = [i]
+        # Latest end of the segments passed so far that may not be merged
+        # across; they block a merge if they extend beyond the current turn
+        blocking_end = -np.inf
         j = i + 1
 
         while j < len(df):
-            next_segment = df.iloc[j]
-
             # Skip segments that are fully overlapped (end before/at current turn ends)
-            if next_segment["end_sec"] <= current["end_sec"]:
+            if ends[j] <= current_end:
+                if not passable[j]:
+                    blocking_end = max(blocking_end, ends[j])
                 j += 1
                 continue
 
-            if next_segment["type"] == "turn" and next_segment["speaker"] == speaker:
-                # Check if can merge
-                gap = next_segment["start_sec"] - current["end_sec"]
-                if gap > max_gap_sec:
-                    break
-
-                # Only check segments that extend beyond current turn
-                #  (not fully overlapped)
-                between = df.iloc[i + 1 : j]
-                between = between[between["end_sec"] > current["end_sec"]]
-                can_merge = len(between) == 0 or all(
-                    (
-                        (between["type"] == "backchannel")
-                        | (between["type"] == "overlapped_turn")
-                    )
-                    & (
-                        (between["end_sec"] - between["start_sec"])
-                        <= max_backchannel_dur
-                    )
-                )
-
-                if can_merge:
-                    # Merge
-                    current["end_sec"] = next_segment["end_sec"]
-                    current["transcription"] = (
-                        current["transcription"].strip()
-                        + " "
-                        + next_segment["transcription"].strip()
-                    )
-                    # Mark the merged turn as processed
-                    processed.add(j)
-                    j += 1
-                    continue
-                else:
-                    break
-            elif (
-                next_segment["type"] == "backchannel"
-                or next_segment["type"] == "overlapped_turn"
-            ):
-                # Skip short backchannels
-                if (
-                    next_segment["end_sec"] - next_segment["start_sec"]
-                ) <= max_backchannel_dur:
-                    j += 1
-                    continue
-                else:
+            if is_turn[j] and speakers[j] == speaker:
+                gap = starts[j] - current_end
+                if gap > max_gap_sec or blocking_end > current_end:
                     break
+                current_end = ends[j]
+                blocking_end = max(blocking_end, ends[j])
+                parts.append(j)
+                absorbed[j] = True
+                j += 1
+            elif passable[j]:
+                j += 1
             else:
-                # Different speaker turn (not overlapping)
+                # Long backchannel or different speaker turn (not overlapping)
                 break
 
-        # Append the merged turn
-        merged.append(current)
-        # Mark i as processed
-        processed.add(i)
-
-    return pd.DataFrame(merged).reset_index(drop=True)
+        if len(parts) > 1:
+            merged_ends[i] = current_end
+            texts = [transcriptions[k].strip() for k in parts]
+            # Same as stripping the running text before appending each part
+            merged_texts[i] = " ".join(text for text in texts[:-1] if text)
+            merged_texts[i] += " " + texts[-1]
+
+    merged = df.copy()
+    merged["end_sec"] = merged_ends
+    merged["transcription"] = merged_texts
+    return merged[~absorbed].reset_index(drop=True)
@@ -0,0 +1,186 @@
+"""
+Memory-mapped log-mel feature store.
+
+Whisper's feature extractor computes an STFT and a log-mel spectrogram for every
+segment it is given, although the underlying channel never changes between
+runs. A :class:`LogMelStore` holds the log-mel frames of a whole channel,
+computed once at Whisper's 10 ms hop and kept as a memory-mapped ``.npy`` file
+next to the outputs. Segment features are sliced from it and normalised the way
+the extractor normalises a single 30 s window.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from .atomic_io import atomic_write
+from .cache_manager import touch
+
+# Whisper front-end: 25 ms Hann window, 10 ms hop at 16 kHz
+SAMPLE_RATE = 16000
+N_FFT = 400
+HOP_LENGTH = 160
+FRAMES_PER_SEC = SAMPLE_RATE // HOP_LENGTH
+
+# Frames in one 30 s Whisper input window
+N_WINDOW_FRAMES = 3000
+
+# log10 of the mel floor, i.e. the value of zero-padded frames
+LOG_MEL_FLOOR = -10.0
+
+# Frames computed per block while building a store (5 minutes of audio)
+_BUILD_BLOCK_FRAMES = 30000
+
+
+class MelAudio(np.ndarray):
+    """Mono 16 kHz model input that carries its precomputed log-mel frames.
+
+    Behaves like the plain waveform for every backend; the ``transformers-cpu``
+    backend uses ``log_mel`` instead of running the feature extractor.
+    """
+
+    log_mel: Optional[np.ndarray]
+
+    def __array_finalize__(self, obj: Optional[np.ndarray]) -> None:
+        # Frames belong to the exact waveform they were sliced for, not to views
+        self.log_mel = None
+
+
+def with_log_mel(waveform: np.ndarray, log_mel: np.ndarray) -> MelAudio:
+    """Attach log-mel frames (``n_mels x frames``) to a model-input waveform."""
+    model_input = waveform.view(MelAudio)
+    model_input.log_mel = log_mel
+    return model_input
+
+
+def whisper_input_features(log_mel: np.ndarray) -> np.ndarray:
+    """Normalise raw log-mel frames into one padded 30 s Whisper input window.
+
+    Mirrors ``WhisperFeatureExtractor``: frames beyond the segment are those of
+    zero padding, values are clamped to 8 below the window maximum and scaled
+    by ``(x + 4) / 4``.
+    """
+    n_frames = min(log_mel.shape[1], N_WINDOW_FRAMES)
+    window = np.full((log_mel.shape[0], N_WINDOW_FRAMES), LOG_MEL_FLOOR, np.float32)
+    window[:, :n_frames] = log_mel[:, :n_frames]
+    window = np.maximum(window, window.max() - 8.0)
+    return (window + 4.0) / 4.0
+
+
+def _source_signature(source_path: str) -> dict:
+    stat = os.stat(source_path)
+    return {
+        "source": os.path.abspath(source_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+    }
+
+
+@dataclass
+class LogMelStore:
+    """Log10 mel power frames (``n_mels x frames``) of one channel at 100 fps."""
+
+    path: str
+    frames: np.ndarray
+
+    @property
+    def n_mels(self) -> int:
+        return int(self.frames.shape[0])
+
+    @staticmethod
+    def _meta_path(path: str) -> str:
+        return os.path.splitext(path)[0] + ".json"
+
+    @classmethod
+    def open(cls, path: str, source_path: str) -> Optional[LogMelStore]:
+        """Memory-map an existing store, or return None if missing or stale.
+
+        Args:
+            path: Location of the ``.npy`` store.
+            source_path: Audio file the store was built from; a store built
+                from a different or since modified file is stale.
+        """
+        try:
+            with open(cls._meta_path(path), "r", encoding="utf-8") as meta_file:
+                meta = json.load(meta_file)
+        except (OSError, ValueError):
+            return None
+        if meta != _source_signature(source_path) or not os.path.exists(path):
+            return None
+        touch(path)
+        return cls(path, np.load(path, mmap_mode="r"))
+
+    @classmethod
+    def build(
+        cls,
+        path: str,
+        waveform: np.ndarray,
+        mel_filters: np.ndarray,
+        source_path: str,
+    ) -> LogMelStore:
+        """Compute the log-mel frames of a whole channel and store them.
+
+        The STFT is computed in blocks straight into the memory map, so only one
+        block of spectra is held in memory.
+
+        Args:
+            path: Location of the ``.npy`` store.
+            waveform: The channel as mono 16 kHz float32 samples.
+            mel_filters: Mel filter bank (``n_fft // 2 + 1 x n_mels``), as found
+                on ``WhisperFeatureExtractor.mel_filters``.
+            source_path: Audio file the waveform was read from.
+
+        Returns:
+            The store, memory-mapped read-only.
+        """
+        mel_filters = np.asarray(mel_filters, dtype=np.float32)
+        pad_mode = "reflect" if len(waveform) > N_FFT // 2 else "constant"
+        padded = np.pad(waveform.astype(np.float32), N_FFT // 2, mode=pad_mode)
+        n_frames = len(waveform) // HOP_LENGTH
+
+        # Periodic Hann window, as used by Whisper
+        hann = 0.5 - 0.5 * np.cos(2 * np.pi * np.arange(N_FFT) / N_FFT)
+        hann = hann.astype(np.float32)
+
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        frames = np.lib.format.open_memmap(
+            tmp_path,
+            mode="w+",
+            dtype=np.float32,
+            shape=(mel_filters.shape[1], n_frames),
+        )
+        for first in range(0, n_frames, _BUILD_BLOCK_FRAMES):
+            last = min(n_frames, first + _BUILD_BLOCK_FRAMES)
+            block = padded[first * HOP_LENGTH : (last - 1) * HOP_LENGTH + N_FFT]
+            windows = np.lib.stride_tricks.sliding_window_view(block, N_FFT)
+            power = np.abs(np.fft.rfft(windows[::HOP_LENGTH] * hann, axis=1)) ** 2
+            mel = power.astype(np.float32) @ mel_filters
+            frames[:, first:last] = np.log10(np.maximum(mel, 1e-10)).T
+        frames.flush()
+        del frames
+        os.replace(tmp_path, path)
+
+        with atomic_write(cls._meta_path(path)) as meta_file:
+            json.dump(_source_signature(source_path), meta_file)
+        return cls(path, np.load(path, mmap_mode="r"))
+
+    def segment_frames(self, spans: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Frames of the concatenated ``[start, end)`` sample spans.
+
+        Args:
+            spans: Sample ranges on the source audio, e.g. ``TimeMap.spans``.
+            sample_rate: Sample rate of the source audio.
+
+        Returns:
+            Array of shape ``n_mels x frames``.
+        """
+        bounds = np.asarray(spans, dtype=np.int64) * FRAMES_PER_SEC // sample_rate
+        bounds = np.clip(bounds, 0, self.frames.shape[1])
+        return np.concatenate(
+            [self.frames[:, start:end] for start, end in bounds], axis=1
+        )
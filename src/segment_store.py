@@ -0,0 +1,186 @@
+"""
+Single-container storage for extracted segment audio.
+
+Writing one WAV per segment creates millions of tiny files across a corpus. A
+:class:`SegmentStore` appends every segment of a speaker to one pack file
+instead and records its byte range in a tab-separated offset index, so
+segments stay randomly accessible without a file per segment. Segments are
+stored as raw 16-bit PCM, FLAC or Opus.
+"""
+
+from __future__ import annotations
+
+import io
+import os
+import threading
+from dataclasses import dataclass, field
+from math import gcd
+from typing import Dict, Tuple
+
+import numpy as np
+import soundfile as sf
+from scipy.signal import resample_poly
+
+from .atomic_io import file_lock
+
+SEGMENT_CODECS = ("pcm", "flac", "opus")
+
+# Opus only supports a few sample rates; segments are stored at Whisper's rate
+_OPUS_SAMPLE_RATE = 16000
+
+_INDEX_HEADER = "key\toffset\tlength\tcodec\tsample_rate\tchannels\n"
+
+
+@dataclass(frozen=True)
+class IndexEntry:
+    """Location and encoding of one stored segment."""
+
+    offset: int
+    length: int
+    codec: str
+    sample_rate: int
+    channels: int
+
+
+def _encode(audio: np.ndarray, sr: int, codec: str) -> Tuple[bytes, int]:
+    """Encode a segment; returns the payload and the stored sample rate."""
+    audio = np.clip(np.asarray(audio, dtype=np.float32), -1.0, 1.0)
+    if codec == "pcm":
+        return (audio * 32767).astype("<i2").tobytes(), sr
+
+    if codec == "opus":
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        if sr != _OPUS_SAMPLE_RATE:
+            divisor = gcd(int(sr), _OPUS_SAMPLE_RATE)
+            audio = resample_poly(audio, _OPUS_SAMPLE_RATE // divisor, sr // divisor)
+            sr = _OPUS_SAMPLE_RATE
+        buffer = io.BytesIO()
+        sf.write(buffer, audio, sr, format="OGG", subtype="OPUS")
+        return buffer.getvalue(), sr
+
+    buffer = io.BytesIO()
+    sf.write(buffer, audio, sr, format="FLAC", subtype="PCM_16")
+    return buffer.getvalue(), sr
+
+
+def _decode(payload: bytes, entry: IndexEntry) -> np.ndarray:
+    if entry.codec == "pcm":
+        audio = np.frombuffer(payload, dtype="<i2").astype(np.float32) / 32767
+        if entry.channels > 1:
+            audio = audio.reshape(-1, entry.channels)
+        return audio
+    audio, _sr = sf.read(io.BytesIO(payload), dtype="float32")
+    return audio
+
+
+@dataclass
+class SegmentStore:
+    """Append-only pack of segment audio with an offset index.
+
+    The pack lives at ``<output_dir>/<prefix>_segments.pack`` and its index at
+    ``<prefix>_segments.index.tsv``. Appends hold an advisory lock, and index
+    lines are only written once their payload is on disk, so several
+    processes can share a store and readers never see partial segments. Within
+    a process, the in-memory index is guarded by a lock, so one store can be
+    used from several threads (e.g. batch preparation threads).
+
+    Args:
+        path: Location of the pack file.
+        codec: Codec for new segments ('pcm', 'flac' or 'opus'). Existing
+            segments keep the codec they were stored with.
+    """
+
+    path: str
+    codec: str = "flac"
+    index: Dict[str, IndexEntry] = field(default_factory=dict, init=False)
+    _index_bytes_read: int = field(default=0, init=False, repr=False)
+    _index_lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False
+    )
+
+    def __post_init__(self) -> None:
+        if self.codec not in SEGMENT_CODECS:
+            raise ValueError(
+                f"codec must be one of {SEGMENT_CODECS}, got {self.codec!r}"
+            )
+        self._refresh()
+
+    @classmethod
+    def for_speaker(cls, output_dir: str, prefix: str, codec: str) -> SegmentStore:
+        return cls(os.path.join(output_dir, f"{prefix}_segments.pack"), codec)
+
+    @property
+    def index_path(self) -> str:
+        return os.path.splitext(self.path)[0] + ".index.tsv"
+
+    def _refresh(self) -> None:
+        """Read index lines appended (by any process) since the last refresh."""
+        with self._index_lock:
+            self._read_new_index_lines()
+
+    def _read_new_index_lines(self) -> None:
+        if not os.path.exists(self.index_path):
+            return
+        with open(self.index_path, "rb") as index_file:
+            index_file.seek(self._index_bytes_read)
+            for raw_line in index_file:
+                if not raw_line.endswith(b"\n"):
+                    break
+                self._index_bytes_read += len(raw_line)
+                line = raw_line.decode("utf-8")
+                if line == _INDEX_HEADER:
+                    continue
+                key, offset, length, codec, sample_rate, channels = line.rstrip(
+                    "\n"
+                ).split("\t")
+                self.index[key] = IndexEntry(
+                    int(offset), int(length), codec, int(sample_rate), int(channels)
+                )
+
+    def __contains__(self, key: str) -> bool:
+        with self._index_lock:
+            return key in self.index
+
+    def put(self, key: str, audio: np.ndarray, sr: int) -> None:
+        """Append a segment unless the store already holds ``key``."""
+        payload, stored_sr = _encode(audio, sr, self.codec)
+        with file_lock(self.path):
+            self._refresh()
+            if key in self:
+                return
+            with open(self.path, "ab") as pack_file:
+                offset = pack_file.tell()
+                pack_file.write(payload)
+                pack_file.flush()
+                os.fsync(pack_file.fileno())
+
+            entry = IndexEntry(
+                offset,
+                len(payload),
+                self.codec,
+                stored_sr,
+                1 if self.codec == "opus" or np.ndim(audio) == 1 else audio.shape[1],
+            )
+            new_index = not os.path.exists(self.index_path)
+            with open(self.index_path, "a", encoding="utf-8") as index_file:
+                if new_index:
+                    index_file.write(_INDEX_HEADER)
+                index_file.write(
+                    f"{key}\t{entry.offset}\t{entry.length}\t{entry.codec}\t"
+                    f"{entry.sample_rate}\t{entry.channels}\n"
+                )
+            self._refresh()
+
+    def get(self, key: str) -> Tuple[np.ndarray, int]:
+        """Read one segment; returns ``(audio, sample_rate)``."""
+        if key not in self:
+            # Another process may be appending it; wait for a complete index line
+            with file_lock(self.path):
+                self._refresh()
+        with self._index_lock:
+            entry = self.index[key]
+        with open(self.path, "rb") as pack_file:
+            pack_file.seek(entry.offset)
+            payload = pack_file.read(entry.length)
+        return _decode(payload, entry), entry.sample_rate
@@ -5,23 +5,152 @@ https://github.com/hanlululu/Conversational_speech_labeling_pipeline
 """
 
 import gc
+import hashlib
+import json
+import multiprocessing
 import os
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from functools import partial
+from itertools import islice
+from math import gcd
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+)
 
 import numpy as np
 import pandas as pd
 import soundfile as sf
 import torch
 from faster_whisper import BatchedInferencePipeline, WhisperModel
+from faster_whisper import __version__ as faster_whisper_version
+from scipy.signal import resample_poly
 from tqdm.auto import tqdm
-from transformers import AutoModelForSpeechSeq2Seq, AutoProcessor, pipeline
+from transformers import (
+    AutoConfig,
+    AutoModelForCausalLM,
+    AutoModelForSpeechSeq2Seq,
+    AutoProcessor,
+    pipeline,
+)
+
+from .atomic_io import atomic_write, file_lock
+from .autotune import (
+    DEFAULT_BATCH_SIZES,
+    AutotuneResult,
+    _is_out_of_memory,
+    autotune,
+    default_memory_budget,
+    default_thread_counts,
+    host_key,
+)
+from .cache_manager import touch
+from .log_mel import LogMelStore, whisper_input_features, with_log_mel
+from .segment_store import SEGMENT_CODECS, SegmentStore
 
 # from transformers.pipelines.base import Pipeline
 
 # Set PyTorch CUDA memory configuration for better fragmentation handling
 os.environ["PYTORCH_ALLOC_CONF"] = "expandable_segments:True"
 
+# Sample rate expected by all Whisper feature extractors
+WHISPER_SAMPLE_RATE = 16000
+
+# Length of the audio window Whisper decodes in one pass
+WHISPER_CHUNK_SEC = 30.0
+
+# Compute types tried by autotuning, per (backend, device)
+AUTOTUNE_COMPUTE_TYPES = {
+    ("faster-whisper", "cpu"): ("int8", "int8_float32", "float32"),
+    ("faster-whisper", "cuda"): ("float16", "int8_float16"),
+    ("transformers-cpu", "cpu"): ("float32", "int8"),
+}
+
+# Per-segment decoder confidence reported alongside each transcription
+CONFIDENCE_FIELDS = ("avg_logprob", "no_speech_prob", "compression_ratio")
+
+
+@dataclass
+class CascadeThresholds:
+    """Confidence limits for accepting a cascade first-pass transcription.
+
+    A segment is escalated to the main model when any limit is violated. The
+    defaults are Whisper's own fallback thresholds. Unavailable values (NaN)
+    never trigger escalation.
+    """
+
+    min_avg_logprob: float = -1.0
+    max_no_speech_prob: float = 0.6
+    max_compression_ratio: float = 2.4
+
+    def should_escalate(self, record: Dict[str, Any]) -> bool:
+        if record["text"].startswith("[TRANSCRIPTION_FAILED:"):
+            return True
+        return bool(
+            record["avg_logprob"] < self.min_avg_logprob
+            or record["no_speech_prob"] > self.max_no_speech_prob
+            or record["compression_ratio"] > self.max_compression_ratio
+        )
+
+
+@dataclass
+class CascadeStats:
+    """Work done by the two stages of a model cascade."""
+
+    segments: int = 0
+    escalated: int = 0
+    audio_sec: float = 0.0
+    escalated_audio_sec: float = 0.0
+    draft_time_sec: float = 0.0
+    escalation_time_sec: float = 0.0
+
+    def merge(self, other: "CascadeStats") -> None:
+        self.segments += other.segments
+        self.escalated += other.escalated
+        self.audio_sec += other.audio_sec
+        self.escalated_audio_sec += other.escalated_audio_sec
+        self.draft_time_sec += other.draft_time_sec
+        self.escalation_time_sec += other.escalation_time_sec
+
+    def report(self) -> Dict[str, float]:
+        """Summarise the escalated fraction and the speedup over the main model.
+
+        The main model's time for all segments is extrapolated from its
+        seconds-per-audio-second on the escalated segments, so ``speedup`` is an
+        estimate and NaN when nothing was escalated.
+        """
+        cascade_time = self.draft_time_sec + self.escalation_time_sec
+        if self.escalated_audio_sec > 0 and cascade_time > 0:
+            main_rtf = self.escalation_time_sec / self.escalated_audio_sec
+            speedup = main_rtf * self.audio_sec / cascade_time
+        else:
+            speedup = float("nan")
+        return {
+            "segments": float(self.segments),
+            "escalated": float(self.escalated),
+            "escalated_fraction": (
+                self.escalated / self.segments if self.segments else 0.0
+            ),
+            "escalated_audio_fraction": (
+                self.escalated_audio_sec / self.audio_sec if self.audio_sec else 0.0
+            ),
+            "draft_time_sec": self.draft_time_sec,
+            "escalation_time_sec": self.escalation_time_sec,
+            "speedup": speedup,
+        }
+
 
 @dataclass
 class TransformersASRModel:
@@ -32,7 +161,44 @@ class TransformersASRModel:
     device: str
     cache_dir: Optional[str]
     model_batch_size: int
-    compute_type: str
+    compute_type: Optional[str]
+    cpu_threads: int = 0
+    cascade_model: Optional["TransformersASRModel"] = None
+    cascade_thresholds: CascadeThresholds = field(default_factory=CascadeThresholds)
+    cascade_stats: CascadeStats = field(default_factory=CascadeStats)
+    # Direct-generate state of the "transformers-cpu" backend
+    hf_model: Any = None
+    processor: Any = None
+    autocast_dtype: Any = None
+    # Draft model for speculative (assisted) decoding, transformers backends only
+    assistant_model: Any = None
+    # Backend-specific load_whisper_model options, used to re-create the model
+    backend_options: Dict[str, Any] = field(default_factory=dict)
+    # Benchmark behind the execution parameters when loaded with autotune=True
+    autotune_result: Optional[AutotuneResult] = None
+    batch_controller: "AdaptiveBatchSize" = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.batch_controller = AdaptiveBatchSize(max(1, int(self.model_batch_size)))
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the weights are in this process (``False`` with ``lazy=True``)."""
+        return self.pipeline is not None
+
+    def load_kwargs(self) -> Dict[str, Any]:
+        """:func:`load_whisper_model` arguments that re-create the main model."""
+        return {
+            "transcription_model_name": self.transcription_model_name,
+            "device": self.device,
+            "language": self.language,
+            "cache_dir": self.cache_dir,
+            "model_batch_size": self.model_batch_size,
+            "backend": self.backend,
+            "compute_type": self.compute_type,
+            "cpu_threads": self.cpu_threads,
+            **self.backend_options,
+        }
 
 
 def load_whisper_model(
@@ -43,6 +209,16 @@ def load_whisper_model(
     model_batch_size: int = 100,
     backend: str = "auto",
     compute_type: Optional[str] = None,
+    cpu_threads: int = 0,
+    cascade_model_name: Optional[str] = None,
+    cascade_thresholds: Optional[CascadeThresholds] = None,
+    quantize_int8: bool = False,
+    bf16_autocast: Optional[bool] = None,
+    static_cache: bool = True,
+    assistant_model_name: Optional[str] = None,
+    autotune: bool = False,
+    autotune_memory_budget: Optional[int] = None,
+    lazy: bool = False,
 ) -> TransformersASRModel:
     """Initialise and return a Whisper ASR model via the Transformers pipeline.
 
@@ -57,9 +233,59 @@ def load_whisper_model(
     cache_dir
         Optional directory for model caching
     model_batch_size
-        Maximum number of audio files to process in parallel. Higher values improve
-        throughput but require more GPU memory.
+        Maximum number of audio files to process in parallel (for faster-whisper,
+        30 s chunks of one file). Higher values improve throughput but require
+        more GPU memory.
         Recommended: 1-8 for large models, 16-32 for smaller models.
+    cpu_threads
+        Number of CPU threads used for inference. ``0`` keeps the library default
+        (all cores). Set this when several worker processes share one host.
+    cascade_model_name
+        Optional smaller model (e.g. 'small') that transcribes every segment
+        first. Only segments whose first-pass confidence violates
+        ``cascade_thresholds`` are re-transcribed by the main model.
+    cascade_thresholds
+        Escalation limits for the cascade; defaults to Whisper's fallback
+        thresholds.
+    quantize_int8
+        ``backend='transformers-cpu'`` only: apply dynamic int8 quantization to
+        all linear layers.
+    bf16_autocast
+        ``backend='transformers-cpu'`` only: run generation under bfloat16
+        autocast. ``None`` enables it when the CPU has native bf16 support.
+    static_cache
+        ``backend='transformers-cpu'`` only: use a preallocated static KV cache
+        for generation.
+    assistant_model_name
+        Transformers backends only: a smaller draft checkpoint (e.g.
+        'distil-whisper/distil-large-v3' or 'openai/whisper-tiny') for
+        speculative decoding. The draft proposes tokens that the main model
+        verifies, so transcripts are identical to greedy decoding with the main
+        model. Assisted generation decodes one segment at a time.
+    autotune
+        Choose ``model_batch_size``, ``compute_type`` and ``cpu_threads`` with a
+        short synthetic microbenchmark instead of taking them as given (see
+        :func:`~.autotune.autotune`). An explicit ``compute_type`` or
+        ``cpu_threads > 0`` is kept and only the remaining parameters are tuned;
+        ``model_batch_size`` is ignored. For faster-whisper, the batch size is
+        benchmarked on the chunks of one input, which is what it batches. The
+        choice is cached per host CPU model, core count and model name, so only
+        the first load on a host pays for the benchmark.
+    autotune_memory_budget
+        Peak memory in bytes (process memory on CPU, CUDA allocation on GPU) a
+        tuned configuration may use. Defaults to what is in use plus 80% of the
+        memory currently available.
+    lazy
+        Resolve the configuration (backend, cascade, autotuned parameters) but
+        load no weights. The returned model can only be passed to
+        :func:`transcribe_segments` with ``num_workers > 1``, whose worker
+        processes load their own copies, and to :func:`detect_speaker_language`,
+        which loads the main model briefly when no cached detection exists.
+
+    The ``'transformers-cpu'`` backend loads the transformers model with SDPA
+    attention and decodes segments of up to 30 s with a direct
+    ``generate`` call under ``torch.inference_mode``; longer inputs and word
+    timestamps go through the regular pipeline sharing the same model.
 
     Returns
     -------
@@ -67,6 +293,38 @@ def load_whisper_model(
         Wrapper containing the configured transformers pipeline
     """
 
+    if cascade_model_name is not None:
+        main_model = load_whisper_model(
+            transcription_model_name=transcription_model_name,
+            device=device,
+            language=language,
+            cache_dir=cache_dir,
+            model_batch_size=model_batch_size,
+            backend=backend,
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+            quantize_int8=quantize_int8,
+            bf16_autocast=bf16_autocast,
+            static_cache=static_cache,
+            assistant_model_name=assistant_model_name,
+            autotune=autotune,
+            autotune_memory_budget=autotune_memory_budget,
+            lazy=lazy,
+        )
+        main_model.cascade_model = load_whisper_model(
+            transcription_model_name=cascade_model_name,
+            device=device,
+            language=language,
+            cache_dir=cache_dir,
+            model_batch_size=main_model.model_batch_size,
+            compute_type=compute_type,
+            cpu_threads=main_model.cpu_threads,
+            lazy=lazy,
+        )
+        if cascade_thresholds is not None:
+            main_model.cascade_thresholds = cascade_thresholds
+        return main_model
+
     if backend == "auto":
         if transcription_model_name.startswith("faster-whisper:"):
             backend = "faster-whisper"
@@ -75,6 +333,62 @@ def load_whisper_model(
         else:
             backend = "faster-whisper"
 
+    if autotune:
+        load_kwargs = {
+            "transcription_model_name": transcription_model_name,
+            "device": device,
+            "language": language,
+            "cache_dir": cache_dir,
+            "backend": backend,
+            "compute_type": compute_type,
+            "cpu_threads": cpu_threads,
+            "quantize_int8": quantize_int8,
+            "bf16_autocast": bf16_autocast,
+            "static_cache": static_cache,
+            "assistant_model_name": assistant_model_name,
+        }
+        result = _autotune_execution(load_kwargs, autotune_memory_budget)
+        load_kwargs.update(
+            model_batch_size=result.config.model_batch_size,
+            cpu_threads=result.config.cpu_threads,
+        )
+        if backend == "transformers-cpu":
+            load_kwargs["quantize_int8"] = result.config.compute_type == "int8"
+        else:
+            load_kwargs["compute_type"] = result.config.compute_type
+        asr_model = load_whisper_model(**load_kwargs, lazy=lazy)
+        asr_model.autotune_result = result
+        return asr_model
+
+    if backend == "faster-whisper" and assistant_model_name is not None:
+        raise ValueError(
+            "assistant_model_name requires the 'transformers' or "
+            "'transformers-cpu' backend"
+        )
+
+    if lazy:
+        backend_options: Dict[str, Any] = {}
+        if backend == "transformers-cpu":
+            backend_options.update(
+                quantize_int8=quantize_int8,
+                bf16_autocast=bf16_autocast,
+                static_cache=static_cache,
+            )
+        if assistant_model_name is not None:
+            backend_options["assistant_model_name"] = assistant_model_name
+        return TransformersASRModel(
+            backend=backend,
+            pipeline=None,
+            language=language,
+            transcription_model_name=transcription_model_name,
+            device=device,
+            cache_dir=cache_dir,
+            model_batch_size=model_batch_size,
+            compute_type=compute_type,
+            cpu_threads=cpu_threads,
+            backend_options=backend_options,
+        )
+
     if backend == "faster-whisper":
         model_id = transcription_model_name
         if model_id.startswith("faster-whisper:"):
@@ -92,6 +406,7 @@ def load_whisper_model(
             model_id,
             device=device,
             compute_type=compute_type,
+            cpu_threads=cpu_threads,
             download_root=cache_dir,
         )
         fw_pipeline = BatchedInferencePipeline(model=fw_model)
@@ -105,7 +420,26 @@ def load_whisper_model(
             cache_dir=cache_dir,
             model_batch_size=model_batch_size,
             compute_type=compute_type,
+            cpu_threads=cpu_threads,
+        )
+
+    if cpu_threads > 0:
+        torch.set_num_threads(cpu_threads)
+
+    if backend == "transformers-cpu":
+        asr_model = _load_transformers_cpu(
+            transcription_model_name,
+            language=language,
+            cache_dir=cache_dir,
+            model_batch_size=model_batch_size,
+            cpu_threads=cpu_threads,
+            quantize_int8=quantize_int8,
+            bf16_autocast=bf16_autocast,
+            static_cache=static_cache,
         )
+        if assistant_model_name is not None:
+            _attach_assistant_model(asr_model, assistant_model_name)
+        return asr_model
 
     # Convert device string to torch.device
     if device == "auto":
@@ -140,7 +474,7 @@ def load_whisper_model(
         chunk_length_s=30.0,
     )
 
-    return TransformersASRModel(
+    asr_model = TransformersASRModel(
         backend="transformers",
         pipeline=pipe,
         language=language,
@@ -149,145 +483,1575 @@ def load_whisper_model(
         cache_dir=cache_dir,
         model_batch_size=model_batch_size,
         compute_type=compute_type or "float16",
+        cpu_threads=cpu_threads,
+    )
+    if assistant_model_name is not None:
+        _attach_assistant_model(asr_model, assistant_model_name)
+    return asr_model
+
+
+def _autotune_execution(
+    load_kwargs: Dict[str, Any], memory_budget: Optional[int]
+) -> AutotuneResult:
+    """Benchmark the execution parameters not fixed in ``load_kwargs``."""
+
+    backend = load_kwargs["backend"]
+    device = load_kwargs["device"]
+    if backend == "transformers-cpu":
+        device = "cpu"
+    elif device in ("auto", "cuda"):
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    if load_kwargs["compute_type"] is not None:
+        compute_types: Tuple[str, ...] = (load_kwargs["compute_type"],)
+    elif backend == "transformers-cpu" and load_kwargs["quantize_int8"]:
+        compute_types = ("int8",)
+    else:
+        # The transformers pipeline derives its dtype from the device
+        compute_types = AUTOTUNE_COMPUTE_TYPES.get((backend, device), ("float32",))
+
+    if load_kwargs["cpu_threads"] > 0:
+        thread_counts = [load_kwargs["cpu_threads"]]
+    elif device == "cuda":
+        thread_counts = [0]
+    else:
+        thread_counts = default_thread_counts()
+
+    def load(compute_type: str, cpu_threads: int) -> TransformersASRModel:
+        kwargs = {**load_kwargs, "cpu_threads": cpu_threads}
+        if backend == "transformers-cpu":
+            kwargs["quantize_int8"] = compute_type == "int8"
+        else:
+            kwargs["compute_type"] = compute_type
+        return load_whisper_model(**kwargs)
+
+    def run(model: TransformersASRModel, clips: List[np.ndarray]) -> Any:
+        if backend == "faster-whisper":
+            # Its batch size applies to the chunks of one input
+            return _fw_transcribe_chunks(clips, model)
+        return _backend_runner(model)(clips, model)
+
+    # Assisted generation decodes one segment at a time anyway
+    batch_sizes = (1,) if load_kwargs["assistant_model_name"] else DEFAULT_BATCH_SIZES
+    # Results of restricted searches are only reused by the same search
+    search = [
+        ",".join(compute_types),
+        ",".join(map(str, thread_counts)),
+        ",".join(map(str, batch_sizes)),
+    ]
+    if backend == "faster-whisper":
+        # Batch sizes count chunks of one input (see _fw_transcribe_chunks)
+        search.append("chunk-batch")
+    return autotune(
+        key=host_key(load_kwargs["transcription_model_name"], backend, device, *search),
+        load=load,
+        run=run,
+        compute_types=compute_types,
+        thread_counts=thread_counts,
+        batch_sizes=batch_sizes,
+        device=device,
+        memory_budget=(
+            memory_budget
+            if memory_budget is not None
+            else default_memory_budget(device)
+        ),
+    )
+
+
+def _attach_assistant_model(
+    asr_model: TransformersASRModel, assistant_model_name: str
+) -> None:
+    """Load a draft model for speculative decoding next to the main model.
+
+    A draft that shares the main model's encoder architecture (e.g.
+    distil-whisper checkpoints of the same size) is loaded decoder-only and
+    reuses the main model's encoder outputs; any other Whisper checkpoint is
+    loaded as a full encoder-decoder model.
+    """
+    main_model = asr_model.pipeline.model
+    main_config = main_model.config
+    assistant_config = AutoConfig.from_pretrained(
+        assistant_model_name, cache_dir=asr_model.cache_dir
+    )
+    shares_encoder = (
+        assistant_config.d_model == main_config.d_model
+        and assistant_config.encoder_layers == main_config.encoder_layers
+    )
+    model_class = AutoModelForCausalLM if shares_encoder else AutoModelForSpeechSeq2Seq
+
+    load_kwargs: Dict[str, Any] = {
+        "torch_dtype": main_model.dtype,
+        "cache_dir": asr_model.cache_dir,
+    }
+    if asr_model.backend == "transformers-cpu":
+        load_kwargs["attn_implementation"] = "sdpa"
+    assistant = model_class.from_pretrained(assistant_model_name, **load_kwargs)
+    assistant.to(main_model.device)
+    assistant.eval()
+
+    # Assisted generation manages its own caches
+    main_model.generation_config.cache_implementation = None
+
+    asr_model.assistant_model = assistant
+    asr_model.backend_options["assistant_model_name"] = assistant_model_name
+
+
+def _cpu_supports_bf16() -> bool:
+    """Whether the host CPU advertises native bfloat16 arithmetic (AVX512/AMX)."""
+
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as cpuinfo:
+            flags = cpuinfo.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def _load_transformers_cpu(
+    transcription_model_name: str,
+    language: Optional[str],
+    cache_dir: Optional[str],
+    model_batch_size: int,
+    cpu_threads: int,
+    quantize_int8: bool,
+    bf16_autocast: Optional[bool],
+    static_cache: bool,
+) -> TransformersASRModel:
+    """Load a transformers Whisper model tuned for CPU inference."""
+
+    model = AutoModelForSpeechSeq2Seq.from_pretrained(
+        transcription_model_name,
+        torch_dtype=torch.float32,
+        cache_dir=cache_dir,
+        attn_implementation="sdpa",
+    )
+    model.eval()
+    if quantize_int8:
+        model = torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    if static_cache:
+        model.generation_config.cache_implementation = "static"
+    if bf16_autocast is None:
+        bf16_autocast = _cpu_supports_bf16()
+
+    processor = AutoProcessor.from_pretrained(
+        transcription_model_name, cache_dir=cache_dir
+    )
+
+    # Fallback for inputs longer than one Whisper window and word timestamps
+    pipe = pipeline(
+        "automatic-speech-recognition",
+        model=model,
+        tokenizer=processor.tokenizer,
+        feature_extractor=processor.feature_extractor,
+        batch_size=model_batch_size,
+        torch_dtype=torch.float32,
+        device=torch.device("cpu"),
+        chunk_length_s=30.0,
+    )
+
+    return TransformersASRModel(
+        backend="transformers-cpu",
+        pipeline=pipe,
+        language=language,
+        transcription_model_name=transcription_model_name,
+        device="cpu",
+        cache_dir=cache_dir,
+        model_batch_size=model_batch_size,
+        compute_type="int8" if quantize_int8 else "float32",
+        cpu_threads=cpu_threads,
+        hf_model=model,
+        processor=processor,
+        autocast_dtype=torch.bfloat16 if bf16_autocast else None,
+        backend_options={
+            "quantize_int8": quantize_int8,
+            "bf16_autocast": bf16_autocast,
+            "static_cache": static_cache,
+        },
     )
 
 
 def _save_segment_wav(
     out_path: str, audio_array: np.ndarray, sr: int = 16000, compress: bool = True
 ) -> None:
-    """Persist a speech segment to disk as 16-bit PCM WAV."""
+    """Persist a speech segment to disk as 16-bit PCM WAV (atomically)."""
 
+    subtype = None
     if compress:
         if audio_array.dtype != np.float32:
             audio_array = audio_array.astype(np.float32)
         audio_array = np.clip(audio_array, -1.0, 1.0)
-        sf.write(out_path, audio_array, samplerate=sr, subtype="PCM_16")
-    else:
-        sf.write(out_path, audio_array, samplerate=sr)
+        subtype = "PCM_16"
+    with atomic_write(out_path, "wb") as wav_file:
+        sf.write(wav_file, audio_array, samplerate=sr, subtype=subtype, format="WAV")
+
+
+def _segment_key(seg_filename: str) -> str:
+    """Key of a segment in a :class:`SegmentStore` (its file stem)."""
+    return os.path.splitext(os.path.basename(seg_filename))[0]
+
+
+def to_model_input(audio_array: np.ndarray, sr: int) -> np.ndarray:
+    """Downmix and resample a waveform to the mono 16 kHz float32 Whisper expects."""
+
+    if audio_array.ndim > 1:
+        audio_array = audio_array.mean(axis=1)
+    if sr != WHISPER_SAMPLE_RATE:
+        divisor = gcd(int(sr), WHISPER_SAMPLE_RATE)
+        audio_array = resample_poly(
+            audio_array, WHISPER_SAMPLE_RATE // divisor, int(sr) // divisor
+        )
+    return np.ascontiguousarray(audio_array, dtype=np.float32)
+
+
+def _compression_ratio(text: str) -> float:
+    """Whisper's repetition measure: raw over zlib-compressed UTF-8 length."""
+
+    text_bytes = text.encode("utf-8")
+    if not text_bytes:
+        return float("nan")
+    return len(text_bytes) / len(zlib.compress(text_bytes))
+
+
+def make_record(
+    text: str,
+    avg_logprob: float = float("nan"),
+    no_speech_prob: float = float("nan"),
+) -> Dict[str, Any]:
+    """Bundle a transcription with its decoder confidence."""
+
+    return {
+        "text": text,
+        "avg_logprob": float(avg_logprob),
+        "no_speech_prob": float(no_speech_prob),
+        "compression_ratio": _compression_ratio(text),
+    }
+
+
+def _confidence_path(txt_cache: str) -> str:
+    return os.path.splitext(txt_cache)[0] + ".json"
+
+
+def _read_cached_record(
+    txt_cache: str, word_timestamps: bool = False
+) -> Optional[Dict[str, Any]]:
+    """Return a cached transcription record, or ``None`` if missing or failed.
+
+    The text lives in ``txt_cache``; confidence values (and ``words``, if it was
+    transcribed with word timestamps) come from the optional JSON sidecar next
+    to it and are NaN when it is absent. With ``word_timestamps``, a record
+    without words counts as missing.
+    """
+
+    if not os.path.exists(txt_cache):
+        return None
+    with open(txt_cache, "r", encoding="utf-8") as cache_file:
+        cached_text = cache_file.read().strip()
+    if cached_text.startswith("[TRANSCRIPTION_FAILED:"):
+        return None
+    touch(txt_cache)
+
+    record = make_record(cached_text)
+    confidence_path = _confidence_path(txt_cache)
+    if os.path.exists(confidence_path):
+        with open(confidence_path, "r", encoding="utf-8") as confidence_file:
+            for key, value in json.load(confidence_file).items():
+                record[key] = float("nan") if value is None else value
+    if word_timestamps and "words" not in record:
+        return None
+    return record
+
+
+def _write_cached_record(txt_cache: str, record: Dict[str, Any]) -> None:
+    """Persist a transcription record as text plus a JSON confidence sidecar.
+
+    Both files are replaced atomically; the text file, which marks a cache hit,
+    is written last so a hit always finds its sidecar.
+    """
+
+    confidence = {
+        key: (None if isinstance(value, float) and np.isnan(value) else value)
+        for key, value in record.items()
+        if key != "text"
+    }
+    with atomic_write(_confidence_path(txt_cache)) as confidence_file:
+        json.dump(confidence, confidence_file)
+
+    with atomic_write(txt_cache) as cache_file:
+        cache_file.write(record["text"])
+
+
+def _input_duration(item: Any) -> float:
+    """Duration in seconds of a model input (16 kHz array or audio file path)."""
+
+    if isinstance(item, np.ndarray):
+        return item.shape[0] / WHISPER_SAMPLE_RATE
+    return float(sf.info(item).duration)
+
+
+def iter_prefetched(
+    items: Iterable[Any],
+    prepare: Callable[[Any], Any],
+    num_workers: int = 2,
+    prefetch: int = 2,
+) -> Iterator[Any]:
+    """Yield ``prepare(item)`` in order while upcoming items are prepared ahead.
 
+    At most ``prefetch`` prepared items are held in the bounded look-ahead queue,
+    which caps memory regardless of how many items there are. The next item is
+    submitted before the current one is yielded, so its preparation overlaps with
+    whatever the consumer does with the current one (e.g. model decoding).
+    With ``num_workers <= 0`` items are prepared synchronously.
+    """
+
+    if num_workers <= 0 or prefetch <= 0:
+        for item in items:
+            yield prepare(item)
+        return
+
+    iterator = iter(items)
+    window: Deque[Future] = deque()
+    executor = ThreadPoolExecutor(
+        max_workers=num_workers, thread_name_prefix="asr-prefetch"
+    )
+    try:
+        for item in islice(iterator, prefetch):
+            window.append(executor.submit(prepare, item))
+        while window:
+            prepared = window.popleft().result()
+            for item in islice(iterator, 1):
+                window.append(executor.submit(prepare, item))
+            yield prepared
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _fw_collect_record(segments: Any, word_timestamps: bool = False) -> Dict[str, Any]:
+    """Collect text and token-weighted confidence from faster-whisper segments.
+
+    With ``word_timestamps`` the record also holds ``words``, a list of
+    ``(start, end, word, probability)`` tuples relative to the input start.
+    """
+    segments = list(segments)
+    text = " ".join(segment.text.strip() for segment in segments).strip()
+    if not segments:
+        record = make_record(text)
+    else:
+        weights = np.array([max(1, len(segment.tokens)) for segment in segments])
+        record = make_record(
+            text,
+            avg_logprob=np.average([s.avg_logprob for s in segments], weights=weights),
+            no_speech_prob=np.average(
+                [s.no_speech_prob for s in segments], weights=weights
+            ),
+        )
 
-def _fw_collect_text(segments: Any) -> str:
-    """Collect text from faster-whisper segments."""
-    return " ".join(segment.text.strip() for segment in segments).strip()
+    if word_timestamps:
+        record["words"] = [
+            (float(w.start), float(w.end), w.word.strip(), float(w.probability))
+            for segment in segments
+            for w in segment.words or []
+        ]
+    return record
 
 
 def _fw_transcribe_files(
-    files_to_transcribe: List[str],
+    files_to_transcribe: List[Any],
     model: TransformersASRModel,
-) -> List[str]:
-    """Transcribe a list of files with faster-whisper, with batching fallback."""
+    word_timestamps: bool = False,
+    language: Optional[str] = None,
+    batch_size: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Transcribe a list of files with faster-whisper, one call per file.
+
+    ``BatchedInferencePipeline`` takes a single input and batches its 30 s
+    chunks internally, ``batch_size`` at a time (default:
+    ``model.model_batch_size``). Entries may be file paths or mono 16 kHz
+    float32 arrays. Failures propagate to the caller (see
+    :func:`_transcribe_adaptive`). ``language`` overrides ``model.language``.
+    """
     fw_pipeline: BatchedInferencePipeline = model.pipeline
-    language = model.language
-    effective_batch_size = max(1, int(model.model_batch_size))
+    language = language or model.language
+    batch_size = batch_size or max(1, int(model.model_batch_size))
 
-    try:
+    records = []
+    for item in files_to_transcribe:
         segments, _info = fw_pipeline.transcribe(
-            files_to_transcribe,
-            batch_size=effective_batch_size,
+            item,
+            batch_size=batch_size,
             language=language,
             task="transcribe",
+            word_timestamps=word_timestamps,
         )
+        records.append(_fw_collect_record(segments, word_timestamps))
+    return records
 
-        if isinstance(segments, list):
-            if segments and isinstance(segments[0], list):
-                return [_fw_collect_text(segs) for segs in segments]
-            return [_fw_collect_text(segments)]
-
-        return [_fw_collect_text(list(segments))]
-    except Exception:
-        texts = []
-        for seg_file in files_to_transcribe:
-            segments, _info = fw_pipeline.transcribe(
-                seg_file,
-                batch_size=1,
-                language=language,
-                task="transcribe",
+
+def _fw_transcribe_chunks(
+    chunks: List[np.ndarray], model: TransformersASRModel
+) -> List[Dict[str, Any]]:
+    """Transcribe ``chunks`` as the chunks of one faster-whisper input.
+
+    The chunks (each at most 30 s) are joined and their bounds passed as clip
+    timestamps, so VAD is skipped and the pipeline decodes them ``len(chunks)``
+    at a time. Used to benchmark the pipeline's internal batch size.
+    """
+    bounds = np.cumsum([0] + [len(chunk) for chunk in chunks])
+    # faster-whisper takes clip timestamps in samples before 1.2, in seconds after
+    major, minor = (int(part) for part in faster_whisper_version.split(".")[:2])
+    if (major, minor) >= (1, 2):
+        bounds = bounds / WHISPER_SAMPLE_RATE
+    clip_timestamps = [
+        {"start": start, "end": end}
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist())
+    ]
+    segments, _info = model.pipeline.transcribe(
+        np.concatenate(chunks),
+        batch_size=len(chunks),
+        language=model.language,
+        task="transcribe",
+        clip_timestamps=clip_timestamps,
+    )
+    return [_fw_collect_record(segments)]
+
+
+def _hf_transcribe_files(
+    files_to_transcribe: List[Any],
+    model: TransformersASRModel,
+    word_timestamps: bool = False,
+    language: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Transcribe a list of files with the transformers pipeline in a single call.
+
+    Entries may be file paths or mono 16 kHz float32 arrays. The pipeline does
+    not expose token scores, so only the compression ratio is reported.
+    ``language`` overrides ``model.language``.
+    """
+    pipe = model.pipeline
+    language = language or model.language
+
+    generate_kwargs: Dict[str, Any] = {
+        "task": "transcribe"
+    }  # , "return_timestamps": True
+    if language:
+        generate_kwargs["language"] = language
+    generate_kwargs.update(_assisted_generate_kwargs(model))
+
+    # The HF pipeline takes raw arrays as dicts carrying their sample rate
+    pipe_inputs = [
+        (
+            {"raw": item, "sampling_rate": WHISPER_SAMPLE_RATE}
+            if isinstance(item, np.ndarray)
+            else item
+        )
+        for item in files_to_transcribe
+    ]
+
+    batch_results = pipe(
+        pipe_inputs,
+        return_timestamps="word" if word_timestamps else True,
+        generate_kwargs=generate_kwargs,
+        # Assisted generation only supports one sequence at a time
+        batch_size=1 if model.assistant_model is not None else len(pipe_inputs),
+    )
+
+    if isinstance(batch_results, dict):
+        batch_results = [batch_results]
+
+    records = []
+    for result in batch_results:
+        record = make_record(result.get("text", "").strip())
+        if word_timestamps:
+            record["words"] = [
+                (
+                    float(chunk["timestamp"][0]),
+                    float(
+                        chunk["timestamp"][1]
+                        if chunk["timestamp"][1] is not None
+                        else chunk["timestamp"][0]
+                    ),
+                    chunk["text"].strip(),
+                    float("nan"),
+                )
+                for chunk in result.get("chunks", [])
+            ]
+        records.append(record)
+    return records
+
+
+def _hf_generate_files(
+    files_to_transcribe: List[Any],
+    model: TransformersASRModel,
+    word_timestamps: bool = False,
+    language: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """Transcribe with a direct ``generate`` call (``transformers-cpu`` backend).
+
+    Inputs must fit into one 30 s Whisper window; otherwise, or when word
+    timestamps are requested, the batch goes through the pipeline instead.
+    Inputs carrying log-mel frames from a :class:`LogMelStore` skip the feature
+    extractor. Reports the average token log-probability of each transcription.
+    """
+    arrays = []
+    for item in files_to_transcribe:
+        if not isinstance(item, np.ndarray):
+            item_audio, item_sr = sf.read(item)
+            item = to_model_input(item_audio, item_sr)
+        arrays.append(item)
+
+    if word_timestamps or any(
+        len(item) > WHISPER_CHUNK_SEC * WHISPER_SAMPLE_RATE for item in arrays
+    ):
+        return _hf_transcribe_files(
+            arrays, model, word_timestamps=word_timestamps, language=language
+        )
+
+    processor = model.processor
+    language = language or model.language
+    generate_kwargs: Dict[str, Any] = {"task": "transcribe"}
+    if language:
+        generate_kwargs["language"] = language
+    generate_kwargs.update(_assisted_generate_kwargs(model))
+
+    n_mels = model.hf_model.config.num_mel_bins
+    log_mels = [getattr(item, "log_mel", None) for item in arrays]
+
+    # Assisted generation only supports one sequence at a time
+    step = 1 if model.assistant_model is not None else len(arrays)
+    records = []
+    for pos in range(0, len(arrays), step):
+        step_mels = log_mels[pos : pos + step]
+        if all(mel is not None and mel.shape[0] == n_mels for mel in step_mels):
+            features = torch.from_numpy(
+                np.stack([whisper_input_features(mel) for mel in step_mels])
             )
-            texts.append(_fw_collect_text(segments))
-        return texts
+        else:
+            features = processor.feature_extractor(
+                arrays[pos : pos + step],
+                sampling_rate=WHISPER_SAMPLE_RATE,
+                return_tensors="pt",
+            ).input_features
+
+        with (
+            torch.inference_mode(),
+            torch.autocast(
+                "cpu",
+                dtype=model.autocast_dtype or torch.bfloat16,
+                enabled=model.autocast_dtype is not None,
+            ),
+        ):
+            output = model.hf_model.generate(
+                features,
+                return_dict_in_generate=True,
+                output_scores=True,
+                **generate_kwargs,
+            )
+
+        texts = processor.batch_decode(output.sequences, skip_special_tokens=True)
+        avg_logprobs = _avg_token_logprobs(
+            model.hf_model, output.sequences, output.scores
+        )
+        records.extend(
+            make_record(text.strip(), avg_logprob=avg_logprob)
+            for text, avg_logprob in zip(texts, avg_logprobs)
+        )
+    return records
+
+
+def _assisted_generate_kwargs(model: TransformersASRModel) -> Dict[str, Any]:
+    """Generation arguments for speculative decoding with the model's draft.
+
+    Verification is greedy, so the output matches plain greedy decoding with
+    the main model token for token.
+    """
+    if model.assistant_model is None:
+        return {}
+    return {
+        "assistant_model": model.assistant_model,
+        "num_beams": 1,
+        "do_sample": False,
+    }
+
+
+def _avg_token_logprobs(
+    hf_model: Any, sequences: torch.Tensor, scores: Tuple[torch.Tensor, ...]
+) -> List[float]:
+    """Mean log-probability of the generated tokens of each sequence (EOS excluded).
+
+    Returns NaN for all rows when the step scores cannot be aligned with the
+    generated tokens.
+    """
+    if not scores or sequences.shape[1] < len(scores):
+        return [float("nan")] * sequences.shape[0]
+
+    token_logprobs = hf_model.compute_transition_scores(
+        sequences, scores, normalize_logits=True
+    ).float()
+    eos_token_id = hf_model.generation_config.eos_token_id
+    eos_ids = torch.tensor(
+        eos_token_id if isinstance(eos_token_id, list) else [eos_token_id]
+    )
+    mask = ~torch.isin(sequences[:, -len(scores) :], eos_ids)
+    totals = torch.where(mask, token_logprobs, torch.zeros_like(token_logprobs))
+    means = totals.sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+    return [float(value) for value in means]
+
+
+def _free_memory_bytes(device: str) -> Optional[int]:
+    """Return the memory currently available on ``device``, if it can be queried."""
+
+    if device == "cuda" and torch.cuda.is_available():
+        free, _total = torch.cuda.mem_get_info()
+        return int(free)
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+@dataclass
+class AdaptiveBatchSize:
+    """Safe model batch size learned from failures and memory headroom.
+
+    Starts at ``max_size`` (the configured ``model_batch_size``). An
+    out-of-memory failure at size ``n`` caps the size at ``n // 2`` and, when the
+    free memory before the batch is known, yields an estimate of the memory
+    needed per item. Later batches are then limited to what fits into
+    ``headroom`` of the memory available at that moment. After ``grow_after``
+    successful batches in a row the cap doubles again, up to ``max_size``.
+    """
+
+    max_size: int
+    headroom: float = 0.8
+    grow_after: int = 4
+    safe_size: Optional[int] = None
+    bytes_per_item: Optional[float] = None
+    successes: int = 0
+
+    def current(self, device: str) -> int:
+        size = self.safe_size or self.max_size
+        if self.bytes_per_item:
+            free = _free_memory_bytes(device)
+            if free is not None:
+                size = min(size, int(free * self.headroom / self.bytes_per_item))
+        return max(1, size)
+
+    def record_out_of_memory(
+        self, failed_size: int, free_before: Optional[int]
+    ) -> None:
+        self.safe_size = max(1, failed_size // 2)
+        self.successes = 0
+        if free_before:
+            estimate = free_before / failed_size
+            self.bytes_per_item = max(self.bytes_per_item or 0.0, estimate)
+
+    def record_success(self, size: int, batch_bytes: Optional[int]) -> None:
+        """Learn from a successful batch of ``size`` items.
+
+        ``batch_bytes`` is the peak memory the batch needed on top of what was
+        allocated before it (model weights excluded).
+        """
+        if batch_bytes and batch_bytes > 0:
+            estimate = batch_bytes / size
+            self.bytes_per_item = max(self.bytes_per_item or 0.0, estimate)
+        if self.safe_size is None:
+            return
+        self.successes += 1
+        if self.successes >= self.grow_after:
+            self.successes = 0
+            grown = self.safe_size * 2
+            self.safe_size = grown if grown < self.max_size else None
+
+
+def _transcribe_adaptive(
+    files_to_transcribe: List[Any],
+    model: TransformersASRModel,
+    run: Callable[..., List[Dict[str, Any]]],
+) -> List[Dict[str, Any]]:
+    """Transcribe ``files_to_transcribe`` in chunks sized by the model's controller.
+
+    A failing chunk is bisected until the offending item is isolated; that item
+    is reported as ``[TRANSCRIPTION_FAILED: ...]`` while its neighbours are
+    retried as whole halves. Only out-of-memory failures shrink the batch size
+    used for subsequent chunks.
+
+    faster-whisper transcribes one input per call, so there the controller
+    sizes the pipeline's internal chunk batch instead: an input that runs out
+    of memory is retried with a smaller batch, any other failure is reported.
+    """
+    controller = model.batch_controller
+    on_cuda = model.device == "cuda" and torch.cuda.is_available()
+
+    def memory_before() -> Tuple[Optional[int], int]:
+        """Free memory and allocated CUDA memory before a backend call."""
+        free_before = _free_memory_bytes(model.device)
+        if not on_cuda:
+            return free_before, 0
+        torch.cuda.reset_peak_memory_stats()
+        return free_before, torch.cuda.memory_allocated()
+
+    def memory_used(allocated_before: int) -> Optional[int]:
+        """Peak CUDA memory of the call on top of what was allocated before."""
+        return torch.cuda.max_memory_allocated() - allocated_before if on_cuda else None
+
+    def failed(exc: Exception) -> Dict[str, Any]:
+        return make_record(f"[TRANSCRIPTION_FAILED: {type(exc).__name__}: {exc}]")
+
+    def run_bisect(chunk: List[Any]) -> List[Dict[str, Any]]:
+        free_before, allocated_before = memory_before()
+        try:
+            records = run(chunk, model)
+            if len(records) != len(chunk):
+                raise RuntimeError(
+                    f"backend returned {len(records)} results for {len(chunk)} inputs"
+                )
+        except Exception as exc:
+            if _is_out_of_memory(exc):
+                controller.record_out_of_memory(len(chunk), free_before)
+                if on_cuda:
+                    torch.cuda.empty_cache()
+            if len(chunk) == 1:
+                return [failed(exc)]
+            mid = len(chunk) // 2
+            return run_bisect(chunk[:mid]) + run_bisect(chunk[mid:])
+
+        controller.record_success(len(chunk), memory_used(allocated_before))
+        return records
+
+    def run_single(item: Any) -> Dict[str, Any]:
+        while True:
+            size = controller.current(model.device)
+            free_before, allocated_before = memory_before()
+            try:
+                [record] = run([item], model, batch_size=size)
+            except Exception as exc:
+                if not _is_out_of_memory(exc):
+                    return failed(exc)
+                controller.record_out_of_memory(size, free_before)
+                if on_cuda:
+                    torch.cuda.empty_cache()
+                if size == 1:
+                    return failed(exc)
+                continue
+            controller.record_success(size, memory_used(allocated_before))
+            return record
+
+    if model.backend == "faster-whisper":
+        return [run_single(item) for item in files_to_transcribe]
+
+    records: List[Dict[str, Any]] = []
+    pos = 0
+    while pos < len(files_to_transcribe):
+        size = controller.current(model.device)
+        records.extend(run_bisect(files_to_transcribe[pos : pos + size]))
+        pos += size
+    return records
+
+
+def _backend_runner(
+    model: TransformersASRModel,
+    word_timestamps: bool = False,
+    language: Optional[str] = None,
+) -> Callable[[List[Any], TransformersASRModel], List[Dict[str, Any]]]:
+    run = {
+        "faster-whisper": _fw_transcribe_files,
+        "transformers-cpu": _hf_generate_files,
+    }.get(model.backend, _hf_transcribe_files)
+    if word_timestamps or language:
+        return partial(run, word_timestamps=word_timestamps, language=language)
+    return run
+
+
+def _transcribe_cascade(
+    files_to_transcribe: List[Any],
+    model: TransformersASRModel,
+    language: Optional[str] = None,
+    word_timestamps: bool = False,
+) -> List[Dict[str, Any]]:
+    """Transcribe with ``model.cascade_model`` and escalate low-confidence items.
+
+    Escalated records carry the main model's text and confidence; every record
+    is tagged with ``escalated``. Timings accumulate in ``model.cascade_stats``.
+    """
+    assert model.cascade_model is not None
+    stats = model.cascade_stats
+    durations = [_input_duration(item) for item in files_to_transcribe]
+
+    start = time.perf_counter()
+    records = _transcribe_adaptive(
+        files_to_transcribe,
+        model.cascade_model,
+        _backend_runner(
+            model.cascade_model, word_timestamps=word_timestamps, language=language
+        ),
+    )
+    stats.draft_time_sec += time.perf_counter() - start
+
+    escalate = [
+        i
+        for i, record in enumerate(records)
+        if model.cascade_thresholds.should_escalate(record)
+    ]
+    records = [dict(record, escalated=False) for record in records]
+
+    if escalate:
+        start = time.perf_counter()
+        escalated_records = _transcribe_adaptive(
+            [files_to_transcribe[i] for i in escalate],
+            model,
+            _backend_runner(model, word_timestamps=word_timestamps, language=language),
+        )
+        stats.escalation_time_sec += time.perf_counter() - start
+        for i, record in zip(escalate, escalated_records):
+            records[i] = dict(record, escalated=True)
+
+    stats.segments += len(records)
+    stats.escalated += len(escalate)
+    stats.audio_sec += sum(durations)
+    stats.escalated_audio_sec += sum(durations[i] for i in escalate)
+    return records
+
+
+def transcribe_inputs(
+    inputs: List[Any],
+    model: TransformersASRModel,
+    *,
+    language: Optional[str] = None,
+    word_timestamps: bool = False,
+    cascade: bool = True,
+) -> List[Dict[str, Any]]:
+    """Transcribe model inputs without caching, in as few backend calls as fit.
+
+    Parameters
+    ----------
+    inputs
+        Audio file paths or mono 16 kHz float32 arrays (see
+        :func:`to_model_input`).
+    model
+        A loaded Whisper model obtained via :func:`load_whisper_model`.
+    language
+        Language code overriding ``model.language``.
+    word_timestamps
+        Also return ``words``, ``(start, end, word, probability)`` tuples
+        relative to the start of each input.
+    cascade
+        Go through the model's cascade model first, if it has one.
+
+    Returns
+    -------
+    list of dict
+        One record (``text`` plus the ``CONFIDENCE_FIELDS``) per input, in
+        order; inputs that cannot be transcribed get a
+        ``[TRANSCRIPTION_FAILED: ...]`` text.
+    """
+    if cascade and model.cascade_model is not None:
+        return _transcribe_cascade(
+            inputs, model, language=language, word_timestamps=word_timestamps
+        )
+    return _transcribe_adaptive(
+        inputs,
+        model,
+        _backend_runner(model, word_timestamps=word_timestamps, language=language),
+    )
+
+
+def _language_probabilities(
+    model: TransformersASRModel, audio_array: np.ndarray
+) -> Dict[str, float]:
+    """Whisper's language distribution for the first 30 s of a 16 kHz input."""
+    if model.backend == "faster-whisper":
+        _language, _probability, all_probs = model.pipeline.model.detect_language(
+            audio_array
+        )
+        return dict(all_probs)
+
+    hf_model = model.pipeline.model
+    features = model.pipeline.feature_extractor(
+        audio_array, sampling_rate=WHISPER_SAMPLE_RATE, return_tensors="pt"
+    ).input_features.to(hf_model.device, dtype=hf_model.dtype)
+    lang_to_id = hf_model.generation_config.lang_to_id
+    decoder_input_ids = torch.tensor(
+        [[hf_model.generation_config.decoder_start_token_id]], device=hf_model.device
+    )
+    with torch.inference_mode():
+        logits = hf_model(
+            input_features=features, decoder_input_ids=decoder_input_ids
+        ).logits[0, -1]
+    probs = logits[list(lang_to_id.values())].float().softmax(dim=-1)
+    return {token.strip("<|>"): float(prob) for token, prob in zip(lang_to_id, probs)}
+
+
+def detect_speaker_language(
+    model: TransformersASRModel,
+    segments: pd.DataFrame,
+    audio_path: str,
+    output_dir: str,
+    speaker: str,
+    *,
+    file_prefix: Optional[str] = None,
+    cache: bool = True,
+    max_segments: int = 5,
+    min_probability: float = 0.5,
+) -> Optional[str]:
+    """Detect a speaker's language once from their longest segments.
+
+    Language identification runs on the first 30 s of each of the
+    ``max_segments`` longest segments. Detections whose top language probability
+    is below ``min_probability`` (typically short or noisy segments) are
+    ignored unless none qualifies; the remaining distributions are summed,
+    weighted by segment duration. The result is cached in
+    ``<prefix>_language.json`` in ``output_dir`` together with the model name
+    and a digest of the segments it was detected from, so later runs and every
+    batch of the speaker reuse it until either changes.
+
+    Parameters
+    ----------
+    model
+        A Whisper model obtained via :func:`load_whisper_model`. With a model
+        loaded with ``lazy=True``, the main model is loaded only for a
+        detection that is not cached, and released afterwards.
+    segments
+        DataFrame with ``start_sec`` and ``end_sec`` columns of the speaker.
+    audio_path
+        Source waveform on disk from which to slice the segments.
+    output_dir
+        Directory where the detected language is cached.
+    speaker
+        Identifier of the speaker, used as file stem.
+    file_prefix
+        Optional custom stem for the cache file; defaults to ``speaker``.
+    cache
+        When ``True`` reuses a cached detection made with the same model from
+        the same segments.
+    max_segments
+        Number of longest segments used for detection.
+    min_probability
+        Minimum top language probability for a segment to count.
+
+    Returns
+    -------
+    str or None
+        The language code, or ``None`` when the speaker has no segments.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache_path = os.path.join(output_dir, f"{file_prefix or speaker}_language.json")
+    bounds = _language_detection_bounds(segments, max_segments)
+    if not len(bounds):
+        return None
+    segments_digest = _bounds_digest(bounds)
+    with file_lock(cache_path):
+        cached = (
+            _read_cached_language(
+                cache_path, model.transcription_model_name, segments_digest
+            )
+            if cache
+            else None
+        )
+        if cached is not None:
+            return cached
+        if model.loaded:
+            return _detect_and_cache_language(
+                model,
+                bounds,
+                audio_path,
+                cache_path,
+                segments_digest=segments_digest,
+                min_probability=min_probability,
+            )
+
+        # Lazy model: load just the main model for detection and free it again
+        detector_kwargs = model.load_kwargs()
+        detector_kwargs.pop("assistant_model_name", None)
+        detector = load_whisper_model(**detector_kwargs)
+        language = _detect_and_cache_language(
+            detector,
+            bounds,
+            audio_path,
+            cache_path,
+            segments_digest=segments_digest,
+            min_probability=min_probability,
+        )
+        del detector
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+        return language
+
+
+def cached_speaker_language(
+    segments: pd.DataFrame,
+    output_dir: str,
+    speaker: str,
+    transcription_model_name: str,
+    *,
+    file_prefix: Optional[str] = None,
+    max_segments: int = 5,
+) -> Optional[str]:
+    """Language cached by :func:`detect_speaker_language`, without loading a model.
+
+    Parameters
+    ----------
+    segments
+        DataFrame with ``start_sec`` and ``end_sec`` columns of the speaker.
+    output_dir
+        Directory where the detected language is cached.
+    speaker
+        Identifier of the speaker, used as file stem.
+    transcription_model_name
+        Name of the model the detection must have been made with.
+    file_prefix
+        Optional custom stem for the cache file; defaults to ``speaker``.
+    max_segments
+        Number of longest segments used for detection.
+
+    Returns
+    -------
+    str or None
+        The cached language code, or ``None`` when there is no cached detection
+        for this model and these segments.
+    """
+    bounds = _language_detection_bounds(segments, max_segments)
+    if not len(bounds):
+        return None
+    cache_path = os.path.join(output_dir, f"{file_prefix or speaker}_language.json")
+    return _read_cached_language(
+        cache_path, transcription_model_name, _bounds_digest(bounds)
+    )
+
+
+def _read_cached_language(
+    cache_path: str, transcription_model_name: str, segments_digest: str
+) -> Optional[str]:
+    """The cached language if it was detected by the model from the segments."""
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path, "r", encoding="utf-8") as cache_file:
+        cached = json.load(cache_file)
+    if (
+        cached.get("model") == transcription_model_name
+        and cached.get("segments_digest") == segments_digest
+    ):
+        return cached["language"]
+    return None
+
+
+def _language_detection_bounds(segments: pd.DataFrame, max_segments: int) -> np.ndarray:
+    """``(start, end)`` of the ``max_segments`` longest segments, longest first."""
+    bounds = segments[["start_sec", "end_sec"]].to_numpy(dtype=float)
+    longest = np.argsort(bounds[:, 0] - bounds[:, 1], kind="stable")[:max_segments]
+    return bounds[longest]
+
+
+def _bounds_digest(bounds: np.ndarray) -> str:
+    """Digest of segment boundaries, rounded to milliseconds."""
+    rounded = np.ascontiguousarray(np.round(bounds, 3))
+    return hashlib.sha1(rounded.tobytes()).hexdigest()[:12]
+
+
+def _detect_and_cache_language(
+    model: TransformersASRModel,
+    bounds: np.ndarray,
+    audio_path: str,
+    cache_path: str,
+    segments_digest: str,
+    min_probability: float,
+) -> str:
+    """Detect the language from the segments in ``bounds`` and cache it.
+
+    See :func:`detect_speaker_language` for how the detections are combined.
+    """
+    audio, sr = sf.read(audio_path)
+    detections = []
+    for start, end in bounds:
+        start = float(start)
+        end = min(float(end), start + WHISPER_CHUNK_SEC)
+        segment_audio = to_model_input(audio[int(start * sr) : int(end * sr)], sr)
+        detections.append((end - start, _language_probabilities(model, segment_audio)))
+
+    confident = [
+        (weight, probs)
+        for weight, probs in detections
+        if max(probs.values()) >= min_probability
+    ]
+    totals: Dict[str, float] = {}
+    for weight, probs in confident or detections:
+        for code, prob in probs.items():
+            totals[code] = totals.get(code, 0.0) + weight * prob
+    language = max(totals, key=totals.__getitem__)
+
+    with atomic_write(cache_path) as cache_file:
+        json.dump(
+            {
+                "language": language,
+                "probability": totals[language] / sum(totals.values()),
+                "model": model.transcription_model_name,
+                "segments": len(confident or detections),
+                "segments_digest": segments_digest,
+            },
+            cache_file,
+        )
+    return language
+
+
+def _open_log_mel_store(
+    model: TransformersASRModel,
+    audio_path: str,
+    output_dir: str,
+    prefix: str,
+    audio: Optional[np.ndarray] = None,
+    sr: Optional[int] = None,
+) -> Optional[LogMelStore]:
+    """Log-mel store of ``audio_path`` for models that can consume it.
+
+    Only the ``transformers-cpu`` backend takes precomputed features. The store
+    is built on first use (reading the audio unless ``audio`` is given) and
+    memory-mapped from ``output_dir`` on later runs.
+    """
+    if model.backend != "transformers-cpu":
+        return None
+
+    feature_extractor = model.processor.feature_extractor
+    path = os.path.join(
+        output_dir, f"{prefix}_logmel{feature_extractor.feature_size}.npy"
+    )
+    with file_lock(path):
+        store = LogMelStore.open(path, audio_path)
+        if store is None:
+            if audio is None or sr is None:
+                audio, sr = sf.read(audio_path)
+            store = LogMelStore.build(
+                path,
+                to_model_input(audio, sr),
+                feature_extractor.mel_filters,
+                audio_path,
+            )
+    return store
 
 
 def _transcribe_batch(
     batch_files: List[str],
-    batch_caches: List[str],
+    batch_caches: List[Optional[str]],
     model: TransformersASRModel,
     cache: bool = False,
-) -> List[str]:
+    batch_audio: Optional[List[Optional[np.ndarray]]] = None,
+    cascade: bool = True,
+    language: Optional[str] = None,
+    segment_store: Optional[SegmentStore] = None,
+    word_timestamps: bool = False,
+) -> List[Dict[str, Any]]:
     """Transcribe a batch of segment files using pipeline batching.
 
-    Returns list of transcribed texts (in same order as input).
+    ``batch_audio`` optionally holds the already decoded mono 16 kHz waveform of
+    each file (``None`` entries are read from ``segment_store`` when given, and
+    from disk by the backend otherwise). With
+    ``cascade`` and a model loaded with a cascade model, the batch goes through
+    :func:`_transcribe_cascade`. Entries of ``batch_caches`` that are ``None``
+    are neither read from nor written to a cache. ``language`` overrides
+    ``model.language``, e.g. with the result of :func:`detect_speaker_language`.
+    With ``word_timestamps``, records also hold ``words`` relative to the
+    start of each input.
+
+    With ``cache``, each uncached segment is claimed with a lock on its cache
+    file while it is transcribed. Segments claimed by another process sharing
+    the output directory are not transcribed twice: once that process releases
+    them, their cached records are used (or, if it failed, they are
+    transcribed here).
+
+    Returns list of transcription records (``text`` plus the
+    ``CONFIDENCE_FIELDS``) in the same order as the input. Segments that cannot
+    be transcribed are returned (and cached) as ``[TRANSCRIPTION_FAILED: ...]``
+    so they are retried on the next run.
     """
     # Check which files need transcription (not cached)
-    files_to_transcribe = []
+    files_to_transcribe: List[Any] = []
     file_indices = []
-    results = [""] * len(batch_files)
-
-    for i, (seg_file, txt_cache) in enumerate(zip(batch_files, batch_caches)):
-        if cache and os.path.exists(txt_cache):
-            # Load from cache, but skip if it's a failed transcription
-            with open(txt_cache, "r", encoding="utf-8") as cache_file:
-                cached_text = cache_file.read().strip()
-                if not cached_text.startswith("[TRANSCRIPTION_FAILED:"):
-                    results[i] = cached_text
+    claimed_elsewhere = []
+    results: List[Dict[str, Any]] = [make_record("")] * len(batch_files)
+
+    with ExitStack() as claims:
+        for i, (seg_file, txt_cache) in enumerate(zip(batch_files, batch_caches)):
+            if cache and txt_cache is not None:
+                if not claims.enter_context(file_lock(txt_cache, blocking=False)):
+                    claimed_elsewhere.append(i)
+                    continue
+                # Load from cache, but skip if it's a failed transcription
+                cached_record = _read_cached_record(txt_cache, word_timestamps)
+                if cached_record is not None:
+                    results[i] = cached_record
                     continue
-            # If we get here, cache was invalid - need to re-transcribe
-            files_to_transcribe.append(seg_file)
-            file_indices.append(i)
-        else:
             # Needs transcription
-            files_to_transcribe.append(seg_file)
+            if batch_audio is not None and batch_audio[i] is not None:
+                files_to_transcribe.append(batch_audio[i])
+            elif segment_store is not None and _segment_key(seg_file) in segment_store:
+                files_to_transcribe.append(
+                    to_model_input(*segment_store.get(_segment_key(seg_file)))
+                )
+            else:
+                files_to_transcribe.append(seg_file)
             file_indices.append(i)
 
-    # If no files need transcription, return cached results
-    if not files_to_transcribe:
-        return results
+        if files_to_transcribe:
+            records = transcribe_inputs(
+                files_to_transcribe,
+                model,
+                language=language,
+                word_timestamps=word_timestamps,
+                cascade=cascade,
+            )
 
-    if model.backend == "faster-whisper":
-        texts = _fw_transcribe_files(files_to_transcribe, model)
+            for batch_idx, record in zip(file_indices, records):
+                results[batch_idx] = record
+                txt_cache = batch_caches[batch_idx]
+                if txt_cache is not None:
+                    _write_cached_record(txt_cache, record)
+
+    if claimed_elsewhere:
+        # Wait for the other process, then take its records (or retry failures)
+        for i in claimed_elsewhere:
+            with file_lock(batch_caches[i]):
+                pass
+        retried = _transcribe_batch(
+            [batch_files[i] for i in claimed_elsewhere],
+            [batch_caches[i] for i in claimed_elsewhere],
+            model,
+            cache,
+            batch_audio=(
+                [batch_audio[i] for i in claimed_elsewhere]
+                if batch_audio is not None
+                else None
+            ),
+            cascade=cascade,
+            language=language,
+            segment_store=segment_store,
+            word_timestamps=word_timestamps,
+        )
+        for i, record in zip(claimed_elsewhere, retried):
+            results[i] = record
 
-        for batch_idx, text in zip(file_indices, texts):
-            results[batch_idx] = text
-            cache_path = batch_caches[batch_idx]
-            with open(cache_path, "w", encoding="utf-8") as cache_file:
-                cache_file.write(text)
+    return results
 
-        return results
 
-    pipe = model.pipeline
-    language = model.language
+def group_by_duration(
+    segments: List[Dict[str, Any]], batch_size: float | None
+) -> List[List[Dict[str, Any]]]:
+    """Group consecutive segments into batches of at most ``batch_size`` seconds.
 
-    generate_kwargs: Dict[str, Any] = {
-        "task": "transcribe"
-    }  # , "return_timestamps": True
-    if language:
-        generate_kwargs["language"] = language
+    A segment longer than the cap forms a batch of its own. ``None`` or <= 0
+    puts everything into one batch. A ``duration_sec`` entry, when present,
+    overrides ``end_sec - start_sec``.
+    """
+    # Determine maximum batch duration
+    max_batch_duration = (
+        float(batch_size) if batch_size and batch_size > 0 else float("inf")
+    )
+
+    batches: List[List[Dict[str, Any]]] = []
+    current_batch: List[Dict[str, Any]] = []
+    current_duration = 0.0
+
+    for seg in segments:
+        if "duration_sec" in seg:
+            seg_duration = float(seg["duration_sec"])
+        else:
+            seg_duration = float(seg["end_sec"] - seg["start_sec"])
 
-    # Transcribe batch
-    max_pipe_batch = getattr(pipe, "batch_size", None)
-    effective_batch_size = (
-        min(len(files_to_transcribe), int(max_pipe_batch))
-        if max_pipe_batch
-        else len(files_to_transcribe)
+        # If this segment alone exceeds the cap, process it alone
+        if seg_duration > max_batch_duration:
+            if current_batch:
+                batches.append(current_batch)
+                current_batch = []
+                current_duration = 0.0
+            batches.append([seg])
+            continue
+
+        # Start a new batch if adding would exceed the cap
+        if current_batch and current_duration + seg_duration > max_batch_duration:
+            batches.append(current_batch)
+            current_batch = [seg]
+            current_duration = seg_duration
+        else:
+            current_batch.append(seg)
+            current_duration += seg_duration
+
+    if current_batch:
+        batches.append(current_batch)
+
+    return batches
+
+
+def _shard_by_duration(durations: np.ndarray, n_shards: int) -> List[List[int]]:
+    """Assign items to ``n_shards`` shards with near-equal total duration.
+
+    Longest items are placed first, each on the currently lightest shard. Each
+    shard lists its item positions in ascending order.
+    """
+    shards: List[List[int]] = [[] for _ in range(n_shards)]
+    loads = np.zeros(n_shards)
+    for pos in np.argsort(-durations, kind="stable"):
+        target = int(np.argmin(loads))
+        shards[target].append(int(pos))
+        loads[target] += durations[pos]
+    return [sorted(shard) for shard in shards if shard]
+
+
+@dataclass
+class TimeMap:
+    """Map from a compacted segment back to the original recording.
+
+    ``spans`` holds the kept ``[start, end)`` sample ranges of the source audio,
+    in order; the compacted audio is their concatenation. Positions on the
+    compacted timeline are translated with :meth:`to_original`.
+    """
+
+    spans: np.ndarray
+    sample_rate: int
+
+    @classmethod
+    def identity(cls, start_samp: int, end_samp: int, sample_rate: int) -> "TimeMap":
+        return cls(np.array([[start_samp, end_samp]], dtype=np.int64), sample_rate)
+
+    @property
+    def n_samples(self) -> int:
+        return int((self.spans[:, 1] - self.spans[:, 0]).sum())
+
+    @property
+    def duration_sec(self) -> float:
+        return self.n_samples / self.sample_rate
+
+    def _offsets(self) -> np.ndarray:
+        return np.concatenate([[0], np.cumsum(self.spans[:, 1] - self.spans[:, 0])])
+
+    def to_original(self, times_sec: Any, end: bool = False) -> np.ndarray:
+        """Translate compacted-timeline times (seconds) to recording times.
+
+        A time at the junction of two kept spans maps to the start of the later
+        span, or with ``end`` (for interval ends) to the end of the earlier one.
+        """
+        samples = np.asarray(times_sec, dtype=float) * self.sample_rate
+        offsets = self._offsets()
+        span = np.clip(
+            np.searchsorted(offsets, samples, side="left" if end else "right") - 1,
+            0,
+            len(self.spans) - 1,
+        )
+        return (self.spans[span, 0] + samples - offsets[span]) / self.sample_rate
+
+    def slice(self, start_samp: int, end_samp: int) -> "TimeMap":
+        """Sub-map covering compacted samples ``[start_samp, end_samp)``."""
+        offsets = self._offsets()
+        lo = np.maximum(offsets[:-1], start_samp)
+        hi = np.minimum(offsets[1:], end_samp)
+        keep = hi > lo
+        starts = self.spans[keep, 0] + (lo[keep] - offsets[:-1][keep])
+        ends = self.spans[keep, 0] + (hi[keep] - offsets[:-1][keep])
+        return TimeMap(np.stack([starts, ends], axis=1), self.sample_rate)
+
+    def extract(self, audio_array: np.ndarray) -> np.ndarray:
+        """Compacted audio: the kept spans of ``audio_array`` concatenated."""
+        if len(self.spans) == 1:
+            return audio_array[self.spans[0, 0] : self.spans[0, 1]]
+        return np.concatenate([audio_array[start:end] for start, end in self.spans])
+
+
+def _words_to_original(
+    words: List[Tuple[float, float, str, float]], time_map: Optional[TimeMap]
+) -> List[Tuple[float, float, str, float]]:
+    """Map word times relative to a segment's ASR input onto the recording."""
+    if not words or time_map is None:
+        return []
+    starts = time_map.to_original([word[0] for word in words])
+    ends = time_map.to_original([word[1] for word in words], end=True)
+    return [
+        (float(start), float(end), word, probability)
+        for start, end, (_start, _end, word, probability) in zip(starts, ends, words)
+    ]
+
+
+def _speech_spans(
+    intervals: pd.DataFrame, sr: int, n_samples: int, max_silence_sec: float
+) -> np.ndarray:
+    """Merged speech sample spans with pauses longer than ``max_silence_sec``
+    shortened to that length.
+
+    Each interval is padded by half the allowed silence on both sides before
+    overlapping intervals are merged, so shorter pauses are kept whole.
+    """
+    pad = max_silence_sec / 2
+    bounds = intervals[["start_sec", "end_sec"]].to_numpy(dtype=float)
+    bounds = bounds[np.argsort(bounds[:, 0], kind="stable")]
+    spans: List[List[int]] = []
+    for start, end in bounds:
+        start_samp = max(0, int((start - pad) * sr))
+        end_samp = min(n_samples, int((end + pad) * sr))
+        if spans and start_samp <= spans[-1][1]:
+            spans[-1][1] = max(spans[-1][1], end_samp)
+        elif end_samp > start_samp:
+            spans.append([start_samp, end_samp])
+    return np.array(spans, dtype=np.int64).reshape(-1, 2)
+
+
+def _compact_time_map(
+    spans: np.ndarray, start_samp: int, end_samp: int, sr: int
+) -> TimeMap:
+    """Time map keeping only the speech ``spans`` inside ``[start_samp, end_samp)``.
+
+    Falls back to the whole range when no speech span overlaps it.
+    """
+    first = np.searchsorted(spans[:, 1], start_samp, side="right")
+    last = np.searchsorted(spans[:, 0], end_samp, side="left")
+    kept = np.clip(spans[first:last], start_samp, end_samp)
+    kept = kept[kept[:, 1] > kept[:, 0]]
+    if not len(kept):
+        return TimeMap.identity(start_samp, end_samp, sr)
+    return TimeMap(kept, sr)
+
+
+def _pause_split_points(
+    audio_array: np.ndarray,
+    sr: int,
+    max_piece_sec: float,
+    frame_sec: float = 0.025,
+    pause_sec: float = 0.2,
+) -> List[int]:
+    """Sample offsets at which to cut ``audio_array`` into pieces of at most
+    ``max_piece_sec``.
+
+    Each cut is placed at the quietest point of the second half of the allowed
+    window, measured as frame energy smoothed over ``pause_sec`` so cuts land in
+    pauses rather than in short dips inside words. Pieces are contiguous, so no
+    audio is dropped or duplicated at the cuts.
+    """
+    if audio_array.ndim > 1:
+        audio_array = audio_array.mean(axis=1)
+
+    hop = max(1, int(frame_sec * sr))
+    n_frames = len(audio_array) // hop
+    max_frames = max(2, int(max_piece_sec * sr) // hop)
+    if len(audio_array) <= max_frames * hop:
+        return []
+
+    energy = np.square(audio_array[: n_frames * hop].reshape(n_frames, hop)).mean(
+        axis=1
     )
-    batch_results = pipe(
-        files_to_transcribe,
-        return_timestamps=True,
-        generate_kwargs=generate_kwargs,
-        batch_size=effective_batch_size,
+    width = max(1, int(round(pause_sec / frame_sec)))
+    energy = np.convolve(energy, np.ones(width) / width, mode="same")
+
+    cuts = []
+    pos = 0
+    while len(audio_array) - pos * hop > max_frames * hop:
+        lo = pos + max_frames // 2
+        hi = min(pos + max_frames, n_frames - 1)
+        pos = lo + int(np.argmin(energy[lo : hi + 1]))
+        cuts.append(pos * hop)
+    return cuts
+
+
+def _join_piece_records(
+    records: List[Dict[str, Any]], durations: List[float]
+) -> Dict[str, Any]:
+    """Rejoin the records of the pieces of one split segment, in order.
+
+    Confidence values are averaged weighted by piece duration and word times
+    are shifted from their piece onto the segment. If any piece failed, its
+    failure record is returned so the whole segment is retried.
+    """
+    for record in records:
+        if record["text"].startswith("[TRANSCRIPTION_FAILED:"):
+            return record
+
+    text = " ".join(record["text"].strip() for record in records)
+    joined = make_record(
+        " ".join(text.split()),
+        avg_logprob=np.average([r["avg_logprob"] for r in records], weights=durations),
+        no_speech_prob=np.average(
+            [r["no_speech_prob"] for r in records], weights=durations
+        ),
     )
+    if any("escalated" in record for record in records):
+        joined["escalated"] = any(r.get("escalated", False) for r in records)
+    if any("words" in record for record in records):
+        offsets = np.concatenate([[0.0], np.cumsum(durations)[:-1]])
+        joined["words"] = [
+            (start + offset, end + offset, word, probability)
+            for record, offset in zip(records, offsets)
+            for start, end, word, probability in record.get("words", [])
+        ]
+    return joined
 
-    if isinstance(batch_results, dict):
-        batch_results = [batch_results]
 
-    for batch_idx, result in zip(file_indices, batch_results):
-        text = result.get("text", "").strip()
-        results[batch_idx] = text
+# Model owned by a transcription worker process (see _init_transcription_worker)
+_WORKER_MODEL: Optional[TransformersASRModel] = None
 
-        cache_path = batch_caches[batch_idx]
-        with open(cache_path, "w", encoding="utf-8") as cache_file:
-            cache_file.write(text)
 
-    return results
+def _init_transcription_worker(model_kwargs: Dict[str, Any]) -> None:
+    global _WORKER_MODEL
+    _WORKER_MODEL = load_whisper_model(**model_kwargs)
+
+
+def _transcribe_shard(
+    shard: pd.DataFrame, transcribe_kwargs: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], CascadeStats]:
+    assert _WORKER_MODEL is not None, "transcription worker was not initialised"
+    _WORKER_MODEL.cascade_stats = CascadeStats()
+    records = transcribe_segments(_WORKER_MODEL, shard, **transcribe_kwargs)
+    return records, _WORKER_MODEL.cascade_stats
+
+
+def _transcribe_segments_sharded(
+    model: TransformersASRModel,
+    segments: pd.DataFrame,
+    num_workers: int,
+    cpu_threads: Optional[int],
+    transcribe_kwargs: Dict[str, Any],
+) -> List[Dict[str, Any]]:
+    """Transcribe ``segments`` across worker processes, each with its own model.
+
+    The worker models are re-created from the configuration of ``model``, which
+    need not be loaded in this process (see ``lazy`` in
+    :func:`load_whisper_model`).
+    Segments keep their index labels, so shards write the same segment and cache
+    files a single-process run would.
+    """
+    if cpu_threads is None:
+        cpu_threads = max(1, (os.cpu_count() or 1) // num_workers)
+
+    model_kwargs = {
+        **model.load_kwargs(),
+        "cpu_threads": cpu_threads,
+        "cascade_model_name": (
+            model.cascade_model.transcription_model_name
+            if model.cascade_model is not None
+            else None
+        ),
+        "cascade_thresholds": model.cascade_thresholds,
+    }
+
+    durations = (segments["end_sec"] - segments["start_sec"]).to_numpy(dtype=float)
+    shards = _shard_by_duration(durations, num_workers)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(segments)
+    with ProcessPoolExecutor(
+        max_workers=len(shards),
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_transcription_worker,
+        initargs=(model_kwargs,),
+    ) as executor:
+        futures = [
+            executor.submit(_transcribe_shard, segments.iloc[shard], transcribe_kwargs)
+            for shard in shards
+        ]
+        for shard, future in zip(shards, futures):
+            shard_records, shard_stats = future.result()
+            model.cascade_stats.merge(shard_stats)
+            for pos, record in zip(shard, shard_records):
+                results[pos] = record
+
+    return [record for record in results if record is not None]
 
 
 def transcribe_segments(
@@ -302,13 +2066,29 @@ def transcribe_segments(
     min_duration_samples: int = 1600,
     batch_size: float | None = 30.0,
     compress: bool = True,
+    prefetch_batches: int = 2,
+    prefetch_workers: int = 2,
+    num_workers: int = 1,
+    cpu_threads: Optional[int] = None,
+    cascade: bool = True,
+    max_piece_sec: float | None = WHISPER_CHUNK_SEC,
+    speech_intervals: Optional[pd.DataFrame] = None,
+    max_silence_sec: float = 0.5,
+    mel_cache: bool = True,
+    language: Optional[str] = None,
+    segment_storage: str = "wav",
+    word_timestamps: bool = False,
 ) -> List[Dict[str, Any]]:
     """Run ASR on a set of time-stamped segments extracted from ``audio_path``.
 
+    Segment extraction and ASR are pipelined: while the model decodes one
+    batch, a thread pool slices, resamples and writes the upcoming batches.
+
     Parameters
     ----------
     model
-        A loaded Whisper model obtained via :func:`load_whisper_model`.
+        A Whisper model obtained via :func:`load_whisper_model`; with
+        ``num_workers > 1`` it may be loaded with ``lazy=True``.
     segments
         DataFrame with ``start_sec`` and ``end_sec`` columns that describe the
         regions to transcribe. A ``speaker`` column is optional and overrides
@@ -334,33 +2114,181 @@ def transcribe_segments(
         Use ``None`` or <= 0 to process all segments in one batch.
     compress
         If ``True``, saves segment WAV files as 16-bit PCM to reduce disk usage
+    segment_storage
+        How extracted segment audio is kept: ``'wav'`` writes one WAV file per
+        segment; ``'pcm'``, ``'flac'`` or ``'opus'`` append all segments of the
+        speaker to one ``<prefix>_segments.pack`` container with an offset
+        index (see :class:`SegmentStore`), and segments are read back from it
+        when the backend needs them.
+    prefetch_batches
+        Number of upcoming batches prepared ahead of the one being decoded. Bounds
+        the amount of segment audio held in memory at any time.
+    prefetch_workers
+        Threads used to prepare upcoming batches. ``0`` prepares each batch
+        synchronously right before it is decoded.
+    num_workers
+        Number of worker processes. With more than one, segments are sharded
+        across workers by total duration, each worker loads its own copy of the
+        model, and results are merged back in input order. Intended for CPU
+        inference, where one process does not saturate a many-core host. Load
+        ``model`` with ``lazy=True`` to keep its weights out of this process.
+    cpu_threads
+        Inference threads per worker process when ``num_workers > 1``. Defaults
+        to the number of cores divided by ``num_workers``.
+    cascade
+        If the model was loaded with ``cascade_model_name``, transcribe with the
+        small model first and escalate low-confidence segments to the main
+        model. Records then carry an ``escalated`` flag and the speedup is
+        summarised by ``model.cascade_stats.report()``. ``False`` sends every
+        segment to the main model.
+    max_piece_sec
+        Segments longer than this (Whisper's 30 s window by default) are cut at
+        their lowest-energy pauses into pieces of at most this duration. The
+        pieces are batched like any other segment and their text is rejoined in
+        order, so long turns neither block a batch slot nor go through the
+        backends' sequential long-form chunking. ``None`` disables splitting.
+    speech_intervals
+        Optional VAD intervals (``start_sec``, ``end_sec`` and optionally
+        ``speaker``) used to compact each segment before ASR: audio outside the
+        speaker's intervals (bridged gaps, opponent speech) is removed, keeping
+        at most ``max_silence_sec`` of each internal pause. Segments without any
+        overlapping interval are transcribed whole. Reported times, including
+        word times, stay on the original timeline.
+    max_silence_sec
+        Longest pause kept inside a compacted segment, in seconds.
+    mel_cache
+        With the ``transformers-cpu`` backend, compute the log-mel features of
+        the whole channel once, store them memory-mapped in ``output_dir`` as
+        ``<prefix>_logmel<n_mels>.npy`` and slice segment features from there
+        instead of running the feature extractor per segment. The store is
+        reused by later runs on the same audio file.
+    language
+        Language code used for every batch instead of ``model.language``, e.g.
+        the speaker's language from :func:`detect_speaker_language`. Transcript
+        caches are kept per language (``<segment>_<language>.txt``, ``auto``
+        when Whisper detects it per segment), so changing it never serves
+        transcripts in another language.
+    word_timestamps
+        Also return the words of each segment with their times on the original
+        recording timeline, mapped back through the splitting into pieces and
+        the silence compaction. Cached transcripts made without word timestamps
+        are transcribed again.
+
+    Returns
+    -------
+    list of dict
+        One record per input row with ``speaker``, ``start_sec``, ``end_sec``,
+        ``duration_sec``, ``transcription`` and the decoder confidence fields
+        (``avg_logprob``, ``no_speech_prob``, ``compression_ratio``; NaN when
+        unavailable or skipped). With ``speech_intervals``, records also carry
+        ``asr_duration_sec``, the audio duration actually sent to the model.
+        With ``word_timestamps``, ``words`` lists ``(start, end, word,
+        probability)`` tuples in recording time.
     """
 
+    prefix = file_prefix or speaker
+
+    if not model.loaded and num_workers <= 1:
+        raise ValueError("a model loaded with lazy=True needs num_workers > 1")
+    if num_workers > 1 and (len(segments) > 1 or not model.loaded):
+        if not len(segments):
+            return []
+        if mel_cache and model.loaded:
+            # Build the store once here instead of racing in every worker
+            os.makedirs(output_dir, exist_ok=True)
+            _open_log_mel_store(model, audio_path, output_dir, prefix)
+        return _transcribe_segments_sharded(
+            model,
+            segments,
+            num_workers=num_workers,
+            cpu_threads=cpu_threads,
+            transcribe_kwargs={
+                "audio_path": audio_path,
+                "output_dir": output_dir,
+                "speaker": speaker,
+                "file_prefix": file_prefix,
+                "cache": cache,
+                "min_duration_samples": min_duration_samples,
+                "batch_size": batch_size,
+                "compress": compress,
+                "prefetch_batches": prefetch_batches,
+                "prefetch_workers": prefetch_workers,
+                "cascade": cascade,
+                "max_piece_sec": max_piece_sec,
+                "speech_intervals": speech_intervals,
+                "max_silence_sec": max_silence_sec,
+                "mel_cache": mel_cache,
+                "language": language,
+                "segment_storage": segment_storage,
+                "word_timestamps": word_timestamps,
+            },
+        )
+
+    if segment_storage != "wav" and segment_storage not in SEGMENT_CODECS:
+        raise ValueError(
+            f"segment_storage must be 'wav' or one of {SEGMENT_CODECS}, "
+            f"got {segment_storage!r}"
+        )
+
     os.makedirs(output_dir, exist_ok=True)
     audio, sr = sf.read(audio_path)
-    prefix = file_prefix or speaker
+    segment_store = (
+        SegmentStore.for_speaker(output_dir, prefix, segment_storage)
+        if segment_storage != "wav"
+        else None
+    )
+    mel_store = (
+        _open_log_mel_store(model, audio_path, output_dir, prefix, audio=audio, sr=sr)
+        if mel_cache
+        else None
+    )
 
-    # Step 1: Extract all segments to WAV files with progress bar
+    # Speech spans per speaker for compacting segments
+    speech_spans: Dict[Any, np.ndarray] = {}
+    spans_by_speaker = (
+        speech_intervals is not None and "speaker" in speech_intervals.columns
+    )
+    if spans_by_speaker:
+        for interval_speaker, intervals in speech_intervals.groupby("speaker"):
+            speech_spans[interval_speaker] = _speech_spans(
+                intervals, sr, len(audio), max_silence_sec
+            )
+    elif speech_intervals is not None:
+        speech_spans[None] = _speech_spans(
+            speech_intervals, sr, len(audio), max_silence_sec
+        )
+
+    # Transcripts are cached per decoding language; the audio is shared
+    language_tag = f"_{language or model.language or 'auto'}"
+
+    # Step 1: Plan segments (filenames, skips); audio is sliced lazily per batch
     segment_info = []  # List of segment metadata dicts
 
-    for idx, seg in tqdm(
-        segments.iterrows(), total=len(segments), desc="Extracting segments"
-    ):
+    for idx, seg in segments.iterrows():
         start = float(seg["start_sec"])
         end = float(seg["end_sec"])
         row_speaker = seg.get("speaker", speaker)
+
+        start_samp = int(start * sr)
+        end_samp = min(int(end * sr), len(audio))
+        n_samples = max(0, end_samp - start_samp)
+
+        time_map = TimeMap.identity(start_samp, max(start_samp, end_samp), sr)
+        spans = speech_spans.get(row_speaker if spans_by_speaker else None)
+        if spans is not None and n_samples:
+            time_map = _compact_time_map(spans, start_samp, end_samp, sr)
+
+        # Compacted segments get their own files so untrimmed caches are not reused
+        trimmed = time_map.n_samples < n_samples
+        trim_tag = "_trim" if trimmed else ""
         seg_filename = os.path.join(
             output_dir,
-            f"{prefix}_seg_{idx}_{start:.2f}_{end:.2f}.wav",
+            f"{prefix}_seg_{idx}_{start:.2f}_{end:.2f}{trim_tag}.wav",
         )
-        txt_cache = seg_filename.replace(".wav", ".txt")
-
-        start_samp = int(start * sr)
-        end_samp = int(end * sr)
-        segment_audio = audio[start_samp:end_samp]
+        txt_cache = seg_filename.replace(".wav", f"{language_tag}.txt")
 
         # Skip segments that are too short
-        if len(segment_audio) < min_duration_samples:
+        if n_samples < min_duration_samples:
             segment_info.append(
                 {
                     "idx": idx,
@@ -373,101 +2301,180 @@ def transcribe_segments(
             )
             continue
 
-        # Save segment to WAV file (even if cached, for consistency)
-        if not os.path.exists(seg_filename):
-            _save_segment_wav(seg_filename, segment_audio, sr=sr, compress=compress)
-
         segment_info.append(
             {
                 "idx": idx,
                 "speaker": row_speaker,
                 "start_sec": start,
                 "end_sec": end,
+                "duration_sec": time_map.duration_sec,
+                "time_map": time_map,
                 "seg_filename": seg_filename,
                 "txt_cache": txt_cache,
                 "skip": False,
             }
         )
 
-    # Step 2: Transcribe segments in batches with progress bar
+    # Step 2: Split uncached long segments at pauses, then group the pieces into
+    # batches by total duration
     valid_segments = [s for s in segment_info if not s["skip"]]
 
-    # Create results list matching segment_info order
-    transcriptions = {}  # Maps seg_filename -> transcription text
-
-    # Determine maximum batch duration
-    max_batch_duration = (
-        float(batch_size) if batch_size and batch_size > 0 else float("inf")
-    )
-
-    batches: List[List[Dict[str, Any]]] = []
-    current_batch: List[Dict[str, Any]] = []
-    current_duration = 0.0
-
-    for seg in valid_segments:
-        seg_duration = float(seg["end_sec"] - seg["start_sec"])
-
-        # If this segment alone exceeds the cap, process it alone
-        if seg_duration > max_batch_duration:
-            if current_batch:
-                batches.append(current_batch)
-                current_batch = []
-                current_duration = 0.0
-            batches.append([seg])
+    asr_items: List[Dict[str, Any]] = []
+    for seg_info in valid_segments:
+        if (
+            not max_piece_sec
+            or seg_info["duration_sec"] <= max_piece_sec
+            or (
+                cache
+                and _read_cached_record(seg_info["txt_cache"], word_timestamps)
+                is not None
+            )
+        ):
+            asr_items.append(seg_info)
             continue
 
-        # Start a new batch if adding would exceed the cap
-        if current_batch and current_duration + seg_duration > max_batch_duration:
-            batches.append(current_batch)
-            current_batch = [seg]
-            current_duration = seg_duration
-        else:
-            current_batch.append(seg)
-            current_duration += seg_duration
-
-    if current_batch:
-        batches.append(current_batch)
+        # Cut on the (possibly compacted) segment audio, then map pieces back
+        time_map = seg_info["time_map"]
+        cuts = _pause_split_points(time_map.extract(audio), sr, max_piece_sec)
+        if not cuts:
+            asr_items.append(seg_info)
+            continue
+        bounds = [0, *cuts, time_map.n_samples]
+        for piece, (piece_start, piece_end) in enumerate(zip(bounds[:-1], bounds[1:])):
+            asr_items.append(
+                {
+                    "duration_sec": (piece_end - piece_start) / sr,
+                    "time_map": time_map.slice(piece_start, piece_end),
+                    "seg_filename": seg_info["seg_filename"],
+                    "txt_cache": None,  # the rejoined segment is cached instead
+                    "turn": seg_info,
+                    "piece": piece,
+                }
+            )
 
-    # Process batches
-    for batch in tqdm(batches, desc=f"Transcribing {len(batches)} batches"):
+    # Maps seg_filename -> records of its pieces (a single one if not split)
+    transcriptions: Dict[str, List[Dict[str, Any]]] = {}
+    piece_durations: Dict[str, List[float]] = {}
+
+    batches = group_by_duration(asr_items, batch_size)
+
+    def prepare_batch(batch: List[Dict[str, Any]]) -> List[Optional[np.ndarray]]:
+        """Write the batch WAVs and decode model inputs for uncached segments."""
+        batch_audio: List[Optional[np.ndarray]] = []
+        for item in batch:
+            # Save segment audio (even if cached, for consistency); a split
+            # segment is written once, with its first piece
+            turn = item.get("turn", item)
+            if item.get("piece", 0) == 0 and segment_store is not None:
+                key = _segment_key(turn["seg_filename"])
+                if key not in segment_store:
+                    segment_store.put(key, turn["time_map"].extract(audio), sr)
+            elif item.get("piece", 0) == 0:
+                if os.path.exists(turn["seg_filename"]):
+                    touch(turn["seg_filename"])
+                else:
+                    _save_segment_wav(
+                        turn["seg_filename"],
+                        turn["time_map"].extract(audio),
+                        sr=sr,
+                        compress=compress,
+                    )
+
+            if (
+                cache
+                and item["txt_cache"] is not None
+                and _read_cached_record(item["txt_cache"], word_timestamps) is not None
+            ):
+                batch_audio.append(None)
+            else:
+                model_input = to_model_input(item["time_map"].extract(audio), sr)
+                if mel_store is not None:
+                    model_input = with_log_mel(
+                        model_input,
+                        mel_store.segment_frames(item["time_map"].spans, sr),
+                    )
+                batch_audio.append(model_input)
+        return batch_audio
+
+    # Step 3: Decode batches while upcoming ones are prepared in the background
+    prepared_batches = iter_prefetched(
+        batches,
+        prepare_batch,
+        num_workers=prefetch_workers,
+        prefetch=prefetch_batches,
+    )
+    for batch, batch_audio in tqdm(
+        zip(batches, prepared_batches),
+        total=len(batches),
+        desc=f"Transcribing {len(batches)} batches",
+    ):
         # Extract batch file paths and caches
         batch_files = [s["seg_filename"] for s in batch]
         batch_caches = [s["txt_cache"] for s in batch]
 
         # Transcribe batch
-        batch_texts = _transcribe_batch(batch_files, batch_caches, model, cache)
+        batch_records = _transcribe_batch(
+            batch_files,
+            batch_caches,
+            model,
+            cache,
+            batch_audio=batch_audio,
+            cascade=cascade,
+            language=language,
+            segment_store=segment_store,
+            word_timestamps=word_timestamps,
+        )
 
         # Store results
-        for seg_info, text in zip(batch, batch_texts):
-            transcriptions[seg_info["seg_filename"]] = text
+        for item, record in zip(batch, batch_records):
+            transcriptions.setdefault(item["seg_filename"], []).append(record)
+            piece_durations.setdefault(item["seg_filename"], []).append(
+                item["duration_sec"]
+            )
 
-        # Clear GPU memory after each batch
+        # Release cached GPU blocks between batches
         if torch.cuda.is_available():
             torch.cuda.empty_cache()
-        gc.collect()
+
+    gc.collect()
 
     # Assemble final results in original order
+    with_cascade = cascade and model.cascade_model is not None
     results = []
     for seg_info in segment_info:
         if seg_info["skip"]:
-            results.append(
-                {
-                    "speaker": seg_info["speaker"],
-                    "start_sec": seg_info["start_sec"],
-                    "end_sec": seg_info["end_sec"],
-                    "duration_sec": seg_info["end_sec"] - seg_info["start_sec"],
-                    "transcription": "",
-                }
-            )
+            record = make_record("")
+            if with_cascade:
+                record["escalated"] = False
         else:
-            results.append(
-                {
-                    "speaker": seg_info["speaker"],
-                    "start_sec": seg_info["start_sec"],
-                    "end_sec": seg_info["end_sec"],
-                    "duration_sec": seg_info["end_sec"] - seg_info["start_sec"],
-                    "transcription": transcriptions[seg_info["seg_filename"]],
-                }
+            records = transcriptions[seg_info["seg_filename"]]
+            if len(records) == 1:
+                record = records[0]
+            else:
+                record = _join_piece_records(
+                    records, piece_durations[seg_info["seg_filename"]]
+                )
+                if cache and not record["text"].startswith("[TRANSCRIPTION_FAILED:"):
+                    with file_lock(seg_info["txt_cache"]):
+                        _write_cached_record(seg_info["txt_cache"], record)
+
+        result = {
+            "speaker": seg_info["speaker"],
+            "start_sec": seg_info["start_sec"],
+            "end_sec": seg_info["end_sec"],
+            "duration_sec": seg_info["end_sec"] - seg_info["start_sec"],
+            "transcription": record["text"],
+        }
+        for key in CONFIDENCE_FIELDS:
+            result[key] = record[key]
+        if with_cascade:
+            result["escalated"] = bool(record.get("escalated", False))
+        if speech_intervals is not None:
+            result["asr_duration_sec"] = seg_info.get("duration_sec", 0.0)
+        if word_timestamps:
+            result["words"] = _words_to_original(
+                record.get("words", []), seg_info.get("time_map")
             )
+        results.append(result)
 
     return results
@@ -4,6 +4,7 @@ Based on Conversational_speech_labeling_pipeline by Hanlu He.
 https://github.com/hanlululu/Conversational_speech_labeling_pipeline
 """
 
+import glob
 import json
 import os
 import warnings
@@ -13,6 +14,8 @@ import torch
 import torchaudio
 import wget
 
+from .atomic_io import atomic_write, claim
+
 # Enable TF32 for better performance
 # This provides significant speedup
 torch.backends.cuda.matmul.allow_tf32 = True
@@ -256,8 +259,8 @@ class SpeechActivityDetector:
             # Build output file path (e.g., "outputs/P1/conv_123_P1_vad.txt")
             out_path = os.path.join(speaker_dir, f"{basename}_{speaker}_vad.txt")
 
-            # Write VAD intervals to text file
-            with open(out_path, "w") as f:
+            # Write VAD intervals to text file (atomically)
+            with atomic_write(out_path) as f:
                 # Write header row with tab-separated column names
                 f.write("Start_Time(s)\tEnd_Time(s)\tAnnotation\n")
 
@@ -281,6 +284,9 @@ class SpeechActivityDetector:
         """
         Run Voice Activity Detection on a WAV file and save intervals to text file.
 
+        If another process is writing the same output file (e.g. a task sharing
+        the output tree), its result is used instead of running VAD again.
+
         Args:
             wav_path: Path to the input WAV file.
             out_txt_path: Path to the output text file for VAD intervals.
@@ -290,6 +296,12 @@ class SpeechActivityDetector:
         Returns:
             Path to the output text file.
         """
+        with claim(out_txt_path) as waited:
+            if not (waited and os.path.exists(out_txt_path)):
+                self._run_vad(wav_path, out_txt_path, min_duration)
+        return out_txt_path
+
+    def _run_vad(self, wav_path: str, out_txt_path: str, min_duration: float) -> None:
         # Load audio
         # Only load with torchaudio if not using pyannote (pyannote loads internally)
         if self.vad_type != "pyannote":
@@ -348,14 +360,12 @@ class SpeechActivityDetector:
             )
 
         # Write to file, filtering by min_duration
-        with open(out_txt_path, "w") as f:
+        with atomic_write(out_txt_path) as f:
             f.write("Start_Time(s)\tEnd_Time(s)\tAnnotation\n")
             for start, end in intervals:
                 if (end - start) >= min_duration:
                     f.write(f"{start:.2f}\t{end:.2f}\tT\n")
 
-        return out_txt_path
-
     def run_diarization(
         self,
         wav_path: str,
@@ -374,6 +384,31 @@ class SpeechActivityDetector:
             Dictionary mapping speaker labels (e.g. 'SPEAKER_00') to output file paths.
         """
         basename = os.path.splitext(os.path.basename(wav_path))[0]
+        os.makedirs(out_dir, exist_ok=True)
+        # If another process is diarizing the same recording into out_dir, its
+        # output is used instead of diarizing again
+        with claim(os.path.join(out_dir, f"{basename}_diarization")) as waited:
+            output_paths = (
+                self._diarization_outputs(out_dir, basename) if waited else {}
+            )
+            if not output_paths:
+                output_paths = self._run_diarization(wav_path, out_dir, min_duration)
+        return output_paths
+
+    @staticmethod
+    def _diarization_outputs(out_dir: str, basename: str) -> Dict[str, str]:
+        """Per-speaker VAD files of a diarized recording that exist in ``out_dir``."""
+        output_paths = {}
+        for path in glob.glob(os.path.join(glob.escape(out_dir), "*", "*_vad.txt")):
+            speaker = os.path.basename(os.path.dirname(path))
+            if os.path.basename(path) == f"{basename}_{speaker}_vad.txt":
+                output_paths[speaker] = path
+        return output_paths
+
+    def _run_diarization(
+        self, wav_path: str, out_dir: str, min_duration: float
+    ) -> Dict[str, str]:
+        basename = os.path.splitext(os.path.basename(wav_path))[0]
 
         if self.vad_type == "pyannote":
             from pyannote.audio.pipelines.utils.hook import ProgressHook
@@ -427,7 +462,7 @@ class SpeechActivityDetector:
                 os.makedirs(os.path.dirname(out_path), exist_ok=True)
                 output_paths[speaker] = out_path
 
-                with open(out_path, "w") as f:
+                with atomic_write(out_path) as f:
                     f.write("Start_Time(s)\tEnd_Time(s)\tAnnotation\n")
                     for start, end in merged:
                         if (end - start) >= min_duration:
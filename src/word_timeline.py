@@ -0,0 +1,336 @@
+"""
+Word-level transcription timelines.
+
+Each speaker's speech is transcribed once with word timestamps and stored as a
+word table. Transcriptions for any set of turns (e.g. the output of
+``create_turns_df_windowed`` with different merge settings) are then assembled
+by time-range lookup in that table, without running ASR again.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import warnings
+from typing import Any, Dict, List, Mapping, Optional
+
+import numpy as np
+import pandas as pd
+import soundfile as sf
+
+from .atomic_io import atomic_write, file_lock
+from .transcription import (
+    CONFIDENCE_FIELDS,
+    TransformersASRModel,
+    group_by_duration,
+    iter_prefetched,
+    make_record,
+    to_model_input,
+    transcribe_inputs,
+)
+
+WORD_COLUMNS = ["speaker", "start_sec", "end_sec", "word", "probability"]
+
+
+def pack_speech_regions(
+    segments: pd.DataFrame,
+    max_region_sec: float = 30.0,
+    max_gap_sec: float = 1.0,
+) -> pd.DataFrame:
+    """
+    Pack a speaker's speech segments into regions for word-level transcription.
+
+    Consecutive segments are joined while the gap between them is at most
+    ``max_gap_sec`` and the region stays within ``max_region_sec`` (Whisper's
+    30 s window by default), so the model sees natural context instead of
+    isolated VAD fragments. A single segment longer than the limit forms a
+    region of its own.
+
+    Args:
+        segments: DataFrame with 'start_sec' and 'end_sec' columns.
+        max_region_sec: Maximum duration (in seconds) of a packed region.
+        max_gap_sec: Maximum pause (in seconds) bridged inside a region.
+
+    Returns:
+        DataFrame with 'start_sec' and 'end_sec' columns, sorted by start.
+    """
+    if segments.empty:
+        return pd.DataFrame(columns=["start_sec", "end_sec"])
+
+    ordered = segments.sort_values("start_sec")
+    starts = ordered["start_sec"].to_numpy(dtype=float)
+    ends = ordered["end_sec"].to_numpy(dtype=float)
+
+    regions = []
+    region_start, region_end = starts[0], ends[0]
+    for start, end in zip(starts[1:], ends[1:]):
+        if (
+            start - region_end <= max_gap_sec
+            and max(end, region_end) - region_start <= max_region_sec
+        ):
+            region_end = max(region_end, end)
+        else:
+            regions.append((region_start, region_end))
+            region_start, region_end = start, end
+    regions.append((region_start, region_end))
+
+    return pd.DataFrame(regions, columns=["start_sec", "end_sec"])
+
+
+def word_decoding_options(model: TransformersASRModel) -> Dict[str, Any]:
+    """Settings of a loaded model besides its name that change the recognised words."""
+    options: Dict[str, Any] = {
+        "backend": model.backend,
+        "device": model.device,
+        "compute_type": model.compute_type,
+    }
+    if model.cascade_model is not None:
+        options["cascade"] = model.cascade_model.transcription_model_name
+    return options
+
+
+def word_table_path(
+    output_dir: str,
+    prefix: str,
+    regions: pd.DataFrame,
+    transcription_model_name: str,
+    language: Optional[str] = None,
+    decoding: Optional[Mapping[str, Any]] = None,
+    min_duration_samples: int = 0,
+) -> str:
+    """
+    Location of the cached word table for a set of speech regions.
+
+    The file name carries a digest of the region boundaries, the model name,
+    the decoding language, the other decoding settings and the minimum region
+    length, so changing VAD/energy settings, the model, the language or e.g.
+    the compute type never serves a stale table, while changing only
+    turn-merging settings reuses it.
+
+    Args:
+        output_dir: Directory holding the speaker's artifacts.
+        prefix: File stem, usually the speaker name.
+        regions: Speech regions from :func:`pack_speech_regions`.
+        transcription_model_name: Name of the ASR model producing the table.
+        language: Decoding language (``None`` when Whisper detects it).
+        decoding: Other settings that change the words, e.g. from
+            :func:`word_decoding_options`; values must be JSON-serialisable.
+        min_duration_samples: Regions shorter than this were not transcribed.
+
+    Returns:
+        Path of the tab-separated word table.
+    """
+    digest = hashlib.sha1(transcription_model_name.encode("utf-8"))
+    settings = {"language": language, **(decoding or {})}
+    if min_duration_samples > 0:
+        settings["min_duration_samples"] = min_duration_samples
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    bounds = np.round(regions[["start_sec", "end_sec"]].to_numpy(dtype=float), 3)
+    digest.update(np.ascontiguousarray(bounds).tobytes())
+    return os.path.join(output_dir, f"{prefix}_words_{digest.hexdigest()[:12]}.txt")
+
+
+def read_word_table(path: str) -> pd.DataFrame:
+    """Load a word table written by :func:`transcribe_words`."""
+    # Keep words such as "null" or "na" as text
+    words = pd.read_csv(path, sep="\t", keep_default_na=False)
+    words["probability"] = pd.to_numeric(words["probability"], errors="coerce")
+    return words
+
+
+def transcribe_words(
+    model: TransformersASRModel,
+    regions: pd.DataFrame,
+    audio_path: str,
+    output_dir: str,
+    speaker: str,
+    *,
+    file_prefix: Optional[str] = None,
+    cache: bool = True,
+    batch_size: float | None = 30.0,
+    language: Optional[str] = None,
+    decoding: Optional[Mapping[str, Any]] = None,
+    min_duration_samples: int = 0,
+    cascade: bool = True,
+) -> pd.DataFrame:
+    """
+    Transcribe speech regions once with word-level timestamps.
+
+    Args:
+        model: A loaded Whisper model obtained via ``load_whisper_model``.
+        regions: Speech regions ('start_sec', 'end_sec'), typically from
+            :func:`pack_speech_regions` over the speaker's VAD segments.
+        audio_path: Source waveform on disk (the speaker's channel, or the
+            mixed recording for diarized speakers).
+        output_dir: Directory where the word table is stored.
+        speaker: Identifier tagged on each word.
+        file_prefix: Optional custom stem for the word table; defaults to
+            ``speaker``.
+        cache: When True, reuse a word table for the same regions and model.
+        batch_size: Maximum total audio duration (in seconds) per batch.
+        language: Language code overriding ``model.language``, e.g. from
+            ``detect_speaker_language``.
+        decoding: Decoding settings keying the cached table (default:
+            :func:`word_decoding_options` of ``model``). Callers that look the
+            table up before loading a model pass the settings they load it with.
+        min_duration_samples: Regions shorter than this many samples of the
+            source audio are skipped, as in ``transcribe_segments``.
+        cascade: Transcribe with ``model.cascade_model`` first and escalate
+            low-confidence regions, if the model has a cascade model.
+
+    Returns:
+        Word table with columns 'speaker', 'start_sec', 'end_sec', 'word' and
+        'probability' (NaN when the backend does not report it), with times on
+        the original recording timeline.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    prefix = file_prefix or speaker
+    path = word_table_path(
+        output_dir,
+        prefix,
+        regions,
+        model.transcription_model_name,
+        language=language or model.language,
+        decoding=word_decoding_options(model) if decoding is None else decoding,
+        min_duration_samples=min_duration_samples,
+    )
+    # Another process transcribing the same regions finishes first
+    with file_lock(path):
+        if cache and os.path.exists(path):
+            return read_word_table(path)
+        return _transcribe_word_table(
+            model,
+            regions,
+            audio_path,
+            path,
+            speaker,
+            batch_size,
+            language,
+            min_duration_samples,
+            cascade,
+        )
+
+
+def _transcribe_word_table(
+    model: TransformersASRModel,
+    regions: pd.DataFrame,
+    audio_path: str,
+    path: str,
+    speaker: str,
+    batch_size: float | None,
+    language: Optional[str],
+    min_duration_samples: int,
+    cascade: bool,
+) -> pd.DataFrame:
+
+    audio, sr = sf.read(audio_path)
+    region_list = [
+        region
+        for region in regions[["start_sec", "end_sec"]].to_dict("records")
+        if int(region["end_sec"] * sr) - int(region["start_sec"] * sr)
+        >= min_duration_samples
+    ]
+    batches = group_by_duration(region_list, batch_size)
+
+    def prepare_batch(batch: List[Dict[str, Any]]) -> List[np.ndarray]:
+        return [
+            to_model_input(
+                audio[int(region["start_sec"] * sr) : int(region["end_sec"] * sr)], sr
+            )
+            for region in batch
+        ]
+
+    rows = []
+    n_failed = 0
+    for batch, batch_audio in zip(batches, iter_prefetched(batches, prepare_batch)):
+        records = transcribe_inputs(
+            batch_audio,
+            model,
+            language=language,
+            word_timestamps=True,
+            cascade=cascade,
+        )
+        for region, record in zip(batch, records):
+            if record["text"].startswith("[TRANSCRIPTION_FAILED:"):
+                n_failed += 1
+                continue
+            for start, end, word, probability in record.get("words", []):
+                rows.append(
+                    {
+                        "speaker": speaker,
+                        "start_sec": region["start_sec"] + start,
+                        "end_sec": region["start_sec"] + end,
+                        "word": word,
+                        "probability": probability,
+                    }
+                )
+
+    words = pd.DataFrame(rows, columns=WORD_COLUMNS)
+    if n_failed:
+        # Do not cache an incomplete table; the failed regions are retried next run
+        warnings.warn(
+            f"{n_failed} of {len(region_list)} speech regions of {speaker} could "
+            "not be transcribed; word table not cached."
+        )
+    else:
+        with atomic_write(path, newline="") as table_file:
+            words.to_csv(table_file, sep="\t", index=False)
+    return words
+
+
+def assemble_turn_transcriptions(
+    turns: pd.DataFrame, words: pd.DataFrame
+) -> List[Dict[str, Any]]:
+    """
+    Build turn transcriptions from a word table by time-range lookup.
+
+    Each word is assigned to the turn of the same speaker that contains its
+    midpoint; the words of a turn are joined in time order.
+
+    Args:
+        turns: DataFrame with 'speaker', 'start_sec' and 'end_sec' columns, e.g.
+            the output of ``create_turns_df_windowed``.
+        words: Word table(s) from :func:`transcribe_words` covering the speakers
+            in ``turns``.
+
+    Returns:
+        One record per turn, in input order, with the same fields
+        ``transcribe_segments`` returns (confidence fields other than the
+        compression ratio are NaN).
+    """
+    texts = [""] * len(turns)
+    turn_speakers = turns["speaker"].to_numpy()
+    turn_starts = turns["start_sec"].to_numpy(dtype=float)
+    turn_ends = turns["end_sec"].to_numpy(dtype=float)
+
+    for speaker, speaker_words in words.groupby("speaker", sort=False):
+        midpoints = (
+            (speaker_words["start_sec"] + speaker_words["end_sec"]) / 2
+        ).to_numpy(dtype=float)
+        order = np.argsort(midpoints, kind="stable")
+        midpoints = midpoints[order]
+        tokens = speaker_words["word"].astype(str).to_numpy()[order]
+
+        positions = np.flatnonzero(turn_speakers == speaker)
+        lo = np.searchsorted(midpoints, turn_starts[positions], side="left")
+        hi = np.searchsorted(midpoints, turn_ends[positions], side="left")
+        for pos, first, last in zip(positions, lo, hi):
+            texts[pos] = " ".join(token for token in tokens[first:last] if token)
+
+    results = []
+    for speaker, start, end, text in zip(
+        turn_speakers, turn_starts.tolist(), turn_ends.tolist(), texts
+    ):
+        record = make_record(text)
+        result: Dict[str, Any] = {
+            "speaker": speaker,
+            "start_sec": start,
+            "end_sec": end,
+            "duration_sec": end - start,
+            "transcription": text,
+        }
+        for key in CONFIDENCE_FIELDS:
+            result[key] = record[key]
+        results.append(result)
+    return results